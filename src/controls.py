@@ -0,0 +1,137 @@
+import time
+from array import array
+
+import pygame
+
+# Movement actions, used as indices into the per-tick state
+LEFT, RIGHT, UP, DOWN = range(4)
+ACTION_NAMES = ("left", "right", "up", "down")
+
+DEFAULT_BINDINGS = {
+    pygame.K_LEFT: LEFT,
+    pygame.K_RIGHT: RIGHT,
+    pygame.K_UP: UP,
+    pygame.K_DOWN: DOWN,
+    pygame.K_a: LEFT,
+    pygame.K_d: RIGHT,
+    pygame.K_w: UP,
+    pygame.K_s: DOWN,
+}
+
+# Player.move asks for the arrow keys; they stand for the bound actions
+CANONICAL_KEYS = {pygame.K_LEFT: LEFT, pygame.K_RIGHT: RIGHT, pygame.K_UP: UP, pygame.K_DOWN: DOWN}
+
+
+class InputBuffer:
+    def __init__(self, bindings=None, latency_samples=256):
+        """
+        Event-driven keyboard input.
+
+        Key presses and releases are timestamped as they arrive and queued
+        until the next tick, which replays them in order. A key tapped and
+        released between two ticks still moves the player one step.
+
+        Parameters:
+        - bindings: Dict of pygame key -> action (LEFT/RIGHT/UP/DOWN); arrows and WASD by default
+        - latency_samples: Input-to-display latencies kept for latency_stats
+        """
+        self.bindings = dict(DEFAULT_BINDINGS if bindings is None else bindings)
+        self.held = bytearray(4)  # Keys down right now
+        self.active = bytearray(4)  # Actions to apply in the current tick
+        self.queue = []  # (timestamp_ns, action, pressed) since the last tick
+        self.unpresented = []  # Press timestamps consumed but not yet on screen
+
+        self.latencies = array("d", bytes(8 * latency_samples))  # Ring buffer, milliseconds
+        self.latency_count = 0
+
+    def rebind(self, key, action):
+        """
+        Binds a key to an action (LEFT/RIGHT/UP/DOWN), or unbinds it if action is None.
+        """
+        if action is None:
+            self.bindings.pop(key, None)
+        else:
+            self.bindings[key] = action
+
+    def handle_event(self, event):
+        """
+        Queues a bound KEYDOWN/KEYUP with its arrival time.
+        """
+        if event.type == pygame.KEYDOWN or event.type == pygame.KEYUP:
+            action = self.bindings.get(event.key)
+            if action is not None:
+                self.queue.append((time.perf_counter_ns(), action, event.type == pygame.KEYDOWN))
+        elif event.type == pygame.WINDOWFOCUSLOST:
+            self.queue.clear()
+            self.held[:] = bytes(4)  # Key-ups are never delivered once focus is lost
+
+    def begin_tick(self):
+        """
+        Replays the queued events into this tick's action state.
+
+        Returns:
+        - self, so it can be indexed like pygame.key.get_pressed()
+        """
+        active, held = self.active, self.held
+        active[:] = held
+        for timestamp, action, pressed in self.queue:
+            held[action] = pressed
+            if pressed:
+                active[action] = 1
+                self.unpresented.append(timestamp)
+        self.queue.clear()
+        return self
+
+    def __getitem__(self, key):
+        return self.active[CANONICAL_KEYS[key]]
+
+    @property
+    def mask(self):
+        """
+        This tick's actions as a bitmask (bit n set for action n).
+        """
+        active = self.active
+        return active[0] | active[1] << 1 | active[2] << 2 | active[3] << 3
+
+    def load_mask(self, mask):
+        """
+        Sets this tick's actions from a bitmask (as from mask), e.g. input received over the network.
+
+        Returns:
+        - self, to be passed as the held keys
+        """
+        active = self.active
+        for action in range(len(active)):
+            active[action] = mask >> action & 1
+        return self
+
+    def frame_presented(self):
+        """
+        Records input-to-display latency for presses shown by the frame just presented.
+        """
+        if not self.unpresented:
+            return
+        now = time.perf_counter_ns()
+        size = len(self.latencies)
+        for timestamp in self.unpresented:
+            self.latencies[self.latency_count % size] = (now - timestamp) / 1e6
+            self.latency_count += 1
+        self.unpresented.clear()
+
+    def latency_stats(self):
+        """
+        Summary of recent input-to-display latencies in milliseconds.
+
+        Returns:
+        - Dict with count, mean, p50, p95 and max (None values before any input)
+        """
+        samples = sorted(self.latencies[: min(self.latency_count, len(self.latencies))])
+        if not samples:
+            return {"count": 0, "mean": None, "p50": None, "p95": None, "max": None}
+        return {
+            "count": self.latency_count,
+            "mean": sum(samples) / len(samples),
+            "p50": samples[len(samples) // 2],
+            "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            "max": samples[-1],
+        }
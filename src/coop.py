@@ -0,0 +1,627 @@
+import asyncio
+import random
+import socket
+import struct
+import sys
+import time
+
+import numpy as np
+
+from controls import InputBuffer
+from ecs import ARCHETYPES
+from ghosts import FACING_BIT, pack_frame
+from scenes import TICK_RATE
+
+# Packets, one per UDP datagram; the first byte is the kind
+HELLO = b"H"  # client -> server: join
+BYE = b"B"  # client -> server: leave
+INPUT = b"I"  # client -> server: recent inputs
+WELCOME = b"W"  # server -> client: robber id
+SNAPSHOT = b"S"  # server -> client: state, as a delta against a snapshot the client acknowledged
+
+# INPUT: kind, tick of the newest snapshot received, sequence number of the newest input, input count; then one mask byte per input
+INPUT_HEADER = struct.Struct("<cIIB")
+WELCOME_PACKET = struct.Struct("<cH")
+# SNAPSHOT: kind, tick, baseline tick (0 for a full snapshot), newest input applied for the receiver, level,
+# then the counts of changed robbers, robbers gone, items added and items removed
+SNAPSHOT_HEADER = struct.Struct("<cIIIBHHHH")
+ROBBER = struct.Struct("<HiiBHH")  # id, x, y in half pixels, facing and frame, coins, deaths
+ITEM = struct.Struct("<HiiB")  # id, x, y in half pixels, size
+ENTITY_ID = struct.Struct("<H")
+
+SNAPSHOT_EVERY = 5  # Ticks between snapshots: 20 per second
+HISTORY = 64  # Snapshots kept as delta baselines (and on clients, to decode them)
+INPUT_WINDOW = 32  # Oldest unacknowledged inputs in every INPUT packet, resent until acknowledged, so lost packets lose nothing
+MAX_PENDING_INPUTS = 256  # Unacknowledged inputs a client keeps, and inputs a server queues per robber
+INPUT_GAP_TICKS = 25  # Ticks the server waits for a missing input before skipping to the next one it has
+MAX_INPUTS_PER_TICK = 2  # Inputs a robber may catch up by per tick when its packets arrive in a burst
+TIMEOUT = 5.0  # Seconds of silence before a robber is dropped
+
+
+def half_pixels(value):
+    return int(round(value * 2))
+
+
+class State:
+    __slots__ = ("tick", "level", "robbers", "items")
+
+    def __init__(self, tick, level, robbers, items):
+        """
+        What a snapshot describes, quantized as sent.
+
+        Parameters:
+        - tick: Server tick
+        - level: Current level index
+        - robbers: Dict of robber id -> (x, y, facing and frame, coins, deaths), positions in half pixels
+        - items: Dict of item entity id -> (x, y, size), positions in half pixels
+        """
+        self.tick = tick
+        self.level = level
+        self.robbers = robbers
+        self.items = items
+
+
+def encode_snapshot(state, baseline, ack):
+    """
+    A SNAPSHOT packet for one client: everything if baseline is None, else
+    only the robbers and items that differ from the baseline state.
+    """
+    if baseline is None or baseline.level != state.level:
+        base_robbers, base_items, base_tick = {}, {}, 0
+    else:
+        base_robbers, base_items, base_tick = baseline.robbers, baseline.items, baseline.tick
+    robbers, items = state.robbers, state.items
+    changed = [(rid, robber) for rid, robber in robbers.items() if base_robbers.get(rid) != robber]
+    gone = [rid for rid in base_robbers if rid not in robbers]
+    added = [(iid, item) for iid, item in items.items() if iid not in base_items]
+    removed = [iid for iid in base_items if iid not in items]
+
+    parts = [
+        SNAPSHOT_HEADER.pack(SNAPSHOT, state.tick, base_tick, ack, state.level, len(changed), len(gone), len(added), len(removed))
+    ]
+    parts += [ROBBER.pack(rid, *robber) for rid, robber in changed]
+    parts += [ENTITY_ID.pack(rid) for rid in gone]
+    parts += [ITEM.pack(iid, *item) for iid, item in added]
+    parts += [ENTITY_ID.pack(iid) for iid in removed]
+    return b"".join(parts)
+
+
+def decode_snapshot(data, history):
+    """
+    Rebuilds the full state of a SNAPSHOT packet from its baseline.
+
+    Parameters:
+    - history: Dict of tick -> State of the snapshots received so far
+
+    Returns:
+    - (State, newest input applied), or None if the baseline is no longer known
+    """
+    _, tick, base_tick, ack, level, changed, gone, added, removed = SNAPSHOT_HEADER.unpack_from(data)
+    if base_tick:
+        baseline = history.get(base_tick)
+        if baseline is None:
+            return None
+        robbers, items = dict(baseline.robbers), dict(baseline.items)
+    else:
+        robbers, items = {}, {}
+    offset = SNAPSHOT_HEADER.size
+    for _ in range(changed):
+        rid, *robber = ROBBER.unpack_from(data, offset)
+        robbers[rid] = tuple(robber)
+        offset += ROBBER.size
+    for _ in range(gone):
+        robbers.pop(ENTITY_ID.unpack_from(data, offset)[0], None)
+        offset += ENTITY_ID.size
+    for _ in range(added):
+        iid, *item = ITEM.unpack_from(data, offset)
+        items[iid] = tuple(item)
+        offset += ITEM.size
+    for _ in range(removed):
+        items.pop(ENTITY_ID.unpack_from(data, offset)[0], None)
+        offset += ENTITY_ID.size
+    return State(tick, level, robbers, items), ack
+
+
+def remember(history, state):
+    history[state.tick] = state
+    if len(history) > HISTORY:
+        del history[min(history)]
+
+
+class Robber:
+    def __init__(self, rid, address, player):
+        """
+        A connected client on the server: its player and the inputs it has sent.
+        """
+        self.id = rid
+        self.address = address
+        self.player = player
+        self.inputs = {}  # Sequence number -> action mask, not applied yet
+        self.next_seq = 1  # Inputs are applied exactly once, in order
+        self.waited = 0  # Ticks spent waiting for input next_seq while later ones are queued
+        self.acked = 0  # Newest snapshot tick the client has received
+        self.deaths = 0
+        self.heard = time.monotonic()
+
+
+class CoopServer(asyncio.DatagramProtocol):
+    def __init__(self, game, snapshot_every=SNAPSHOT_EVERY):
+        """
+        Authoritative co-op server: every robber shares the level of one
+        headless Game, moves with Player.move, picks up coins and dies to
+        hazards on the server, and is told the outcome in snapshots.
+
+        Clients send numbered inputs; each robber applies every input once,
+        in order, so a client that predicts its own moves with Player.move
+        lands on the same positions and only corrects after deaths. Every
+        snapshot_every ticks each client gets a snapshot delta-encoded
+        against the newest one it acknowledged, or a full one if that is
+        too old.
+
+        Parameters:
+        - game: A Game (e.g. sessions.make_headless_game()) for the levels, world and hazards
+        - snapshot_every: Ticks between snapshots
+        """
+        self.game = game
+        self.snapshot_every = snapshot_every
+        self.robbers = {}  # Address -> Robber
+        self.next_id = 1
+        self.history = {}  # Tick -> State
+        self.keys = InputBuffer()
+        self.transport = None
+        self.sent_bytes = 0
+        self.tick_seconds = 0.0  # Time spent simulating, for the load figures
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        kind = data[:1]
+        robber = self.robbers.get(address)
+        if kind == INPUT and robber is not None:
+            _, acked, newest, count = INPUT_HEADER.unpack_from(data)
+            robber.acked = max(robber.acked, acked)
+            robber.heard = time.monotonic()
+            masks = data[INPUT_HEADER.size : INPUT_HEADER.size + count]
+            for seq, mask in zip(range(newest - len(masks) + 1, newest + 1), masks):
+                if robber.next_seq <= seq < robber.next_seq + MAX_PENDING_INPUTS:
+                    robber.inputs[seq] = mask
+        elif kind == HELLO:
+            if robber is None:
+                robber = self.robbers[address] = Robber(self.next_id, address, self.new_player())
+                self.next_id = self.next_id % 0xFFFF + 1
+                print(f"Robber {robber.id} joined from {address[0]}:{address[1]} ({len(self.robbers)} connected)")
+            self.transport.sendto(WELCOME_PACKET.pack(WELCOME, robber.id), address)
+        elif kind == BYE and robber is not None:
+            self.drop(robber)
+
+    def new_player(self):
+        from main import Player
+        from sprites import ROBBER_STANDING, ROBBER_WALK_FRAMES
+
+        model = self.game.player
+        x, y = self.game.start_position()
+        return Player(x, y, model.width, model.height, model.vel, ROBBER_STANDING, ROBBER_WALK_FRAMES)
+
+    def drop(self, robber):
+        del self.robbers[robber.address]
+        print(f"Robber {robber.id} left ({len(self.robbers)} connected)")
+
+    def step(self):
+        """
+        One server tick: Game.update's movement, pickup, hazard and progress systems for every robber.
+        """
+        game, world = self.game, self.game.world
+        game.tick += 1
+        for field, _ in game.hazards.values():
+            field.advance(game.tick)
+        width, height = game.camera.world_width, game.camera.world_height
+        for robber in list(self.robbers.values()):
+            player = robber.player
+            moved = False
+            for _ in range(MAX_INPUTS_PER_TICK if len(robber.inputs) > 1 else 1):
+                mask = robber.inputs.pop(robber.next_seq, None)
+                if mask is None and robber.inputs:
+                    robber.waited += 1
+                    if robber.waited < INPUT_GAP_TICKS:
+                        break  # Not arrived yet: the robber waits rather than guessing
+                    # The client no longer has it: skip to the oldest input received
+                    robber.next_seq = min(robber.inputs)
+                    mask = robber.inputs.pop(robber.next_seq)
+                if mask is None:
+                    break
+                robber.waited = 0
+                robber.next_seq += 1
+                moved = True
+                player.move(self.keys.load_mask(mask), world, width, height)
+                player.collect_items(world)
+                if self.check_hazards(robber):
+                    break
+            if not moved:
+                # Moving hazards still reach a robber that sends no input
+                self.check_hazards(robber)
+
+        if world.remaining(world.collectible) == 0 and self.robbers:
+            self.next_level()
+
+    def check_hazards(self, robber):
+        """
+        Sends the robber back to the start if it touches a hazard.
+
+        Returns:
+        - True if the robber died
+        """
+        from systems import DEATH_MESSAGES
+
+        game, world, player = self.game, self.game.world, robber.player
+        cause = None
+        hit = world.query(player.x, player.y, player.width, player.height, world.hazard)
+        if len(hit):
+            cause = int(world.hazard[hit[0]])
+        for field, field_cause in game.hazards.values():
+            if cause is None and field.touches(player.x, player.y, player.width, player.height):
+                cause = field_cause
+        if cause is None:
+            return False
+        print(f"Robber {robber.id}: {DEATH_MESSAGES.get(cause, 'Restarting level.')}")
+        robber.deaths += 1
+        player.x, player.y = game.start_position()
+        player.inventory.clear()
+        return True
+
+    def next_level(self):
+        """
+        Moves every robber on to the next level; after the last one the heist starts over with fresh coins.
+        """
+        game = self.game
+        print(f"Level {game.current_level + 1} completed!")
+        if game.current_level < len(game.levels) - 1:
+            game.current_level += 1
+            game.enter_level()
+        else:
+            game.new_run()  # Enters the first level
+        for robber in self.robbers.values():
+            robber.player.x, robber.player.y = game.start_position()
+            robber.player.inventory.clear()
+
+    def state(self):
+        game, world = self.game, self.game.world
+        robbers = {
+            robber.id: (
+                half_pixels(robber.player.x),
+                half_pixels(robber.player.y),
+                pack_frame(robber.player.animation.facing, robber.player.animation.frame),
+                len(robber.player.inventory),
+                robber.deaths,
+            )
+            for robber in self.robbers.values()
+        }
+        ids = world.query(0, 0, *game.level_dimensions(), world.collectible).tolist()
+        items = {
+            iid: (half_pixels(world.x[iid]), half_pixels(world.y[iid]), int(world.w[iid])) for iid in ids
+        }
+        return State(game.tick, game.current_level, robbers, items)
+
+    def broadcast(self):
+        state = self.state()
+        remember(self.history, state)
+        for robber in self.robbers.values():
+            packet = encode_snapshot(state, self.history.get(robber.acked), robber.next_seq - 1)
+            self.transport.sendto(packet, robber.address)
+            self.sent_bytes += len(packet)
+
+    async def serve(self, host="127.0.0.1", port=5050, stats_every=10.0):
+        """
+        Runs the tick loop at TICK_RATE until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(host, port))
+        print(f"Co-op server on {host}:{port}")
+        deadline = loop.time()
+        stats_at, stats_ticks = deadline + stats_every, 0
+        try:
+            while True:
+                began = time.perf_counter()
+                self.step()
+                if self.game.tick % self.snapshot_every == 0:
+                    self.broadcast()
+                self.tick_seconds += time.perf_counter() - began
+                stats_ticks += 1
+
+                now = time.monotonic()
+                for robber in [r for r in self.robbers.values() if now - r.heard > TIMEOUT]:
+                    self.drop(robber)
+                if loop.time() >= stats_at:
+                    print(
+                        f"{len(self.robbers)} robbers, {self.tick_seconds / stats_ticks * 1000:.2f} ms per tick, "
+                        f"{self.sent_bytes / stats_every / 1024:.1f} KiB/s out"
+                    )
+                    stats_at, stats_ticks, self.tick_seconds, self.sent_bytes = loop.time() + stats_every, 0, 0.0, 0
+
+                deadline += 1 / TICK_RATE
+                delay = deadline - loop.time()
+                if delay < -0.25:
+                    deadline = loop.time()  # Far behind: drop the backlog instead of running ticks back to back
+                await asyncio.sleep(max(0.0, delay))
+        finally:
+            self.transport.close()
+
+
+class CoopClient:
+    def __init__(self):
+        """
+        Client side of the protocol, without any I/O: builds packets to send
+        and decodes the ones received. Used by CoopSystem in the game and by
+        the load-test bots.
+        """
+        self.id = None  # Robber id, once welcomed
+        self.seq = 0  # Sequence number of the newest input
+        self.pending = []  # (seq, mask) sent but not yet applied by the server
+        self.history = {}  # Tick -> State, the baselines of later deltas
+        self.latest = None  # Newest State
+        self.previous = None  # The State before it, for interpolating the other robbers
+        self.ack = 0  # Newest input the server had applied in latest
+        self.received_bytes = 0
+
+    def hello(self):
+        return HELLO
+
+    def bye(self):
+        return BYE
+
+    def input_packet(self, mask):
+        """
+        Numbers this tick's input and returns the INPUT packet carrying the
+        oldest unacknowledged inputs (this one too, unless INPUT_WINDOW older
+        ones are still waiting).
+        """
+        self.seq += 1
+        self.pending.append((self.seq, mask))
+        if len(self.pending) > MAX_PENDING_INPUTS:
+            del self.pending[:-MAX_PENDING_INPUTS]  # The server skips what it never got
+        window = self.pending[:INPUT_WINDOW]
+        masks = bytes(mask for _, mask in window)
+        acked = self.latest.tick if self.latest is not None else 0
+        return INPUT_HEADER.pack(INPUT, acked, window[-1][0], len(masks)) + masks
+
+    def receive(self, data):
+        """
+        Returns:
+        - True if the packet was a newer snapshot (now in latest)
+        """
+        self.received_bytes += len(data)
+        kind = data[:1]
+        if kind == WELCOME:
+            self.id = WELCOME_PACKET.unpack(data)[1]
+            return False
+        if kind != SNAPSHOT:
+            return False
+        decoded = decode_snapshot(data, self.history)
+        if decoded is None:
+            return False
+        state, ack = decoded
+        if self.latest is not None and state.tick <= self.latest.tick:
+            return False  # Arrived out of order
+        remember(self.history, state)
+        self.previous, self.latest, self.ack = self.latest, state, ack
+        self.pending = [(seq, mask) for seq, mask in self.pending if seq > ack]
+        return True
+
+
+class CoopLink:
+    def __init__(self, address):
+        """
+        Non-blocking UDP socket to a co-op server, polled from the game loop.
+        """
+        self.address = address
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def send(self, packet):
+        try:
+            self.socket.sendto(packet, self.address)
+        except (BlockingIOError, ConnectionRefusedError):
+            pass  # Dropped like any other datagram; the next one repeats it
+
+    def receive(self):
+        packets = []
+        while True:
+            try:
+                packets.append(self.socket.recv(65536))
+            except (BlockingIOError, ConnectionRefusedError):
+                return packets
+
+    def close(self):
+        self.socket.close()
+
+
+class CoopSystem:
+    def __init__(self, address, hello_every=50):
+        """
+        Client side of co-op play, run after MovementSystem: sends the tick's
+        input, applies snapshots and reconciles the locally predicted player.
+
+        Parameters:
+        - address: (host, port) of the CoopServer
+        - hello_every: Ticks between join requests until the server answers
+        """
+        self.client = CoopClient()
+        self.link = CoopLink(address)
+        self.hello_every = hello_every
+        self.level = None  # Level the local world's coins were last synced for
+        self.local_items = {}  # Server item id -> entity id in the local world
+        self.corrections = 0  # Snapshots that moved the predicted player
+
+    def update(self, game):
+        client = self.client
+        if client.id is None:
+            if game.tick % self.hello_every == 1:
+                self.link.send(client.hello())
+        else:
+            self.link.send(client.input_packet(game.input.mask))
+        fresh = False
+        for packet in self.link.receive():
+            fresh = client.receive(packet) or fresh
+        if fresh and client.id is not None:
+            self.apply(game, client.latest)
+        for field, _ in game.hazards.values():
+            field.advance(game.tick)  # Drawn only; deaths are decided by the server
+
+    def apply(self, game, state):
+        client, player = self.client, game.player
+        game.tick = state.tick  # The server clock is authoritative; hazards follow it
+        if state.level != self.level:
+            if state.level != game.current_level:
+                game.current_level = state.level
+                game.enter_level()
+            # The coins are the server's, not the ones this Game generated
+            game.world.kill(game.world.query(0, 0, *game.level_dimensions(), game.world.collectible))
+            self.local_items = {}
+            self.level = state.level
+        self.sync_items(game.world, state.items)
+
+        own = state.robbers.get(client.id)
+        if own is None:
+            return
+        x, y, _, _, game.deaths = own
+        player.inventory[:] = range(sum(robber[3] for robber in state.robbers.values()))  # Team coins, for the HUD
+        # Reconcile: start from the server's position and replay the inputs it has not applied yet
+        predicted = player.x, player.y
+        animation = dict(vars(player.animation))
+        player.x, player.y = x / 2, y / 2
+        width, height = game.camera.world_width, game.camera.world_height
+        for _, mask in client.pending:
+            player.move(game.input.load_mask(mask), game.world, width, height)
+        vars(player.animation).update(animation)
+        if (player.x, player.y) != predicted:
+            self.corrections += 1
+            game.camera.follow(player.x, player.y, player.width, player.height)
+        game.input.load_mask(client.pending[-1][1] if client.pending else 0)
+
+    def sync_items(self, world, items):
+        local = self.local_items
+        gone = [iid for iid in local if iid not in items]
+        if gone:
+            world.kill([local.pop(iid) for iid in gone])
+        new = [(iid, item) for iid, item in items.items() if iid not in local]
+        if new:
+            x = np.array([item[0] / 2 for _, item in new])
+            y = np.array([item[1] / 2 for _, item in new])
+            size = np.array([item[2] for _, item in new], dtype=np.float64)
+            for (iid, _), eid in zip(new, world.spawn(x, y, size, size, **ARCHETYPES["items"]).tolist()):
+                local[iid] = eid
+
+    def others(self, tick):
+        """
+        The other robbers as (x, y, facing, frame), interpolated between the
+        two newest snapshots, i.e. shown one snapshot interval in the past.
+        """
+        client = self.client
+        latest, previous = client.latest, client.previous
+        if latest is None:
+            return []
+        span = latest.tick - previous.tick if previous is not None else 0
+        t = min(1.0, (tick - latest.tick) / span) if span > 0 else 1.0
+        robbers = []
+        for rid, (x, y, frame, _, _) in latest.robbers.items():
+            if rid == client.id:
+                continue
+            if previous is not None and rid in previous.robbers and t < 1.0:
+                px, py = previous.robbers[rid][:2]
+                x, y = px + (x - px) * t, py + (y - py) * t
+            robbers.append((x / 2, y / 2, 1 if frame & FACING_BIT else 0, frame & ~FACING_BIT))
+        return robbers
+
+    def close(self):
+        self.link.send(self.client.bye())
+        self.link.close()
+
+
+class RobberRenderer:
+    def draw(self, game):
+        ox, oy = game.camera.offset
+        for x, y, facing, frame in game.coop.others(game.tick):
+            game.player.atlas.blit(game.screen, (x + ox, y + oy), facing, frame)
+
+
+class Bot(asyncio.DatagramProtocol):
+    def __init__(self, hold=(20, 60)):
+        """
+        Load-test client: joins, then holds a random direction for a random number of ticks.
+        """
+        self.client = CoopClient()
+        self.hold = hold
+        self.transport = None
+        self.mask = 0
+        self.left = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.sendto(self.client.hello())
+
+    def datagram_received(self, data, address):
+        self.client.receive(data)
+
+    def tick(self):
+        if self.client.id is None:
+            return
+        if self.left <= 0:
+            self.mask = random.choice((1, 2, 4, 8, 5, 6, 9, 10, 0))
+            self.left = random.randint(*self.hold)
+        self.left -= 1
+        self.transport.sendto(self.client.input_packet(self.mask))
+
+
+async def run_bots(address, count, seconds):
+    """
+    Connects count bots over loopback and reports what they received.
+    """
+    loop = asyncio.get_running_loop()
+    bots = []
+    for _ in range(count):
+        bot = Bot()
+        await loop.create_datagram_endpoint(lambda: bot, remote_addr=address)
+        bots.append(bot)
+    began = deadline = loop.time()
+    while loop.time() - began < seconds:
+        for bot in bots:
+            bot.tick()
+        deadline += 1 / TICK_RATE
+        await asyncio.sleep(max(0.0, deadline - loop.time()))
+    for bot in bots:
+        bot.transport.sendto(bot.client.bye())
+        bot.transport.close()
+
+    joined = [bot for bot in bots if bot.client.latest is not None]
+    received = sum(bot.client.received_bytes for bot in bots)
+    lag = [len(bot.client.pending) for bot in joined]
+    print(
+        f"{len(joined)}/{count} bots received snapshots, {received / seconds / max(1, count) / 1024:.2f} KiB/s per bot, "
+        f"{max(lag, default=0)} inputs awaiting the server at most"
+    )
+    return bots
+
+
+if __name__ == "__main__":
+    # Usage: python src/coop.py server [PORT]
+    #        python src/coop.py client HOST PORT
+    #        python src/coop.py bots HOST PORT COUNT [SECONDS]
+    mode = sys.argv[1]
+    if mode == "server":
+        from sessions import make_headless_game
+
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 5050
+        server = CoopServer(make_headless_game())
+        try:
+            asyncio.run(server.serve(port=port))
+        except KeyboardInterrupt:
+            pass
+    elif mode == "client":
+        from main import Game
+
+        Game(coop=(sys.argv[2], int(sys.argv[3]))).run_game()
+    elif mode == "bots":
+        seconds = float(sys.argv[5]) if len(sys.argv) > 5 else 10.0
+        asyncio.run(run_bots((sys.argv[2], int(sys.argv[3])), int(sys.argv[4]), seconds))
+    else:
+        sys.exit(f"Unknown mode {mode}")
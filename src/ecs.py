@@ -0,0 +1,265 @@
+import hashlib
+
+import numpy as np
+
+from entities import COIN_COLOR, Laser, Obstacle, RectTable, bucket_rects, coin_image, merge_buckets
+from telemetry import DEATH_LASER
+
+# Renderable shapes
+SHAPE_NONE = 0
+SHAPE_RECT = 1
+SHAPE_COIN = 2
+
+SCAN_LIMIT = 512  # Up to this many entities, scanning the columns beats the spatial grid
+
+# How each level key becomes components; a new kind of static entity is one more entry
+ARCHETYPES = {
+    "obstacles": {"solid": True, "shape": SHAPE_RECT, "color": Obstacle.default_color},
+    "invisibleObstacle": {"solid": True},  # Furniture, drawn into the background art
+    "items": {"collectible": True, "shape": SHAPE_COIN, "color": COIN_COLOR},
+    "lasers": {"hazard": DEATH_LASER, "shape": SHAPE_RECT, "color": Laser.default_color},
+}
+
+
+class World:
+    def __init__(self, width, height, capacity=256, cell_size=128, level_id=None):
+        """
+        Entity-component store for one level.
+
+        Every component is a column indexed by entity id:
+        - Position: x, y
+        - Size: width, height
+        - Collider: solid (blocks movement)
+        - Renderable: shape (SHAPE_*) and color
+        - Collectible: collectible
+        - Hazard: hazard (telemetry death cause, 0 for harmless)
+
+        Entities are bucketed into a spatial grid, so systems ask for the
+        entities overlapping a rectangle with a component mask and get ids
+        back for one vectorized test, whatever kinds of entity the level has.
+
+        Parameters:
+        - width, height: Size of the level
+        - capacity: Initial number of entity rows
+        - cell_size: Side of a spatial grid cell in pixels
+        - level_id: Which level this is, for caches shared across levels (e.g. probes.ProbeCache)
+        """
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.cols = max(1, int(np.ceil(width / cell_size)))
+        self.rows = max(1, int(np.ceil(height / cell_size)))
+        capacity = max(1, capacity)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.w = np.zeros(capacity)
+        self.h = np.zeros(capacity)
+        self.right = np.zeros(capacity)  # x + w and y + h, kept for the overlap tests
+        self.bottom = np.zeros(capacity)
+        self.solid = np.zeros(capacity, dtype=bool)
+        self.shape = np.zeros(capacity, dtype=np.uint8)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.collectible = np.zeros(capacity, dtype=bool)
+        self.hazard = np.zeros(capacity, dtype=np.uint8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.count = 0  # Rows in use (alive or killed)
+        self.drawable = 0  # Live entities with a Shape, kept by spawn and kill
+        self.drawable_solid = 0  # Of those, the solid ones (baked into chunk images on large levels)
+        self.buckets = None  # Spatial grid, rebuilt after spawning
+        self.level_id = level_id
+        self.geometry = None  # Digest of the solid entities, recomputed after they change
+
+    @classmethod
+    def from_level(cls, level, cell_size=128, level_id=None):
+        """
+        Builds the world from a level dict (entity lists or RectTables per key).
+        """
+        width, height = level.get("size", (1000, 800))
+        world = cls(width, height, sum(len(level.get(key, ())) for key in ARCHETYPES), cell_size, level_id)
+        for key, components in ARCHETYPES.items():
+            entities = level.get(key)
+            if not entities:
+                continue
+            if isinstance(entities, RectTable):
+                rows = entities.indices()
+                columns = [column[rows] for column in (entities.x, entities.y, entities.width, entities.height)]
+                colors = entities.color
+            else:
+                columns = [[getattr(e, name) for e in entities] for name in ("x", "y", "width", "height")]
+                colors = [getattr(e, "color", components.get("color", (0, 0, 0))) for e in entities]
+            world.spawn(*columns, **{**components, "color": colors if components.get("shape") else (0, 0, 0)})
+        return world
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self.x))
+        for name in ("x", "y", "w", "h", "right", "bottom", "solid", "shape", "color", "collectible", "hazard", "alive"):
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[: len(column)] = column
+            setattr(self, name, grown)
+
+    def spawn(self, x, y, width, height, solid=False, shape=SHAPE_NONE, color=(0, 0, 0), collectible=False, hazard=0):
+        """
+        Adds entities from arrays of positions and sizes (one entity per entry).
+
+        Components are scalars shared by every new entity, except color,
+        which may also be one RGB triple per entity.
+
+        Returns:
+        - Array of the new entity ids
+        """
+        count = len(x)
+        if self.count + count > len(self.x):
+            self._grow(self.count + count)
+        ids = np.arange(self.count, self.count + count)
+        self.x[ids], self.y[ids], self.w[ids], self.h[ids] = x, y, width, height
+        self.right[ids] = self.x[ids] + self.w[ids]
+        self.bottom[ids] = self.y[ids] + self.h[ids]
+        self.solid[ids] = solid
+        self.shape[ids] = shape
+        self.color[ids] = color
+        self.collectible[ids] = collectible
+        self.hazard[ids] = hazard
+        self.alive[ids] = True
+        self.count += count
+        if shape != SHAPE_NONE:
+            self.drawable += count
+            if solid:
+                self.drawable_solid += count
+        if self.buckets is not None:
+            merge_buckets(self.buckets, self._bucket(ids))  # Only the new entities are binned
+        if solid:
+            self.geometry = None
+        return ids
+
+    def kill(self, ids):
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        ids = ids[self.alive[ids]]  # Killing an entity twice changes nothing
+        self.alive[ids] = False
+        drawable = self.shape[ids] != SHAPE_NONE
+        self.drawable -= int(np.count_nonzero(drawable))
+        self.drawable_solid -= int(np.count_nonzero(drawable & self.solid[ids]))
+        if self.solid[ids].any():
+            self.geometry = None
+
+    def geometry_key(self):
+        """
+        Digest of the live solid entities' rectangles. Equal keys mean the
+        same static collision geometry, even across rebuilds of the world.
+        """
+        if self.geometry is None:
+            n = self.count
+            rows = np.flatnonzero(self.alive[:n] & self.solid[:n])
+            rects = np.stack([self.x[rows], self.y[rows], self.w[rows], self.h[rows]], axis=1)
+            self.geometry = hashlib.blake2b(rects.tobytes(), digest_size=16).digest()
+        return self.geometry
+
+    def find(self, x, y, width, height, mask):
+        """
+        Ids of live entities with exactly these bounds and the component set.
+        """
+        n = self.count
+        return np.flatnonzero(
+            self.alive[:n]
+            & (mask[:n] != 0)
+            & (self.x[:n] == x)
+            & (self.y[:n] == y)
+            & (self.w[:n] == width)
+            & (self.h[:n] == height)
+        )
+
+    def _bucket(self, ids):
+        return bucket_rects(ids, self.x[ids], self.y[ids], self.w[ids], self.h[ids], self.cell_size, self.cols, self.rows)
+
+    def _index(self):
+        self.buckets = self._bucket(np.arange(self.count))
+
+    def _candidates(self, x, y, width, height):
+        # Rows to test: a slice of every row for small worlds, otherwise the
+        # ids bucketed in the grid cells the rectangle touches (an entity
+        # spanning several cells may appear more than once)
+        if self.count <= SCAN_LIMIT:
+            return slice(0, self.count), False
+        if self.buckets is None:
+            self._index()
+        size = self.cell_size
+        c0, c1 = max(0, int(x // size)), min(self.cols - 1, int((x + width) // size))
+        r0, r1 = max(0, int(y // size)), min(self.rows - 1, int((y + height) // size))
+        buckets = self.buckets
+        found = [
+            buckets[cell]
+            for row in range(r0, r1 + 1)
+            for cell in range(row * self.cols + c0, row * self.cols + c1 + 1)
+            if cell in buckets
+        ]
+        if not found:
+            return slice(0, 0), False
+        return (found[0], False) if len(found) == 1 else (np.concatenate(found), True)
+
+    def _hits(self, rows, x, y, width, height, mask):
+        hits = (
+            self.alive[rows]
+            & (x < self.right[rows])
+            & (x + width > self.x[rows])
+            & (y < self.bottom[rows])
+            & (y + height > self.y[rows])
+        )
+        if mask is not None:
+            hits &= mask[rows] != 0
+        return hits
+
+    def query(self, x, y, width, height, mask=None):
+        """
+        Ids of live entities overlapping the rectangle (strict, as collides_with).
+
+        Parameters:
+        - mask: Component column (e.g. world.solid) the entities must have set
+        """
+        rows, repeats = self._candidates(x, y, width, height)
+        hits = self._hits(rows, x, y, width, height, mask)
+        if isinstance(rows, slice):
+            return np.flatnonzero(hits) + rows.start
+        ids = rows[hits]
+        return np.unique(ids) if repeats and len(ids) > 1 else ids
+
+    def collides_any(self, x, y, width, height):
+        """
+        True if the rectangle overlaps a solid entity (so the world can stand
+        in for the obstacle lists in collision checks).
+        """
+        rows, _ = self._candidates(x, y, width, height)
+        return bool(self._hits(rows, x, y, width, height, self.solid).any())
+
+    def remaining(self, mask):
+        """
+        Number of live entities with a component set, e.g. world.remaining(world.collectible).
+        """
+        n = self.count
+        return int(np.count_nonzero(self.alive[:n] & (mask[:n] != 0)))
+
+    def draw(self, screen, x, y, width, height, offset=(0, 0), skip=None):
+        """
+        Draws the renderable entities overlapping the view rectangle.
+
+        Parameters:
+        - skip: Component column whose entities are not drawn (e.g. solid walls baked into chunks)
+
+        Returns:
+        - Number of entities drawn
+        """
+        ids = self.query(x, y, width, height)
+        visible = self.shape[ids] != SHAPE_NONE
+        if skip is not None:
+            visible &= ~skip[ids]
+        ids = ids[visible]
+        ox, oy = offset
+        for shape, (px, py, pw, ph), color in zip(
+            self.shape[ids].tolist(),
+            np.stack([self.x[ids] + ox, self.y[ids] + oy, self.w[ids], self.h[ids]], axis=1).tolist(),
+            self.color[ids].tolist(),
+        ):
+            if shape == SHAPE_COIN:
+                screen.blit(coin_image(int(pw)), (px, py))
+            else:
+                screen.fill(color, (px, py, pw, ph))
+        return len(ids)
@@ -0,0 +1,459 @@
+import numpy as np
+import pygame
+
+COIN_COLOR = (255, 223, 0)  # Gold
+_coin_images = {}  # Diameter -> Surface
+
+
+def coin_image(diameter):
+    """
+    The coin picture for a diameter, drawn once and shared by every coin of that size.
+    """
+    image = _coin_images.get(diameter)
+    if image is None:
+        image = pygame.Surface((diameter, diameter), pygame.SRCALPHA)
+        pygame.draw.circle(image, COIN_COLOR, (diameter // 2, diameter // 2), diameter // 2)
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()
+        _coin_images[diameter] = image
+    return image
+
+
+class InvisibleObstacle:
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x, y, width, height):
+        """
+        Initializes an invisible obstacle (furniture drawn into the background image).
+
+        Parameters:
+        - x, y: Position of the obstacle
+        - width, height: Size of the obstacle
+        """
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def collides_with(self, x, y, width, height):
+        """
+        Checks if a given rectangle (player) collides with this obstacle.
+
+        Parameters:
+        - x, y: Position of the rectangle
+        - width, height: Size of the rectangle
+
+        Returns:
+        - True if there's a collision, False otherwise
+        """
+        return (
+            x < self.x + self.width
+            and x + width > self.x
+            and y < self.y + self.height
+            and y + height > self.y
+        )
+
+
+class Obstacle:
+    __slots__ = ("x", "y", "width", "height", "color")
+    default_color = (0, 0, 0)
+
+    def __init__(self, x, y, width, height, color=default_color):
+        """
+        Initializes an obstacle.
+
+        Parameters:
+        - x, y: Position of the obstacle
+        - width, height: Size of the obstacle
+        - color: Color of the obstacle (default is black)
+        """
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.color = color  # New color parameter
+
+    def draw(self, screen, offset=(0, 0)):
+        """
+        Draws the obstacle on the screen.
+
+        Parameters:
+        - screen: The game screen where the obstacle will be drawn
+        - offset: Camera offset added to the position
+        """
+        screen.fill(self.color, (self.x + offset[0], self.y + offset[1], self.width, self.height))  # Use the color
+
+    def collides_with(self, x, y, width, height):
+        """
+        Checks if a given rectangle (player) collides with this obstacle.
+
+        Parameters:
+        - x, y: Position of the rectangle
+        - width, height: Size of the rectangle
+
+        Returns:
+        - True if there's a collision, False otherwise
+        """
+        return (
+            x < self.x + self.width
+            and x + width > self.x
+            and y < self.y + self.height
+            and y + height > self.y
+        )
+
+
+class Item:
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x, y, width, height):
+        """
+        Initializes an item to be collected (looks like a coin).
+
+        Parameters:
+        - x, y: Position of the item
+        - width, height: Size of the item (for a coin, width == height)
+        """
+        self.x = x
+        self.y = y
+        self.width = width  # Diameter of the coin (same for both width and height)
+        self.height = height  # Diameter of the coin (same for both width and height)
+
+    def draw(self, screen, offset=(0, 0)):
+        """
+        Draws the item (money) on the screen as a coin.
+
+        Parameters:
+        - screen: The game screen where the item will be drawn
+        - offset: Camera offset added to the position
+        """
+        # Every coin of a size shares one pre-drawn image
+        screen.blit(coin_image(int(self.width)), (self.x + offset[0], self.y + offset[1]))
+
+    def collides_with(self, x, y, width, height):
+        """
+        Checks if a given rectangle (player) collides with this item.
+
+        Parameters:
+        - x, y: Position of the rectangle
+        - width, height: Size of the rectangle
+
+        Returns:
+        - True if there's a collision, False otherwise
+        """
+        return (
+            x < self.x + self.width
+            and x + width > self.x
+            and y < self.y + self.height
+            and y + height > self.y
+        )
+
+
+class Laser:
+    __slots__ = ("x", "y", "width", "height", "color")
+    default_color = (255, 0, 0)
+
+    def __init__(self, x, y, width, height, color=default_color):
+        """
+        Initializes a laser.
+
+        Parameters:
+        - x, y: Position of the laser
+        - width, height: Size of the laser (can be a thin rectangle)
+        - color: Color of the laser (default is red)
+        """
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.color = color
+
+    def draw(self, screen, offset=(0, 0)):
+        """
+        Draws the laser on the screen.
+
+        Parameters:
+        - screen: The game screen where the laser will be drawn
+        - offset: Camera offset added to the position
+        """
+        screen.fill(self.color, (self.x + offset[0], self.y + offset[1], self.width, self.height))  # Use the color
+
+    def collides_with(self, x, y, width, height):
+        """
+        Checks if a given rectangle (player) collides with this laser.
+
+        Parameters:
+        - x, y: Position of the rectangle (player)
+        - width, height: Size of the rectangle (player)
+
+        Returns:
+        - True if there's a collision, False otherwise
+        """
+        return (
+            x < self.x + self.width
+            and x + width > self.x
+            and y < self.y + self.height
+            and y + height > self.y
+        )
+    def laser_sound(self, sound_path):
+        sound = pygame.mixer.Sound("src/assets/laser.mp3")
+        sound.play()
+
+
+class RectView:
+    """
+    Lightweight handle onto one row of a RectTable.
+
+    It exposes the same x/y/width/height/color attributes as the entity
+    classes above, so their draw and collides_with methods can be reused
+    on a view without creating a full object per entity.
+    """
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def x(self):
+        return float(self.table.x[self.index])
+
+    @property
+    def y(self):
+        return float(self.table.y[self.index])
+
+    @property
+    def width(self):
+        return float(self.table.width[self.index])
+
+    @property
+    def height(self):
+        return float(self.table.height[self.index])
+
+    @property
+    def color(self):
+        return self.table.color
+
+    def draw(self, screen, offset=(0, 0)):
+        self.table.kind.draw(self, screen, offset)
+
+    def collides_with(self, x, y, width, height):
+        return self.table.kind.collides_with(self, x, y, width, height)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, RectView)
+            and other.table is self.table
+            and other.index == self.index
+        )
+
+    def __hash__(self):
+        return hash((id(self.table), self.index))
+
+
+class RectTable:
+    """
+    Struct-of-arrays storage for every entity of one kind in a level.
+
+    Each column is a contiguous NumPy array, so a level with 100k walls costs
+    a few megabytes instead of 100k Python objects, and collision / draw
+    queries run as one vectorized test over the whole table.
+
+    The table behaves like the lists the level dicts used to hold: it can be
+    iterated, indexed, sliced, measured with len() and have entries removed,
+    so Player and Game code can use either.
+    """
+
+    __slots__ = ("kind", "color", "x", "y", "width", "height", "alive", "_count", "_alive_count")
+
+    def __init__(self, kind, capacity=64, color=None):
+        """
+        Parameters:
+        - kind: Entity class whose draw/collides_with the views delegate to
+        - capacity: Initial number of rows to allocate
+        - color: Shared color for every entity in the table (optional)
+        """
+        self.kind = kind
+        self.color = color if color is not None else getattr(kind, "default_color", (0, 0, 0))
+        capacity = max(1, capacity)
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.width = np.zeros(capacity, dtype=np.float32)
+        self.height = np.zeros(capacity, dtype=np.float32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self._count = 0  # Rows in use (alive or removed)
+        self._alive_count = 0
+
+    @classmethod
+    def from_entities(cls, kind, entities, color=None):
+        """
+        Builds a table from a list of entity objects (Obstacle, Item, ...).
+        """
+        table = cls(kind, len(entities), color)
+        for entity in entities:
+            table.append(entity.x, entity.y, entity.width, entity.height)
+        return table
+
+    @classmethod
+    def from_arrays(cls, kind, x, y, width, height, color=None):
+        """
+        Builds a table directly from column arrays, without a Python loop.
+        """
+        count = len(x)
+        table = cls(kind, count, color)
+        table.x[:count] = x
+        table.y[:count] = y
+        table.width[:count] = width
+        table.height[:count] = height
+        table.alive[:count] = True
+        table._count = count
+        table._alive_count = count
+        return table
+
+    def _grow(self):
+        capacity = len(self.x) * 2
+        for name in ("x", "y", "width", "height", "alive"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: len(column)] = column
+            setattr(self, name, grown)
+
+    def append(self, x, y, width, height):
+        """
+        Adds a rectangle to the table and returns its row index.
+        """
+        if self._count == len(self.x):
+            self._grow()
+        index = self._count
+        self.x[index] = x
+        self.y[index] = y
+        self.width[index] = width
+        self.height[index] = height
+        self.alive[index] = True
+        self._count += 1
+        self._alive_count += 1
+        return index
+
+    def remove(self, entity):
+        """
+        Removes an entity (a view or a row index). Rows are tombstoned rather
+        than compacted so existing views and indices stay valid.
+        """
+        index = entity.index if isinstance(entity, RectView) else entity
+        if self.alive[index]:
+            self.alive[index] = False
+            self._alive_count -= 1
+
+    def clear(self):
+        self.alive[: self._count] = False
+        self._count = 0
+        self._alive_count = 0
+
+    def indices(self):
+        """
+        Returns the row indices of all live entities.
+        """
+        return np.flatnonzero(self.alive[: self._count])
+
+    def colliding(self, x, y, width, height):
+        """
+        Returns the row indices of live entities overlapping the rectangle.
+
+        Uses the same strict inequalities as the entity collides_with methods.
+        """
+        n = self._count
+        hits = (
+            self.alive[:n]
+            & (x < self.x[:n] + self.width[:n])
+            & (x + width > self.x[:n])
+            & (y < self.y[:n] + self.height[:n])
+            & (y + height > self.y[:n])
+        )
+        return np.flatnonzero(hits)
+
+    def collides_any(self, x, y, width, height):
+        """
+        True if any live entity overlaps the rectangle.
+        """
+        return len(self.colliding(x, y, width, height)) > 0
+
+    def draw(self, screen, indices=None, offset=(0, 0)):
+        """
+        Draws the given rows (all live rows by default) using the entity kind's
+        draw method on a reused view.
+        """
+        if indices is None:
+            indices = self.indices()
+        view = RectView(self, 0)
+        draw = self.kind.draw
+        for index in indices:
+            view.index = int(index)
+            draw(view, screen, offset)
+
+    def __len__(self):
+        return self._alive_count
+
+    def __iter__(self):
+        for index in self.indices():
+            yield RectView(self, int(index))
+
+    def __getitem__(self, key):
+        live = self.indices()
+        if isinstance(key, slice):
+            return [RectView(self, int(index)) for index in live[key]]
+        return RectView(self, int(live[key]))
+
+
+def collides_any(entities, x, y, width, height):
+    """
+    True if the rectangle overlaps any entity in a list, RectTable or other
+    collection with its own collides_any.
+    """
+    if hasattr(entities, "collides_any"):
+        return entities.collides_any(x, y, width, height)
+    for entity in entities:
+        if entity.collides_with(x, y, width, height):
+            return True
+    return False
+
+
+def bucket_rects(ids, x, y, width, height, cell_size, cols, rows):
+    """
+    Groups rectangles into the grid cells they overlap, without a Python loop
+    over the rectangles.
+
+    Parameters:
+    - ids: Array of ids to store for each rectangle
+    - x, y, width, height: Bounds arrays, one entry per rectangle
+    - cell_size: Side of a grid cell
+    - cols, rows: Grid dimensions (rectangles outside are clamped to the edge)
+
+    Returns:
+    - Dict mapping flat cell index (row * cols + col) to an array of ids
+    """
+    c0 = np.clip((x // cell_size).astype(np.int64), 0, cols - 1)
+    r0 = np.clip((y // cell_size).astype(np.int64), 0, rows - 1)
+    c1 = np.clip(((x + width - 1e-3) // cell_size).astype(np.int64), 0, cols - 1)
+    r1 = np.clip(((y + height - 1e-3) // cell_size).astype(np.int64), 0, rows - 1)
+
+    # Expand each rectangle into one entry per cell it spans
+    span_w = c1 - c0 + 1
+    counts = span_w * (r1 - r0 + 1)
+    owner = np.repeat(np.arange(len(ids)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cells = (r0[owner] + local // span_w[owner]) * cols + c0[owner] + local % span_w[owner]
+
+    order = np.argsort(cells, kind="stable")
+    cells, owner = cells[order], np.asarray(ids)[owner[order]]
+    keys, starts = np.unique(cells, return_index=True)
+    return {int(k): v for k, v in zip(keys, np.split(owner, starts[1:]))}
+
+
+def merge_buckets(buckets, added):
+    """
+    Adds the cells of a bucket_rects result to an existing one in place,
+    so a few new rectangles do not mean rebinning all of them.
+    """
+    for cell, ids in added.items():
+        existing = buckets.get(cell)
+        buckets[cell] = ids if existing is None else np.concatenate([existing, ids])
@@ -0,0 +1,243 @@
+import numpy as np
+
+from controls import DOWN, LEFT, RIGHT, UP
+from entities import InvisibleObstacle, RectTable
+from guards import GuardSystem
+from levelgen import PLAYER_SIZE
+from swings import SwingField
+from tripwires import TripwireField
+
+PLAYER_SPEED = 2.5
+COIN_SIZE = 20
+COIN_MARGIN = 50  # Coins are kept this far from the level edge, as in Game.generate_items
+
+COIN_REWARD = 1.0
+DEATH_REWARD = -10.0
+CLEAR_REWARD = 10.0
+
+
+def rect_columns(entities):
+    """
+    x, y, width, height of a list of entities or a RectTable, as float64 arrays.
+    """
+    table = entities if isinstance(entities, RectTable) else RectTable.from_entities(InvisibleObstacle, entities)
+    rows = table.indices()
+    return tuple(column[rows].astype(np.float64) for column in (table.x, table.y, table.width, table.height))
+
+
+def overlap_grid(xs, ys, width, height, rects):
+    """
+    For every (row, column) pair of positions, True if a width x height
+    rectangle there overlaps any of the rects (same test as collides_with).
+
+    Rows and columns are tested separately and combined with one matrix
+    product, instead of testing every grid point against every rect.
+    """
+    rx, ry, rw, rh = rects
+    if len(rx) == 0:
+        return np.zeros((len(ys), len(xs)), dtype=bool)
+    cols = (xs[None, :] < (rx + rw)[:, None]) & (xs[None, :] + width > rx[:, None])
+    rows = (ys[None, :] < (ry + rh)[:, None]) & (ys[None, :] + height > ry[:, None])
+    return (rows.T.astype(np.float32) @ cols.astype(np.float32)) > 0
+
+
+class HeistVecEnv:
+    def __init__(self, level, num_envs, num_coins=50, max_steps=3000, obs_cell=20, seed=None):
+        """
+        N copies of one level stepped in lockstep, for training and
+        evaluating autoplay agents.
+
+        Every instance lives in the same NumPy arrays and one step advances
+        all of them without a Python loop per instance:
+        - The player only ever moves in PLAYER_SPEED steps from the start, so
+          positions are indices into a lattice whose free cells are
+          precomputed; a move is one gather per direction.
+        - Coins are an (N, num_coins) alive mask over per-instance positions.
+        - Lasers, tripwires, swings and guards follow fixed schedules, so
+          swing and guard positions are tabulated per step once and looked up
+          with each instance's own step count.
+
+        Parameters:
+        - level: Level dict, e.g. Game.levels[i] or a generated level
+        - num_envs: Number of instances
+        - num_coins: Coins placed per instance on reset
+        - max_steps: Steps before an episode is truncated
+        - obs_cell: Pixel size of an occupancy grid cell in the observations
+        - seed: Seed for the first reset's coin placement
+        """
+        self.num_envs = n = num_envs
+        self.num_coins = num_coins
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+        width, height = self.size = level.get("size", (1000, 800))
+        start_x, start_y = level.get("start", (40, 680))
+        player_w, player_h = PLAYER_SIZE
+        walls = rect_columns(level["obstacles"])
+        solid = tuple(
+            np.concatenate(pair) for pair in zip(walls, rect_columns(level.get("invisibleObstacle", [])))
+        )
+
+        # Movement lattice: xs[i], ys[j] are every position the player can reach
+        self.xs = start_x - PLAYER_SPEED * np.ceil(start_x / PLAYER_SPEED) + PLAYER_SPEED * np.arange(
+            int(np.ceil((width + start_x) / PLAYER_SPEED)) + 2
+        )
+        self.ys = start_y - PLAYER_SPEED * np.ceil(start_y / PLAYER_SPEED) + PLAYER_SPEED * np.arange(
+            int(np.ceil((height + start_y) / PLAYER_SPEED)) + 2
+        )
+        self.free = ~overlap_grid(self.xs, self.ys, player_w, player_h, solid)
+        self.start = (int(np.ceil(start_x / PLAYER_SPEED)), int(np.ceil(start_y / PLAYER_SPEED)))
+        self.max_x = width - player_w
+        self.max_y = height - player_h
+
+        # Every integer position a coin may take (same rule as Game.generate_items)
+        coin_xs = np.arange(COIN_MARGIN, width - COIN_MARGIN + 1, dtype=np.float64)
+        coin_ys = np.arange(COIN_MARGIN, height - COIN_MARGIN + 1, dtype=np.float64)
+        coin_free = ~overlap_grid(coin_xs, coin_ys, COIN_SIZE, COIN_SIZE, solid)
+        self.coin_rows, self.coin_cols = np.nonzero(coin_free)
+        self.coin_xs, self.coin_ys = coin_xs, coin_ys
+
+        # Hazards
+        self.lasers = rect_columns(level.get("lasers", []))
+        self.tripwires = TripwireField(level["movingLasers"]) if level.get("movingLasers") else None
+        self.swing_ends = None
+        if level.get("swings"):
+            swings = SwingField(level["swings"])
+            ends = np.zeros((max_steps + 1, 2, len(swings)))
+            ends[0] = swings.ends()
+            for t in range(1, max_steps + 1):
+                swings.step()
+                ends[t] = swings.ends()
+            self.swing_ends, self.swing_half = ends, swings.half_bob
+        self.guards = None
+        if level.get("guards"):
+            self.guards = GuardSystem(level["guards"], level["obstacles"])
+            positions = np.zeros((max_steps + 1, len(self.guards), 2))
+            headings = np.zeros((max_steps + 1, len(self.guards)))
+            positions[0], headings[0] = self.guards.position, self.guards.heading
+            for t in range(1, max_steps + 1):
+                self.guards.update()
+                positions[t], headings[t] = self.guards.position, self.guards.heading
+            self.guard_positions, self.guard_headings = positions, headings
+
+        # State
+        self.ix = np.zeros(n, dtype=np.int64)
+        self.iy = np.zeros(n, dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.coin_x = np.zeros((n, num_coins))
+        self.coin_y = np.zeros((n, num_coins))
+        self.alive = np.zeros((n, num_coins), dtype=bool)
+
+        # Preallocated observation buffers, rewritten in place every step
+        grid_w, grid_h = -(-width // obs_cell), -(-height // obs_cell)
+        blocked = overlap_grid(
+            np.arange(grid_w) * float(obs_cell), np.arange(grid_h) * float(obs_cell), obs_cell, obs_cell, solid
+        )
+        self.obs = {
+            "grid": np.broadcast_to(blocked.astype(np.uint8), (n, grid_h, grid_w)),  # Walls and furniture (read-only)
+            "player": np.zeros((n, 2), dtype=np.float32),  # Position / level size
+            "coins": np.zeros((n, num_coins, 3), dtype=np.float32),  # x, y (/ level size), alive
+        }
+        self.reward = np.zeros(n, dtype=np.float32)
+        self.terminated = np.zeros(n, dtype=bool)
+        self.truncated = np.zeros(n, dtype=bool)
+
+    def reset(self, seed=None):
+        """
+        Starts a new episode in every instance.
+
+        Returns:
+        - The observation dict (views of the preallocated buffers)
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset(np.ones(self.num_envs, dtype=bool))
+        self._observe()
+        return self.obs
+
+    def _reset(self, mask):
+        count = int(mask.sum())
+        self.ix[mask], self.iy[mask] = self.start
+        self.steps[mask] = 0
+        picks = self.rng.integers(0, len(self.coin_rows), (count, self.num_coins))
+        self.coin_x[mask] = self.coin_xs[self.coin_cols[picks]]
+        self.coin_y[mask] = self.coin_ys[self.coin_rows[picks]]
+        self.alive[mask] = True
+
+    def step(self, actions):
+        """
+        Advances every instance by one game tick.
+
+        Parameters:
+        - actions: (N,) integer bitmasks of held directions (bit LEFT, RIGHT,
+          UP, DOWN, as InputBuffer.mask)
+
+        Returns:
+        - obs, reward, terminated, truncated, info. Finished instances are
+          reset straight away; obs already shows their new episode.
+        """
+        actions = np.asarray(actions)
+        ix, iy, xs, ys, free = self.ix, self.iy, self.xs, self.ys, self.free
+        self.steps += 1
+
+        # Same order and checks as Player.move: left, right, up, down
+        go = (actions >> LEFT & 1).astype(bool) & (xs[ix] > 0)
+        ix -= go & free[iy, ix - 1]
+        go = (actions >> RIGHT & 1).astype(bool) & (xs[ix] < self.max_x)
+        ix += go & free[iy, np.minimum(ix + 1, len(xs) - 1)]
+        go = (actions >> UP & 1).astype(bool) & (ys[iy] > 0)
+        iy -= go & free[iy - 1, ix]
+        go = (actions >> DOWN & 1).astype(bool) & (ys[iy] < self.max_y)
+        iy += go & free[np.minimum(iy + 1, len(ys) - 1), ix]
+        x, y = xs[ix], ys[iy]
+        player_w, player_h = PLAYER_SIZE
+
+        # Coins
+        px, py = x[:, None], y[:, None]
+        picked = (
+            self.alive
+            & (px < self.coin_x + COIN_SIZE)
+            & (px + player_w > self.coin_x)
+            & (py < self.coin_y + COIN_SIZE)
+            & (py + player_h > self.coin_y)
+        )
+        self.alive &= ~picked
+        reward = self.reward
+        reward[:] = COIN_REWARD * picked.sum(axis=1)
+
+        # Hazards
+        lx, ly, lw, lh = self.lasers
+        dead = ((px < lx + lw) & (px + player_w > lx) & (py < ly + lh) & (py + player_h > ly)).any(axis=1)
+        if self.tripwires is not None:
+            dead |= self.tripwires.hits_many(self.steps, x, y, player_w, player_h)
+        steps = np.minimum(self.steps, self.max_steps)
+        if self.swing_ends is not None:
+            end_x, end_y = self.swing_ends[steps, 0], self.swing_ends[steps, 1]
+            half = self.swing_half
+            dead |= (
+                (px < end_x + half) & (px + player_w > end_x - half) & (py < end_y + half) & (py + player_h > end_y - half)
+            ).any(axis=1)
+        if self.guards is not None:
+            dead |= self.guards.sees_many(
+                x, y, player_w, player_h, self.guard_positions[steps], self.guard_headings[steps]
+            )
+
+        cleared = ~self.alive.any(axis=1)
+        reward += np.where(dead, DEATH_REWARD, 0) + np.where(cleared & ~dead, CLEAR_REWARD, 0)
+        np.logical_or(dead, cleared, out=self.terminated)
+        np.logical_and(self.steps >= self.max_steps, ~self.terminated, out=self.truncated)
+
+        done = self.terminated | self.truncated
+        if done.any():
+            self._reset(done)
+        self._observe()
+        return self.obs, reward, self.terminated, self.truncated, {}
+
+    def _observe(self):
+        width, height = self.size
+        player = self.obs["player"]
+        player[:, 0] = self.xs[self.ix] / width
+        player[:, 1] = self.ys[self.iy] / height
+        coins = self.obs["coins"]
+        coins[..., 0] = self.coin_x / width
+        coins[..., 1] = self.coin_y / height
+        coins[..., 2] = self.alive
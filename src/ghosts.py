@@ -0,0 +1,165 @@
+import mmap
+import os
+import time
+
+import numpy as np
+
+MAGIC = b"HGS1"
+RECORD = np.dtype([("tick", "<u4"), ("x", "<f4"), ("y", "<f4"), ("frame", "u1")])  # 13 bytes, no padding
+FACING_BIT = 0x80  # frame byte: facing in the top bit, animation frame below
+GHOST_ALPHA = 110
+
+
+def pack_frame(facing, frame):
+    return (FACING_BIT if facing else 0) | frame
+
+
+class GhostTrack:
+    def __init__(self, path):
+        """
+        A recorded run of one level, read through mmap.
+
+        The file is a 4-byte magic followed by fixed-width RECORD rows, one
+        per tick from the first recorded tick on, so the row for a tick is
+        found by index without reading the rest of the file; only the pages
+        touched are ever loaded.
+
+        Parameters:
+        - path: Ghost file written by GhostLibrary.save
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a ghost track")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        count = (len(self.map) - len(MAGIC)) // RECORD.itemsize
+        self.records = np.frombuffer(self.map, dtype=RECORD, count=count, offset=len(MAGIC))
+        self.first = int(self.records["tick"][0]) if count else 0  # Tick of the first row
+
+    def __len__(self):
+        return len(self.records)
+
+    def at(self, tick):
+        """
+        (x, y, facing, frame) at a tick since the level started; the ghost
+        waits at its last position once its run is over.
+        """
+        records = self.records
+        index = min(max(tick - self.first, 0), len(records) - 1)
+        if records["tick"][index] != tick:
+            # Gaps in the ticks (none when recorded every tick): binary search
+            index = max(0, min(int(np.searchsorted(records["tick"], tick, side="right")) - 1, len(records) - 1))
+        record = records[index]
+        frame = int(record["frame"])
+        return float(record["x"]), float(record["y"]), 1 if frame & FACING_BIT else 0, frame & ~FACING_BIT
+
+    def close(self):
+        self.records = None
+        self.map.close()
+
+
+class GhostRecorder:
+    def __init__(self, capacity=4096):
+        """
+        Buffers the live player's track for the level being played.
+        """
+        self.buffer = np.zeros(capacity, dtype=RECORD)
+        self.count = 0
+
+    def start(self):
+        self.count = 0
+
+    def record(self, tick, x, y, facing, frame):
+        if self.count == len(self.buffer):
+            grown = np.zeros(2 * len(self.buffer), dtype=RECORD)
+            grown[: self.count] = self.buffer
+            self.buffer = grown
+        self.buffer[self.count] = (tick, x, y, pack_frame(facing, frame))
+        self.count += 1
+
+    def records(self):
+        return self.buffer[: self.count]
+
+
+class GhostLibrary:
+    def __init__(self, directory="ghosts", keep=10, read_only=False):
+        """
+        Ghost files of completed levels, one directory per level, named by
+        split time so the best runs sort first.
+
+        Parameters:
+        - directory: Root directory for the ghost files
+        - keep: Best runs kept per level (the most recent run is always kept too)
+        - read_only: Open the saved runs but never save or prune any (e.g. when replaying a session)
+        """
+        self.directory = directory
+        self.keep = keep
+        self.read_only = read_only
+
+    def _level_dir(self, level):
+        return os.path.join(self.directory, f"level{level + 1}")
+
+    def _paths(self, level):
+        directory = self._level_dir(level)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".ghost"))
+
+    def save(self, level, time_ms, records):
+        """
+        Writes a completed level's track and prunes the level's slower runs.
+        Tracks of the level must be closed first: an mmapped file cannot be
+        deleted on Windows.
+
+        Returns:
+        - Path of the new file (None if there was nothing to save or the library is read-only)
+        """
+        if len(records) == 0 or self.read_only:
+            return None
+        directory = self._level_dir(level)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time_ms:09d}-{time.time_ns()}.ghost")
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.ascontiguousarray(records, dtype=RECORD).tobytes())
+
+        # Keep the best runs and the newest one
+        paths = self._paths(level)
+        for old in paths[self.keep :]:
+            if old != path:
+                os.remove(old)
+        return path
+
+    def best(self, level, n=1):
+        """
+        Paths of the n fastest runs of a level, fastest first.
+        """
+        return self._paths(level)[:n]
+
+    def latest(self, level):
+        """
+        Path of the most recently completed run of a level, or None.
+        """
+        paths = self._paths(level)
+        return max(paths, key=lambda path: int(os.path.basename(path)[:-6].split("-")[1])) if paths else None
+
+    def open(self, level, n=1):
+        """
+        Opens the n best runs of a level plus the latest one, if it is not among them.
+        """
+        paths = self.best(level, n)
+        latest = self.latest(level)
+        if latest is not None and latest not in paths:
+            paths.append(latest)
+        tracks = []
+        for path in paths:
+            try:
+                track = GhostTrack(path)
+            except (OSError, ValueError) as error:
+                print(f"Ghost skipped: {error}")  # E.g. left empty by a crash while saving
+                continue
+            if len(track):
+                tracks.append(track)
+            else:
+                track.close()
+        return tracks
@@ -0,0 +1,236 @@
+import math
+
+import numpy as np
+import pygame
+
+from entities import RectTable
+
+GUARD_COLOR = (30, 60, 160)
+CONE_COLOR = (255, 255, 150, 70)
+
+
+class Guard:
+    __slots__ = ("patrol", "speed", "view_distance", "fov")
+
+    def __init__(self, patrol, speed=1.5, view_distance=220, fov=60):
+        """
+        Initializes a patrolling security guard.
+
+        Parameters:
+        - patrol: List of (x, y) waypoints the guard walks between, in a loop
+        - speed: Pixels moved per tick
+        - view_distance: How far the guard can see
+        - fov: Width of the vision cone in degrees
+        """
+        self.patrol = patrol
+        self.speed = speed
+        self.view_distance = view_distance
+        self.fov = fov
+
+
+def wall_segments(obstacles):
+    """
+    The four edges of every wall rectangle, as an (S, 4) array of x1, y1, x2, y2.
+    """
+    if isinstance(obstacles, RectTable):
+        rows = obstacles.indices()
+        x, y = obstacles.x[rows], obstacles.y[rows]
+        r, b = x + obstacles.width[rows], y + obstacles.height[rows]
+    else:
+        x = np.array([o.x for o in obstacles], dtype=np.float32)
+        y = np.array([o.y for o in obstacles], dtype=np.float32)
+        r = x + np.array([o.width for o in obstacles], dtype=np.float32)
+        b = y + np.array([o.height for o in obstacles], dtype=np.float32)
+    edges = [(x, y, r, y), (r, y, r, b), (x, b, r, b), (x, y, x, b)]
+    return np.concatenate([np.stack(edge, axis=1) for edge in edges]).astype(np.float64)
+
+
+def cast_rays(origins, directions, max_distance, segments):
+    """
+    Distance along each ray to the nearest segment, capped at max_distance.
+
+    Every ray is tested against every segment in one broadcast (R, S) operation.
+
+    Parameters:
+    - origins: (R, 2) ray start points
+    - directions: (R, 2) unit direction vectors
+    - max_distance: Scalar or (R,) cap on the distance
+    - segments: (S, 4) array of x1, y1, x2, y2
+
+    Returns:
+    - (R,) array of distances
+    """
+    if len(segments) == 0:
+        return np.broadcast_to(np.asarray(max_distance, dtype=np.float64), (len(origins),)).copy()
+    px, py = origins[:, 0:1], origins[:, 1:2]
+    dx, dy = directions[:, 0:1], directions[:, 1:2]
+    ax, ay = segments[:, 0], segments[:, 1]
+    ex, ey = segments[:, 2] - ax, segments[:, 3] - ay
+
+    denom = dx * ey - dy * ex
+    with np.errstate(divide="ignore", invalid="ignore"):
+        qx, qy = ax - px, ay - py
+        t = (qx * ey - qy * ex) / denom
+        u = (qx * dy - qy * dx) / denom
+    hit = (denom != 0) & (t >= 0) & (u >= 0) & (u <= 1)
+    nearest = np.where(hit, t, np.inf).min(axis=1)
+    return np.minimum(nearest, max_distance)
+
+
+def guard_body():
+    body = pygame.Surface((20, 20), pygame.SRCALPHA)
+    pygame.draw.circle(body, GUARD_COLOR, (10, 10), 10)
+    return body
+
+
+class GuardSystem:
+    def __init__(self, guards, obstacles, cone_rays=16):
+        """
+        Moves every guard of a level and tests their line of sight in batches.
+
+        Parameters:
+        - guards: List of Guard objects
+        - obstacles: The level's walls (list or RectTable); guards cannot see through them
+        - cone_rays: Rays used to draw each vision cone
+        """
+        count = len(guards)
+        longest = max((len(g.patrol) for g in guards), default=1)
+        self.waypoints = np.zeros((count, longest, 2))
+        self.waypoint_count = np.array([len(g.patrol) for g in guards], dtype=np.int64)
+        for i, guard in enumerate(guards):
+            self.waypoints[i, : len(guard.patrol)] = guard.patrol
+        self.position = self.waypoints[:, 0].copy()
+        self.target = np.minimum(1, self.waypoint_count - 1)
+        self.speed = np.array([g.speed for g in guards], dtype=np.float64)
+        self.view_distance = np.array([g.view_distance for g in guards], dtype=np.float64)
+        self.half_fov = np.radians([g.fov / 2 for g in guards])
+        self.heading = np.zeros(count)
+        self.segments = wall_segments(obstacles)
+
+        # Fixed ray fan per guard, relative to its heading
+        self.cone_offsets = np.linspace(-1, 1, cone_rays)
+        self.overlay = None  # Reused alpha surface for the vision cones
+        self.body = guard_body()  # Drawn once, blitted per guard
+
+    def __len__(self):
+        return len(self.position)
+
+    def set_walls(self, obstacles):
+        """
+        Replaces the walls the guards cannot see through (after a level edit).
+        """
+        self.segments = wall_segments(obstacles)
+
+    def __getstate__(self):
+        # Surfaces cannot be pickled (Game.snapshot); they are rebuilt on load
+        state = self.__dict__.copy()
+        del state["overlay"], state["body"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.overlay = None
+        self.body = guard_body()
+
+    def update(self):
+        """
+        Walks every guard one tick towards its next waypoint.
+        """
+        rows = np.arange(len(self.position))
+        goal = self.waypoints[rows, self.target]
+        delta = goal - self.position
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        arrived = distance <= self.speed
+        step = np.where(arrived, 1.0, self.speed / np.maximum(distance, 1e-9))[:, None]
+        moving = distance > 0
+        self.heading = np.where(moving, np.arctan2(delta[:, 1], delta[:, 0]), self.heading)
+        self.position += delta * step
+        self.target = np.where(arrived, (self.target + 1) % self.waypoint_count, self.target)
+
+    def advance(self, tick):
+        """
+        Walks the guards once per game tick.
+        """
+        self.update()
+
+    def touches(self, x, y, width, height):
+        return self.sees(x, y, width, height)
+
+    def sees(self, x, y, width, height):
+        """
+        True if any guard has an unobstructed view of the rectangle's centre.
+        """
+        target = np.array([x + width / 2, y + height / 2])
+        delta = target - self.position
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        angle = np.arctan2(delta[:, 1], delta[:, 0]) - self.heading
+        angle = (angle + math.pi) % (2 * math.pi) - math.pi
+        candidates = (distance <= self.view_distance) & (np.abs(angle) <= self.half_fov)
+        if not candidates.any():
+            return False
+
+        origins = self.position[candidates]
+        directions = delta[candidates] / np.maximum(distance[candidates], 1e-9)[:, None]
+        clear = cast_rays(origins, directions, distance[candidates], self.segments)
+        return bool((clear >= distance[candidates] - 1e-6).any())
+
+    def sees_many(self, x, y, width, height, position, heading):
+        """
+        sees for many rectangles at once, each against its own guard positions.
+
+        Parameters:
+        - x, y: (N,) arrays
+        - width, height: Scalars or (N,) arrays
+        - position: (N, G, 2) guard positions for each rectangle
+        - heading: (N, G) guard headings
+
+        Returns:
+        - (N,) boolean array
+        """
+        target = np.stack([x + np.divide(width, 2), y + np.divide(height, 2)], axis=-1)
+        delta = target[:, None, :] - position
+        distance = np.hypot(delta[..., 0], delta[..., 1])
+        angle = np.arctan2(delta[..., 1], delta[..., 0]) - heading
+        angle = (angle + math.pi) % (2 * math.pi) - math.pi
+        candidates = (distance <= self.view_distance) & (np.abs(angle) <= self.half_fov)
+        seen = np.zeros(len(target), dtype=bool)
+        pairs = np.nonzero(candidates)
+        if len(pairs[0]) == 0:
+            return seen
+
+        # One ray per (rectangle, guard) pair that passed the cone test
+        near = distance[pairs]
+        directions = delta[pairs] / np.maximum(near, 1e-9)[:, None]
+        clear = cast_rays(position[pairs], directions, near, self.segments)
+        seen[pairs[0][clear >= near - 1e-6]] = True
+        return seen
+
+    def cones(self):
+        """
+        Vision cone polygons, one (rays + 1, 2) array per guard.
+        """
+        angles = (self.heading[:, None] + self.cone_offsets[None, :] * self.half_fov[:, None]).ravel()
+        rays = len(self.cone_offsets)
+        origins = np.repeat(self.position, rays, axis=0)
+        directions = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        reach = cast_rays(origins, directions, np.repeat(self.view_distance, rays), self.segments)
+        ends = (origins + directions * reach[:, None]).reshape(len(self.position), rays, 2)
+        return [np.vstack([self.position[i], ends[i]]) for i in range(len(self.position))]
+
+    def draw(self, screen, offset=(0, 0)):
+        """
+        Draws the vision cones (translucent) and the guards.
+
+        Parameters:
+        - screen: The game screen where the guards will be drawn
+        - offset: Camera offset added to the positions
+        """
+        if self.overlay is None or self.overlay.get_size() != screen.get_size():
+            self.overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+        self.overlay.fill((0, 0, 0, 0))
+        shift = np.array(offset)
+        for cone in self.cones():
+            pygame.draw.polygon(self.overlay, CONE_COLOR, (cone + shift).tolist())
+        screen.stream(self.overlay, (0, 0))  # Redrawn every frame
+        for gx, gy in (self.position + shift).tolist():
+            screen.blit(self.body, (gx - 10, gy - 10))
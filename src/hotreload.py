@@ -0,0 +1,270 @@
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from ecs import ARCHETYPES
+from entities import InvisibleObstacle, Laser, Obstacle, collides_any
+from guards import Guard
+from swings import Swing
+from systems import HAZARD_FIELDS, build_hazard
+from tripwires import BlinkingLaser, RotatingLaser, SweepingLaser
+
+# Static rectangle keys and the entity class each entry becomes
+RECT_KEYS = {"obstacles": Obstacle, "invisibleObstacle": InvisibleObstacle, "lasers": Laser}
+SOLID_KEYS = ("obstacles", "invisibleObstacle")
+
+# Animated hazard keys: entries are dicts of constructor arguments ("type" picks the class for tripwires)
+HAZARD_CLASSES = {
+    "movingLasers": {cls.__name__: cls for cls in (BlinkingLaser, SweepingLaser, RotatingLaser)},
+    "swings": {"Swing": Swing},
+    "guards": {"Guard": Guard},
+}
+
+
+def rect_entry(entity):
+    entry = [entity.x, entity.y, entity.width, entity.height]
+    color = getattr(entity, "color", None)
+    if color is not None and tuple(color) != tuple(type(entity).default_color):
+        entry.append(list(color))
+    return entry
+
+
+def hazard_entry(entity):
+    entry = {"type": type(entity).__name__}
+    for name in type(entity).__slots__:
+        value = getattr(entity, name)
+        entry[name] = [list(point) for point in value] if name == "patrol" else value
+    return entry
+
+
+def level_to_json(level):
+    """
+    The hand-editable part of a level dict (geometry and hazards, not items) as JSON-ready data.
+    """
+    data = {key: list(level[key]) for key in ("size", "start") if key in level}
+    for key in RECT_KEYS:
+        data[key] = [rect_entry(entity) for entity in level.get(key, [])]
+    for key in HAZARD_CLASSES:
+        data[key] = [hazard_entry(entity) for entity in level.get(key, [])]
+    return data
+
+
+def rect_entity(cls, entry):
+    x, y, width, height, *color = entry
+    return cls(x, y, width, height, tuple(color[0])) if color else cls(x, y, width, height)
+
+
+def hazard_entity(key, entry):
+    entry = dict(entry)
+    cls = HAZARD_CLASSES[key][entry.pop("type", next(iter(HAZARD_CLASSES[key])))]
+    if "patrol" in entry:
+        entry["patrol"] = [tuple(point) for point in entry["patrol"]]
+    return cls(**entry)
+
+
+class LevelWatcher:
+    def __init__(self, directory, levels, poll_every=10):
+        """
+        Watches one JSON definition file per hand-made level (level1.json, ...).
+
+        Files that do not exist yet are written from the levels in main.py,
+        so they start out as an editable copy of the built-in levels.
+
+        Parameters:
+        - directory: Directory of the level files
+        - levels: Game.levels, for the initial export
+        - poll_every: Ticks between checks of the files' modification times
+        """
+        self.directory = directory
+        self.poll_every = poll_every
+        self.stamps = {}
+        os.makedirs(directory, exist_ok=True)
+        for index, level in enumerate(levels):
+            path = self.path(index)
+            if not os.path.exists(path):
+                with open(path, "w") as f:
+                    json.dump(level_to_json(level), f, indent=1)
+                self.stamps[index] = os.stat(path).st_mtime_ns
+            else:
+                self.stamps[index] = None  # Picked up by the first poll
+
+    def path(self, index):
+        return os.path.join(self.directory, f"level{index + 1}.json")
+
+    def poll(self, tick):
+        """
+        Returns:
+        - List of (level index, definition) for the files changed since the last poll
+        """
+        if tick % self.poll_every:
+            return []
+        changed = []
+        for index, stamp in self.stamps.items():
+            try:
+                mtime = os.stat(self.path(index)).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime == stamp:
+                continue
+            try:
+                with open(self.path(index)) as f:
+                    data = json.load(f)
+            except ValueError as error:
+                print(f"Level {index + 1} not reloaded: {error}")  # Likely saved half way; retried on the next change
+            else:
+                changed.append((index, data))
+            self.stamps[index] = mtime
+        return changed
+
+
+def diff_rects(old, new):
+    """
+    Entries removed from and added to a list of rectangle entries, as lists of tuples.
+    """
+    old = Counter(tuple(tuple(v) if isinstance(v, list) else v for v in entry) for entry in old)
+    new = Counter(tuple(tuple(v) if isinstance(v, list) else v for v in entry) for entry in new)
+    return list((old - new).elements()), list((new - old).elements())
+
+
+def apply_level(game, index, data):
+    """
+    Applies an edited level definition to Game.levels[index] and, if it is
+    the level being played, to the live world: only the rectangles that
+    changed are killed and spawned, only the edited hazard fields are
+    rebuilt, and only the coins that new walls or furniture cover move.
+
+    Returns:
+    - Dict of what changed, for the log line
+    """
+    level = game.levels[index]
+    current = index == game.current_level
+    changes = {}
+
+    if any(tuple(data.get(key, level.get(key, ()))) != tuple(level.get(key, ())) for key in ("size", "start")):
+        # The world's dimensions or spawn moved: nothing to patch, rebuild the level
+        collected = collected_items(game.world, level.get("items", [])) if current else []
+        for key in ("size", "start"):
+            if key in data:
+                level[key] = tuple(data[key])
+        for key, cls in RECT_KEYS.items():
+            level[key] = [rect_entity(cls, entry) for entry in data.get(key, [])]
+        for key in HAZARD_CLASSES:
+            level[key] = [hazard_entity(key, entry) for entry in data.get(key, [])]
+        if current:
+            game.enter_level()
+            world = game.world
+            for rect in collected:  # Coins already picked up stay picked up
+                world.kill(world.find(*rect, world.collectible)[:1])
+        return {"rebuilt": 1}
+
+    world = game.world if current else None
+    added_solids = []
+    for key, cls in RECT_KEYS.items():
+        removed, added = diff_rects([rect_entry(entity) for entity in level.get(key, [])], data.get(key, []))
+        if not removed and not added:
+            continue
+        changes[key] = (len(removed), len(added))
+        gone = Counter(removed)
+        kept = []
+        for entity in level.get(key, []):
+            entry = tuple(tuple(v) if isinstance(v, list) else v for v in rect_entry(entity))
+            if gone[entry]:
+                gone[entry] -= 1
+            else:
+                kept.append(entity)
+        level[key] = kept + [rect_entity(cls, entry) for entry in added]
+        if key in SOLID_KEYS:
+            added_solids += [entry[:4] for entry in added]
+
+        if world is None:
+            continue
+        components = ARCHETYPES[key]
+        mask = world.solid if components.get("solid") else world.hazard
+        for entry in removed:
+            world.kill(world.find(*entry[:4], mask)[:1])
+        if added:
+            columns = np.array([entry[:4] for entry in added], dtype=np.float64).T
+            colors = [entry[4] if len(entry) > 4 else components.get("color", (0, 0, 0)) for entry in added]
+            world.spawn(*columns, **{**components, "color": colors if components.get("shape") else (0, 0, 0)})
+        if game.chunks is not None and key in SOLID_KEYS:
+            game.chunks.replace_rects(key, [entry[:4] for entry in removed], [entry[:4] for entry in added])
+        if key == "obstacles":
+            game.flashlight = None  # Rebuilt from the new walls on the next draw
+            guards = game.hazards.get("guards")
+            if guards is not None:
+                guards[0].set_walls(level["obstacles"])
+
+    for key in HAZARD_CLASSES:
+        new = data.get(key, [])
+        if new == [hazard_entry(entity) for entity in level.get(key, [])]:
+            continue
+        changes[key] = len(new)
+        level[key] = [hazard_entity(key, entry) for entry in new]
+        if current:
+            hazard = build_hazard(level, key)
+            game.hazards.pop(key, None)
+            if hazard is not None:
+                hazard[0].advance(game.tick)
+                game.hazards[key] = hazard
+            # Keep the checking order of HAZARD_FIELDS
+            game.hazards = {name: game.hazards[name] for name in HAZARD_FIELDS if name in game.hazards}
+
+    if added_solids:
+        moved = relocate_items(game, level, world, added_solids)
+        if moved:
+            changes["items"] = moved
+    return changes
+
+
+def collected_items(world, items):
+    """
+    Rectangles of the level's coins that are no longer alive in the world, i.e. already picked up.
+    """
+    n = world.count
+    ids = np.flatnonzero(world.alive[:n] & world.collectible[:n])
+    live = Counter(zip(world.x[ids].tolist(), world.y[ids].tolist(), world.w[ids].tolist(), world.h[ids].tolist()))
+    collected = []
+    for item in items:
+        rect = (float(item.x), float(item.y), float(item.width), float(item.height))
+        if live[rect]:
+            live[rect] -= 1
+        else:
+            collected.append(rect)
+    return collected
+
+
+def relocate_items(game, level, world, rects):
+    """
+    Moves the coins covered by new solid rectangles to fresh free spots.
+
+    Returns:
+    - Number of coins moved
+    """
+    solids = [InvisibleObstacle(*rect) for rect in rects]
+    covered = [item for item in level.get("items", []) if collides_any(solids, item.x, item.y, item.width, item.height)]
+    if not covered:
+        return 0
+    level["items"] = [item for item in level["items"] if item not in covered]
+    replacements = game.generate_items(len(covered), covered[0].width, level)
+    level["items"] += replacements
+    if world is not None:
+        live = np.unique(np.concatenate([world.query(*rect, world.collectible) for rect in rects]))
+        world.kill(live)
+        fresh = replacements[: len(live)]
+        if fresh:
+            columns = np.array([(item.x, item.y, item.width, item.height) for item in fresh], dtype=np.float64).T
+            world.spawn(*columns, **ARCHETYPES["items"])
+    return len(covered)
+
+
+class HotReloadSystem:
+    def update(self, game):
+        for index, data in game.level_watcher.poll(game.tick):
+            began = time.perf_counter()
+            changes = apply_level(game, index, data)
+            if changes:
+                elapsed = (time.perf_counter() - began) * 1000
+                print(f"Level {index + 1} reloaded in {elapsed:.2f} ms: {changes}")
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+
+import pygame
+
+HUD_COLOR = (255, 255, 255)
+PANEL_COLOR = (20, 20, 20)
+GLYPHS = "0123456789:/."  # Characters drawn from the pre-rendered atlas
+
+
+def format_time(seconds):
+    """
+    Seconds as M:SS.t (tenths).
+    """
+    minutes, tenths = divmod(int(seconds * 10), 600)
+    return f"{minutes}:{tenths // 10:02d}.{tenths % 10}"
+
+
+class TextCache:
+    def __init__(self, font, max_entries=256):
+        """
+        Rendered text surfaces keyed by (string, colour).
+
+        A string is rendered once and reused until it changes, so steady HUD
+        labels cost one Font.render in total instead of one per frame.
+
+        Parameters:
+        - font: pygame Font used to render
+        - max_entries: Surfaces kept before the least recently used is dropped
+        """
+        self.font = font
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.renders = 0  # Font.render calls so far
+
+    def get(self, text, color):
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.font.render(text, True, color)
+        self.renders += 1
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+class GlyphAtlas:
+    def __init__(self, font, color, glyphs=GLYPHS):
+        """
+        Digits and number punctuation rendered once side by side into one
+        surface; numbers are drawn glyph by glyph from it.
+
+        Parameters:
+        - font: pygame Font used to render
+        - color: Text colour
+        - glyphs: Characters to include
+        """
+        sizes = [font.size(glyph) for glyph in glyphs]
+        self.surface = pygame.Surface((sum(w for w, h in sizes), max(h for w, h in sizes)), pygame.SRCALPHA)
+        self.rects = {}
+        x = 0
+        for glyph, (width, height) in zip(glyphs, sizes):
+            self.surface.blit(font.render(glyph, True, color), (x, 0))
+            self.rects[glyph] = pygame.Rect(x, 0, width, height)
+            x += width
+        self.height = self.surface.get_height()
+
+    def draw(self, screen, text, position):
+        """
+        Draws a string of atlas glyphs. Returns the x coordinate after the last glyph.
+        """
+        x, y = position
+        for glyph in text:
+            rect = self.rects[glyph]
+            screen.blit(self.surface, (x, y), rect)
+            x += rect.width
+        return x
+
+
+class Hud:
+    def __init__(self, font, color=HUD_COLOR, padding=8):
+        """
+        Coins, level, deaths and run time along the top of the screen.
+
+        Labels come from a TextCache and every number from a GlyphAtlas, so
+        drawing the HUD each frame makes no Font.render calls.
+
+        Parameters:
+        - font: pygame Font for the HUD
+        - color: Text colour
+        - padding: Space around and between the fields in pixels
+        """
+        self.text = TextCache(font)
+        self.digits = GlyphAtlas(font, color)
+        self.color = color
+        self.padding = padding
+
+    def draw(self, screen, coins, total, level, deaths, seconds):
+        """
+        Parameters:
+        - screen: The render backend the HUD will be drawn with
+        - coins, total: Coins collected and coins in the level
+        - level: Level number (from 1)
+        - deaths: Restarts this run
+        - seconds: Time since the run started
+        """
+        fields = (
+            ("Coins ", f"{coins}/{total}"),
+            ("Level ", str(level)),
+            ("Deaths ", str(deaths)),
+            ("Time ", format_time(seconds)),
+        )
+        pad = self.padding
+        screen.fill(PANEL_COLOR, (0, 0, screen.get_width(), self.digits.height + 2 * pad))
+        x = pad
+        for label, value in fields:
+            surface = self.text.get(label, self.color)
+            screen.blit(surface, (x, pad))
+            x = self.digits.draw(screen, value, (x + surface.get_width(), pad)) + 3 * pad
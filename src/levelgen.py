@@ -0,0 +1,416 @@
+import random
+import struct
+import sys
+import threading
+import zlib
+
+import numpy as np
+
+from entities import InvisibleObstacle, Item, Laser, Obstacle, RectTable
+
+# On-disk level format: fixed header followed by a zlib-compressed body holding,
+# for each entity kind in KINDS order, its x, y, width and height columns as
+# little-endian uint16 arrays.
+MAGIC = b"HLV1"
+HEADER = struct.Struct("<4sQHHHHIIII")
+KINDS = (
+    ("obstacles", Obstacle),
+    ("invisibleObstacle", InvisibleObstacle),
+    ("items", Item),
+    ("lasers", Laser),
+)
+
+PLAYER_SIZE = (28.4, 32)  # Must match the Player created in Game.__init__
+REACH_STEP = 8  # Grid resolution (pixels) of the reachability check
+
+
+class LevelGenerator:
+    def __init__(
+        self,
+        width=1000,
+        height=800,
+        wall=20,
+        door=70,
+        num_items=50,
+        item_size=20,
+        max_attempts=8,
+    ):
+        """
+        Builds heist levels (rooms, corridors, furniture, lasers and coins) from a seed.
+
+        Parameters:
+        - width, height: Size of the building in pixels
+        - wall: Thickness of the walls
+        - door: Width of the gaps left in walls between rooms
+        - num_items: Number of coins to place
+        - item_size: Size of each coin
+        - max_attempts: Layouts tried before dropping furniture and lasers
+        """
+        self.width = width
+        self.height = height
+        self.wall = wall
+        self.door = door
+        self.num_items = num_items
+        self.item_size = item_size
+        self.max_attempts = max_attempts
+        self.start = (2 * wall, height - 120)
+
+    def generate(self, seed):
+        """
+        Generates a level dict in the same format as Game.levels.
+
+        Every coin is placed where the player can reach it from the start
+        position without crossing furniture, walls or lasers.
+        """
+        rng = random.Random(seed)
+        walls = self._walls(rng)
+        for attempt in range(self.max_attempts + 1):
+            if attempt < self.max_attempts:
+                furniture, lasers = self._furnish(rng)
+            else:
+                furniture, lasers = [], []  # Fall back to an empty building
+            reachable = self._reachable(walls + furniture + lasers)
+            if reachable is not None:
+                break
+        else:
+            # Even the empty building is cut off: the size is too small for its walls and the start
+            raise ValueError(f"No {self.width}x{self.height} level of seed {seed} is reachable from the start {self.start}")
+
+        items = self._place_items(rng, reachable)
+        return make_level(seed, self.width, self.height, self.start, walls, furniture, items, lasers)
+
+    def _splits(self, rng, length, count):
+        """Room boundaries along one axis, evenly spaced with some jitter."""
+        step = length / count
+        jitter = step * 0.2
+        return [0] + [int(step * i + rng.uniform(-jitter, jitter)) for i in range(1, count)] + [length]
+
+    def _walls(self, rng):
+        w, h, t, door = self.width, self.height, self.wall, self.door
+        cols = max(1, w // 250 + rng.randint(-1, 1))
+        rows = max(1, h // 250 + rng.randint(-1, 1))
+        xs = self._splits(rng, w, cols)
+        ys = self._splits(rng, h, rows)
+
+        # Carve a spanning tree over the room grid so every room has a path to
+        # every other, then open a few extra doors to make loops.
+        doors = set()
+        visited = {(0, rows - 1)}
+        stack = [(0, rows - 1)]
+        while stack:
+            c, r = stack[-1]
+            neighbours = [
+                (c + dc, r + dr)
+                for dc, dr in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                if 0 <= c + dc < cols and 0 <= r + dr < rows and (c + dc, r + dr) not in visited
+            ]
+            if not neighbours:
+                stack.pop()
+                continue
+            nxt = rng.choice(neighbours)
+            doors.add(frozenset(((c, r), nxt)))
+            visited.add(nxt)
+            stack.append(nxt)
+        for c in range(cols):
+            for r in range(rows):
+                for nxt in ((c + 1, r), (c, r + 1)):
+                    if nxt[0] < cols and nxt[1] < rows and rng.random() < 0.2:
+                        doors.add(frozenset(((c, r), nxt)))
+
+        walls = [(0, 0, w, t), (0, 0, t, h), (0, h - t, w, t), (w - t, 0, t, h)]
+        for c in range(1, cols):
+            x = xs[c] - t // 2
+            for r in range(rows):
+                y0, y1 = ys[r], ys[r + 1]
+                walls += self._wall_segment(rng, frozenset(((c - 1, r), (c, r))) in doors, x, y0, y1, vertical=True)
+        for r in range(1, rows):
+            y = ys[r] - t // 2
+            for c in range(cols):
+                x0, x1 = xs[c], xs[c + 1]
+                walls += self._wall_segment(rng, frozenset(((c, r - 1), (c, r))) in doors, y, x0, x1, vertical=False)
+
+        self._rooms = [
+            (xs[c] + t, ys[r] + t, xs[c + 1] - xs[c] - 2 * t, ys[r + 1] - ys[r] - 2 * t)
+            for c in range(cols)
+            for r in range(rows)
+        ]
+        return walls
+
+    def _wall_segment(self, rng, has_door, at, start, end, vertical):
+        """One wall between two rooms, split around a door gap if it has one."""
+        t, door = self.wall, self.door
+        if has_door:
+            # Rooms are at least door + 2 * wall long, so the gap always fits
+            # clear of the perpendicular walls at either end
+            gap = rng.randint(start + t, max(start + t, end - t - door))
+            spans = [(start, gap), (gap + door, end)]
+        else:
+            spans = [(start, end)]
+        if vertical:
+            return [(at, a, t, b - a) for a, b in spans if b > a]
+        return [(a, at, b - a, t) for a, b in spans if b > a]
+
+    def _furnish(self, rng):
+        """Furniture and laser tripwires for every room."""
+        furniture, lasers = [], []
+        margin = 45  # Clear strip along the walls so doors stay connected
+        sx, sy = self.start
+        start_zone = (sx - 20, sy - 20, PLAYER_SIZE[0] + 40, PLAYER_SIZE[1] + 40)
+        for rx, ry, rw, rh in self._rooms:
+            inner_w, inner_h = rw - 2 * margin, rh - 2 * margin
+            if inner_w < 40 or inner_h < 40:
+                continue
+            for _ in range(rng.randint(1, 4)):
+                fw = rng.randint(20, max(20, min(120, inner_w)))
+                fh = rng.randint(20, max(20, min(90, inner_h)))
+                fx = rng.randint(rx + margin, rx + margin + inner_w - fw)
+                fy = rng.randint(ry + margin, ry + margin + inner_h - fh)
+                if not _overlaps((fx, fy, fw, fh), start_zone):
+                    furniture.append((fx, fy, fw, fh))
+            if rng.random() < 0.35:
+                # A beam out from one wall, leaving the rest of the room open
+                if rng.random() < 0.5:
+                    bx = rng.randint(rx + margin, rx + rw - margin)
+                    beam = (bx, ry, 5, rh // 2)
+                else:
+                    by = rng.randint(ry + margin, ry + rh - margin)
+                    beam = (rx, by, rw // 2, 5)
+                if not _overlaps(beam, start_zone):
+                    lasers.append(beam)
+        return furniture, lasers
+
+    def _reachable(self, blockers):
+        """
+        Player positions connected to the start on a REACH_STEP grid.
+
+        Returns a boolean (rows, cols) array of reachable top-left positions,
+        or None if a room is cut off from the start.
+        """
+        free = player_free_grid(blockers, self.width, self.height, PLAYER_SIZE, REACH_STEP)
+        si, sj = int(self.start[0] // REACH_STEP), int(self.start[1] // REACH_STEP)
+        if not free[sj, si]:
+            return None
+
+        reachable = connected_region(free, sj, si)
+
+        # Every room centre area must be reachable, otherwise furniture or a
+        # laser has sealed it off.
+        for rx, ry, rw, rh in self._rooms:
+            j0, j1 = int(ry // REACH_STEP), int((ry + rh) // REACH_STEP)
+            i0, i1 = int(rx // REACH_STEP), int((rx + rw) // REACH_STEP)
+            if free[j0:j1, i0:i1].any() and not reachable[j0:j1, i0:i1].any():
+                return None
+        return reachable
+
+    def _place_items(self, rng, reachable):
+        sx, sy = self.start
+        candidates = np.flatnonzero(reachable)
+        gw = reachable.shape[1]
+        xs = (candidates % gw) * REACH_STEP
+        ys = (candidates // gw) * REACH_STEP
+        # Keep coins off the spawn point so a level cannot start half-collected
+        away = (np.abs(xs - sx) > 60) | (np.abs(ys - sy) > 60)
+        xs, ys = xs[away], ys[away]
+        picks = rng.sample(range(len(xs)), min(self.num_items, len(xs)))
+        size = self.item_size
+        return [(int(xs[p]), int(ys[p]), size, size) for p in picks]
+
+    def stream(self, seed):
+        """
+        Lazily yields an endless sequence of levels derived from one seed.
+        """
+        seeds = random.Random(seed)
+        while True:
+            yield self.generate(seeds.getrandbits(63))
+
+
+def _overlaps(a, b):
+    return a[0] < b[0] + b[2] and a[0] + a[2] > b[0] and a[1] < b[1] + b[3] and a[1] + a[3] > b[1]
+
+
+def connected_region(free, row, col):
+    """
+    The cells of a boolean grid 4-connected to (row, col) through free cells.
+
+    Vectorized: every horizontal run of free cells is one node, runs that
+    touch in adjacent rows are joined, and the run graph is labelled by
+    hooking and pointer jumping, so the work grows with the number of runs
+    rather than with the path length a flood fill would walk.
+
+    Returns:
+    - Boolean array shaped like free
+    """
+    starts = free.copy()
+    starts[:, 1:] &= ~free[:, :-1]
+    runs = np.cumsum(starts.ravel()).reshape(free.shape) - 1  # Run id of every free cell
+    count = int(runs[-1, -1]) + 1 if free.size else 0
+
+    # Runs joined by a vertically adjacent pair of free cells
+    both = free[:-1] & free[1:]
+    pairs = np.unique(runs[:-1][both] * count + runs[1:][both])
+    upper, lower = pairs // count, pairs % count
+
+    labels = np.arange(count)
+    while True:
+        lu, ll = labels[upper], labels[lower]
+        differ = lu != ll
+        if not differ.any():
+            break
+        low = np.minimum(lu[differ], ll[differ])
+        np.minimum.at(labels, lu[differ], low)  # Hook each root under the smaller one
+        np.minimum.at(labels, ll[differ], low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return free & (labels[runs] == labels[runs[row, col]])
+
+
+def player_free_grid(blockers, width, height, player_size, step):
+    """
+    Marks grid positions where a player-sized box fits without touching a blocker.
+
+    Parameters:
+    - blockers: List of (x, y, width, height) rectangles
+    - width, height: Size of the level
+    - player_size: (width, height) of the player
+    - step: Grid resolution in pixels
+
+    Returns:
+    - Boolean array indexed [row, col] for the top-left position (col * step, row * step)
+    """
+    gw, gh = int(np.ceil(width / step)), int(np.ceil(height / step))
+    x, y, w, h = np.asarray(blockers, dtype=np.float64).reshape(-1, 4).T
+    i0, j0 = np.maximum(0, x // step).astype(np.intp), np.maximum(0, y // step).astype(np.intp)
+    i1, j1 = np.minimum(gw, np.ceil((x + w) / step)).astype(np.intp), np.minimum(gh, np.ceil((y + h) / step)).astype(np.intp)
+    keep = (i0 < i1) & (j0 < j1)
+    i0, j0, i1, j1 = i0[keep] + 1, j0[keep] + 1, i1[keep] + 1, j1[keep] + 1
+    # Rasterize every blocker at once: +1/-1 at the corners, summed over rows and columns
+    cover = np.zeros((gh + 2, gw + 2), dtype=np.int32)
+    np.add.at(cover, (j0, i0), 1)
+    np.add.at(cover, (j0, i1), -1)
+    np.add.at(cover, (j1, i0), -1)
+    np.add.at(cover, (j1, i1), 1)
+    blocked = (cover.cumsum(0).cumsum(1)[: gh + 1, : gw + 1] > 0).astype(np.int32)
+    area = blocked.cumsum(0).cumsum(1)  # Summed-area table
+
+    fw = int(np.ceil(player_size[0] / step))
+    fh = int(np.ceil(player_size[1] / step))
+    free = np.zeros((gh, gw), dtype=bool)
+    rows, cols = gh - fh, gw - fw
+    if rows > 0 and cols > 0:
+        box = area[fh : fh + rows, fw : fw + cols] - area[:rows, fw : fw + cols] - area[fh : fh + rows, :cols] + area[:rows, :cols]
+        free[:rows, :cols] = box == 0
+    return free
+
+
+def make_level(seed, width, height, start, obstacles, invisible, items, lasers):
+    """
+    Packs rectangle lists into a level dict backed by RectTables.
+    """
+    level = {"seed": seed, "size": (width, height), "start": start}
+    for (key, kind), rects in zip(KINDS, (obstacles, invisible, items, lasers)):
+        columns = np.asarray(rects, dtype=np.float32).reshape(-1, 4).T
+        level[key] = RectTable.from_arrays(kind, *columns)
+    return level
+
+
+def save_level(level, path):
+    """
+    Writes a level dict to disk in the compact HLV1 format.
+    """
+    width, height = level["size"]
+    start_x, start_y = level["start"]
+    tables = [level[key] for key, _ in KINDS]
+    body = b"".join(
+        np.stack([column[table.indices()] for column in (table.x, table.y, table.width, table.height)])
+        .round()
+        .astype("<u2")
+        .tobytes()
+        for table in tables
+    )
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, level["seed"], width, height, start_x, start_y, *(len(t) for t in tables)))
+        f.write(zlib.compress(body))
+
+
+def load_level(path):
+    """
+    Reads a level written by save_level.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        body = zlib.decompress(f.read())
+    magic, seed, width, height, start_x, start_y, *counts = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a level file")
+
+    level = {"seed": seed, "size": (width, height), "start": (start_x, start_y)}
+    offset = 0
+    for (key, kind), count in zip(KINDS, counts):
+        columns = np.frombuffer(body, dtype="<u2", count=4 * count, offset=offset).reshape(4, count)
+        offset += columns.nbytes
+        level[key] = RectTable.from_arrays(kind, *columns.astype(np.float32))
+    return level
+
+
+def stream_levels(seed, **options):
+    """
+    Endless lazy level sequence for endless mode.
+    """
+    return LevelGenerator(**options).stream(seed)
+
+
+class LevelPrefetcher:
+    def __init__(self, levels):
+        """
+        Wraps a level iterator so the next level can be built on a background
+        thread while the current one is played, instead of on the frame that
+        needs it.
+
+        Parameters:
+        - levels: Iterator of level dicts, e.g. from stream_levels
+        """
+        self.levels = levels
+        self.thread = None
+        self.level = None
+        self.error = None  # Raised by the wrapped iterator on the build thread (StopIteration too)
+
+    def prefetch(self):
+        """
+        Starts building the next level, unless that is already under way.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._build, daemon=True)
+            self.thread.start()
+
+    def _build(self):
+        try:
+            self.level = next(self.levels)
+        except BaseException as error:  # Re-raised by __next__ on the caller's thread
+            self.error = error
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """
+        The next level; waits for the prefetch to finish, or builds it now if none was started.
+        Errors of the wrapped iterator, and its end, surface here.
+        """
+        self.prefetch()
+        self.thread.join()
+        self.thread = None
+        level, error, self.level, self.error = self.level, self.error, None, None
+        if error is not None:
+            raise error
+        return level
+
+
+if __name__ == "__main__":
+    # Usage: python src/levelgen.py SEED COUNT OUTPUT_DIR
+    seed, count, out_dir = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+    levels = stream_levels(seed)
+    for i in range(count):
+        save_level(next(levels), f"{out_dir}/level_{i:04d}.hlv")
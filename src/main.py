@@ -1,88 +1,54 @@
+import itertools
+import pickle
+
 import pygame
 import random
 
+from controls import InputBuffer
+from coop import CoopSystem, RobberRenderer
+from ecs import World
+from entities import InvisibleObstacle, Item, Laser, Obstacle, collides_any
+from ghosts import GhostLibrary, GhostRecorder
+from guards import Guard
+from hotreload import HotReloadSystem, LevelWatcher
+from hud import Hud
+from levelgen import LevelPrefetcher, stream_levels
+from masks import SpriteMasks
+from minimap import Minimap
+from particles import ParticlePool
+from probes import ProbeCache
+from records import Run, RunStore
+from render import create_backend
+from scenes import FRAME_RATE, IDLE_FRAME_RATE, REDRAW_EVENTS, TICK_RATE, GameOverScene, SceneStack, TitleScene
+from sessions import SessionRecorder
+from sprites import ROBBER_STANDING, ROBBER_WALK_FRAMES, Animator, SpriteAtlas
+from swings import Swing
+from systems import (
+    BackgroundRenderer,
+    EntityRenderer,
+    GhostRecorderSystem,
+    GhostRenderer,
+    HazardRenderer,
+    HazardSystem,
+    HudRenderer,
+    LightingRenderer,
+    MinimapRenderer,
+    MovementSystem,
+    ParticleRenderer,
+    ParticleSystem,
+    PickupSystem,
+    PlayerRenderer,
+    ProgressSystem,
+    TelemetrySystem,
+    build_hazards,
+)
+from telemetry import LEVEL_SIZE, TelemetryLog
+from tripwires import BlinkingLaser, SweepingLaser
+from world import Camera, ChunkedLevel
 
-class Screen:
-    def __init__(self):
-        # Initialize pygame and the screen
-        pygame.init()
-
-
-        # Game state variables
-        self.show_first_screen = True  # Flag to track if the first screen should be shown
-        self.show_instructions = False  # Flag to track if the instruction screen should be shown
-        self.show_game_screen = False  # Flag to track if the game screen should be shown
-
-        # Instruction screen image (you can replace this with your own image)
-        self.instruction_screen_image = pygame.image.load("instruction_screen.png")  
-        self.instruction_screen_image.fill((0, 255, 0))  # Green background for instructions
-        
-        # First screen image (you can replace this with your own image)
-        self.first_screen_image = pygame.image.load("chess.png")
-        self.first_screen_image.fill((255, 0, 0))  # Red background for first screen
-        
-        # Background image for main game (replace this with your game background)
-        self.background_image = pygame.Surface((800, 600))
-        self.background_image.fill((255, 255, 255))  # White background for the game
-
-        # Initialize other game elements
-        self.player = None  # Initialize player object (replace with actual player object)
-        
-    def restart_level(self):
-        """
-        Restart the current level by resetting the player's position and clearing the inventory.
-        """
-        print("Restarting level...")
-        self.player.x, self.player.y = 40, 680  # Reset player position
-        self.player.inventory.clear()  # Clear inventory
-
-    def draw(self):
-        """
-        Draw the current screen based on game state.
-        """
-        if self.show_first_screen:
-            # Draw the first screen (e.g., title or splash screen)
-            self.screen.blit(self.first_screen_image, (0, 0))
-        elif self.show_instructions:
-            # Draw the instruction screen
-            self.screen.blit(self.instruction_screen_image, (0, 0))
-        elif self.show_game_screen:
-            # Draw the main game screen
-            self.screen.blit(self.background_image, (0, 0))
-            # Add logic to draw your game elements, e.g., obstacles, player, items
-            self.player.draw(self.screen)  # Assuming your player object has a draw method
-        pygame.display.flip()
-
-    def handle_events(self):
-        """
-        Handle all events including mouse clicks.
-        """
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                quit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if self.show_first_screen:
-                    # When the first screen is clicked, show the instruction screen
-                    self.show_first_screen = False
-                    self.show_instructions = True
-                elif self.show_instructions:
-                    # When the instruction screen is clicked, hide it and show the game
-                    self.show_instructions = False
-                    self.show_game_screen = True
-
-    def game_loop(self):
-        """
-        Main game loop.
-        """
-        while True:
-            self.handle_events()
-            self.draw()  # Draw the screen based on the current state
-            self.clock.tick(60)  # Maintain 60 FPS
 
 class Player:
-    def __init__(self, x, y, width, height, vel, image_path):
+    def __init__(self, x, y, width, height, vel, image_path, walk_frame_paths=(), precise=False):
         """
         Initializes the player with an image.
 
@@ -90,7 +56,9 @@ class Player:
         - x, y: Initial position of the player
         - width, height: Size of the player
         - vel: Movement speed of the player
-        - image_path: Path to the image to represent the player
+        - image_path: Path to the image to represent the player standing still
+        - walk_frame_paths: Paths to the walk cycle frames (optional)
+        - precise: Collide with the sprite's opaque pixels instead of its rectangle
         """
         self.x = x
         self.y = y
@@ -98,294 +66,127 @@ class Player:
         self.height = height
         self.vel = vel
         self.inventory = []
+        self.probes = ProbeCache()  # Static collision results for positions already probed
 
-        # Load the player image
-        self.image = pygame.image.load(image_path)
+        # Load, scale and flip every frame once into a single atlas
+        self.atlas = SpriteAtlas((image_path, *walk_frame_paths), (self.width, self.height))
+        self.animation = Animator(1 + len(walk_frame_paths))
+        self.masks = SpriteMasks(self.atlas) if precise else None  # Per-frame collision masks
 
-        # Scale the image to fit the player's size (optional, based on your game's design)
-        self.image = pygame.transform.scale(self.image, (self.width, self.height))
-
-    def move(self, keys, obstacles, items, invisibleObstacle, screen_width, screen_height):
+    def move(self, keys, solids, world_width, world_height):
         """
-        Handles player movement while avoiding obstacles and collecting items.
+        Handles player movement while avoiding solid entities.
+
+        Parameters:
+        - keys: Held keys for this tick
+        - solids: What blocks movement (the level World, a list or a RectTable)
+        - world_width, world_height: Size of the level
         """
-        if (
-            keys[pygame.K_LEFT]
-            and self.x > 0
-            and self.can_move(
-                self.x - self.vel, self.y, obstacles, invisibleObstacle, screen_width, screen_height
-            )
-        ):
+        start_x, start_y = self.x, self.y
+        if keys[pygame.K_LEFT] and self.x > 0 and self.can_move(self.x - self.vel, self.y, solids):
             self.x -= self.vel  # Move left
-        if (
-            keys[pygame.K_RIGHT]
-            and self.x < screen_width - self.width
-            and self.can_move(
-                self.x + self.vel, self.y, obstacles, invisibleObstacle, screen_width, screen_height
-            )
-        ):
+        if keys[pygame.K_RIGHT] and self.x < world_width - self.width and self.can_move(self.x + self.vel, self.y, solids):
             self.x += self.vel  # Move right
-        if (
-            keys[pygame.K_UP]
-            and self.y > 0
-            and self.can_move(
-                self.x, self.y - self.vel, obstacles, invisibleObstacle, screen_width, screen_height
-            )
-        ):
+        if keys[pygame.K_UP] and self.y > 0 and self.can_move(self.x, self.y - self.vel, solids):
             self.y -= self.vel  # Move up
-        if (
-            keys[pygame.K_DOWN]
-            and self.y < screen_height - self.height
-            and self.can_move(
-                self.x, self.y + self.vel, obstacles, invisibleObstacle, screen_width, screen_height
-            )
-        ):
+        if keys[pygame.K_DOWN] and self.y < world_height - self.height and self.can_move(self.x, self.y + self.vel, solids):
             self.y += self.vel  # Move down
 
-        self.collect_items(items)  # Check if player collects any items
+        self.animation.update(self.x - start_x, self.y - start_y)
 
-    def can_move(self, new_x, new_y, obstacles, invisibleObstacle, screen_width, screen_height):
+    def can_move(self, new_x, new_y, solids):
         """
         Checks if the player can move to the new position without colliding.
 
         Parameters:
         - new_x, new_y: The new position the player wants to move to
-        - obstacles: List of obstacles to check against
+        - solids: What blocks movement (the level World, a list or a RectTable)
 
         Returns:
         - True if the move is allowed, False if it collides
         """
+        collider = self.masks.collider if self.masks is not None else None
+        return not self.probes.collides(solids, new_x, new_y, self.width, self.height, collider)
 
-        # Check for obstacles
-        for obstacle in obstacles:
-            if obstacle.collides_with(new_x, new_y, self.width, self.height):
-                return False  # Block movement if collision detected with obstacle
-
-        # Check for invisible obstacles (loop through the list)
-        for inv_obs in invisibleObstacle:  # Loop through the list of InvisibleObstacle objects
-            if inv_obs.collides_with(new_x, new_y, self.width, self.height):
-                return False  # Block movement if collision detected with invisible obstacle
-
-        return True
-
-
-    def collect_items(self, items):
+    def shape(self):
         """
-        Checks if the player collides with any items and collects them.
-
-        Parameters:
-        - items: List of item objects to check for collection
+        The SpriteShape of the frame being drawn, or None when colliding as a rectangle.
         """
-        for item in items[:]:
-            if item.collides_with(self.x, self.y, self.width, self.height):
-                self.inventory.append(item)  # Add the item to player's inventory
-                items.remove(item)  # Remove item from the game
-                print(f"Money collected! Inventory: {len(self.inventory)} items.")  # Feedback
-
+        if self.masks is None:
+            return None
+        return self.masks.get(self.animation.facing, self.animation.frame)
 
-
-    def draw(self, screen):
+    def collect_items(self, world):
         """
-        Draws the player image on the screen.
+        Collects the collectible entities the player overlaps.
 
         Parameters:
-        - screen: The game screen where the player will be drawn
-        """
-        screen.blit(self.image, (self.x, self.y))  # Draw the player image at (x, y)
-
-
-class InvisibleObstacle:
-    def __init__(self, x, y, width, height, color=(0, 0, 0)):
-        """
-        Initializes an obstacle.
-
-        Parameters:
-        - x, y: Position of the obstacle
-        - width, height: Size of the obstacle
-        - color: Color of the obstacle (default is black)
-        """
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.color = color  # New color parameter
-
-    def draw(self, screen):
-        """
-        Draws the obstacle on the screen.
-
-        Parameters:
-        - screen: The game screen where the obstacle will be drawn
-        """
-        pygame.draw.rect(
-            screen, self.color, (self.x, self.y, self.width, self.height)
-        )  # Use the color
-
-
-    def collides_with(self, x, y, width, height):
-        """
-        Checks if a given rectangle (player) collides with this obstacle.
-
-        Parameters:
-        - x, y: Position of the rectangle
-        - width, height: Size of the rectangle
-
-        Returns:
-        - True if there's a collision, False otherwise
-        """
-        return (
-            x < self.x + self.width
-            and x + width > self.x
-            and y < self.y + self.height
-            and y + height > self.y
-        )
-
-
-class Obstacle:
-    def __init__(self, x, y, width, height, color=(0, 0, 0)):
-        """
-        Initializes an obstacle.
-
-        Parameters:
-        - x, y: Position of the obstacle
-        - width, height: Size of the obstacle
-        - color: Color of the obstacle (default is black)
-        """
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.color = color  # New color parameter
-
-    def draw(self, screen):
-        """
-        Draws the obstacle on the screen.
-
-        Parameters:
-        - screen: The game screen where the obstacle will be drawn
-        """
-        pygame.draw.rect(
-            screen, self.color, (self.x, self.y, self.width, self.height)
-        )  # Use the color
-
-    def collides_with(self, x, y, width, height):
-        """
-        Checks if a given rectangle (player) collides with this obstacle.
-
-        Parameters:
-        - x, y: Position of the rectangle
-        - width, height: Size of the rectangle
+        - world: The level World
 
         Returns:
-        - True if there's a collision, False otherwise
-        """
-        return (
-            x < self.x + self.width
-            and x + width > self.x
-            and y < self.y + self.height
-            and y + height > self.y
-        )
-
-
-class Item:
-    def __init__(self, x, y, width, height):
+        - Ids of the entities collected
         """
-        Initializes an item to be collected (looks like a coin).
-
-        Parameters:
-        - x, y: Position of the item
-        - width, height: Size of the item (for a coin, width == height)
-        """
-        self.x = x
-        self.y = y
-        self.width = width  # Diameter of the coin (same for both width and height)
-        self.height = height  # Diameter of the coin (same for both width and height)
-
-    def draw(self, screen):
-        """
-        Draws the item (money) on the screen as a coin.
-
-        Parameters:
-        - screen: The game screen where the item will be drawn
-        """
-        # Draw a coin-like shape (circle) to represent money
-        pygame.draw.circle(
-            screen,
-            (255, 223, 0),
-            (self.x + self.width // 2, self.y + self.height // 2),
-            self.width // 2,
-        )  # Gold color
-
-    def collides_with(self, x, y, width, height):
-        """
-        Checks if a given rectangle (player) collides with this item.
-
-        Parameters:
-        - x, y: Position of the rectangle
-        - width, height: Size of the rectangle
-
-        Returns:
-        - True if there's a collision, False otherwise
-        """
-        return (
-            x < self.x + self.width
-            and x + width > self.x
-            and y < self.y + self.height
-            and y + height > self.y
-        )
-
+        shape = self.shape()
+        if shape is None:
+            ids = world.query(self.x, self.y, self.width, self.height, world.collectible)
+        else:
+            ids = shape.query(world, self.x, self.y, world.collectible)
+        if len(ids):
+            world.kill(ids)  # Remove the items from the game
+            for entity in ids.tolist():
+                self.inventory.append(entity)  # Add the item to player's inventory
+                print(f"Money collected! Inventory: {len(self.inventory)} items.")  # Feedback
+        return ids
 
-class Laser:
-    def __init__(self, x, y, width, height, color=(255, 0, 0)):
+    def draw(self, screen, offset=(0, 0)):
         """
-        Initializes a laser.
+        Draws the player image on the screen.
 
         Parameters:
-        - x, y: Position of the laser
-        - width, height: Size of the laser (can be a thin rectangle)
-        - color: Color of the laser (default is red)
-        """
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.color = color
-
-    def draw(self, screen):
+        - screen: The game screen where the player will be drawn
+        - offset: Camera offset added to the position
         """
-        Draws the laser on the screen.
+        animation = self.animation
+        self.atlas.blit(screen, (self.x + offset[0], self.y + offset[1]), animation.facing, animation.frame)
 
-        Parameters:
-        - screen: The game screen where the laser will be drawn
-        """
-        pygame.draw.rect(
-            screen, self.color, (self.x, self.y, self.width, self.height)
-        )  # Use the color
 
-    def collides_with(self, x, y, width, height):
+class Game:
+    def __init__(
+        self,
+        endless=False,
+        seed=None,
+        level_size=(1000, 800),
+        darkness=False,
+        renderer="auto",
+        window_size=None,
+        records_path="heist_runs.db",
+        player_name="player",
+        telemetry_path=None,
+        ghost_dir="ghosts",
+        ghost_count=1,
+        session_path=None,
+        level_dir=None,
+        coop=None,
+        precise_collision=False,
+    ):
         """
-        Checks if a given rectangle (player) collides with this laser.
-
         Parameters:
-        - x, y: Position of the rectangle (player)
-        - width, height: Size of the rectangle (player)
-
-        Returns:
-        - True if there's a collision, False otherwise
+        - endless: Keep generating new levels after the hand-made ones are completed
+        - seed: Seed for the generated levels (random if None)
+        - level_size: Size of generated levels; larger than the window scrolls
+        - darkness: Start in flashlight mode (toggle in game with L)
+        - renderer: Render backend, "auto", "texture", "software" or "offscreen" (see render.create_backend)
+        - window_size: Initial window size; the 1000x800 picture is scaled to fit
+        - records_path: SQLite file for the run history and leaderboard (None to keep no records)
+        - player_name: Name finished runs are recorded under
+        - telemetry_path: Log file for positions, pickups and deaths (see telemetry.py; None to log nothing)
+        - ghost_dir: Directory of recorded level runs raced as ghosts (None for no ghosts)
+        - ghost_count: Best runs shown as ghosts, besides the previous run (e.g. 10 for the top 10)
+        - session_path: File the play session is recorded to for offline rendering (see sessions.py)
+        - level_dir: Development mode: directory of level JSON files applied live as they are edited (see hotreload.py)
+        - coop: (host, port) of a co-op server to join; the server then decides pickups, deaths and levels (see coop.py)
+        - precise_collision: Collide with the robber's opaque pixels rather than its rectangle (see masks.py)
         """
-        return (
-            x < self.x + self.width
-            and x + width > self.x
-            and y < self.y + self.height
-            and y + height > self.y
-        )
-    def laser_sound(self, sound_path):
-        sound = pygame.mixer.Sound("src/assets/laser.mp3")
-        sound.play()
-
-
-class Game:
-    def __init__(self):
         pygame.init()
         pygame.mixer.init()
 
@@ -394,11 +195,11 @@ class Game:
         # self.laser_hit_sound = pygame.mixer.Sound("src/assets/laser.mp3")
         # self.game_over_sound = pygame.mixer.Sound("src/assets/game_over_sound.wav")
         self.clock = pygame.time.Clock()
-        self.screen = pygame.display.set_mode((1000, 800))  # Reduced height to 800
-        pygame.display.set_caption("HEIST Game")
+        # Software blits or GPU textures, drawn at 1000x800 and scaled to the window
+        self.screen = create_backend(renderer, (1000, 800), "HEIST Game", window_size)  # Reduced height to 800
 
         # Add image_path parameter for the player image
-        self.player = Player(40, 680, 28.4, 32, 2.5, "src/assets/standing_robber.png")  # Example path to the image
+        self.player = Player(40, 680, 28.4, 32, 2.5, ROBBER_STANDING, ROBBER_WALK_FRAMES, precise_collision)
 
         # Define levels with obstacle colors and invisible obstacles
         self.levels = [
@@ -444,6 +245,9 @@ class Game:
                 "lasers": [
                     Laser(80, 415, 5, 100),
                     Laser(390, 660, 5, 110)
+                ],
+                "swings": [
+                    Swing(745, 40, 150, 0.8, damping=0.0)
                 ]
             },
 
@@ -486,7 +290,13 @@ class Game:
                     InvisibleObstacle(550, 740, 76, 30)
                 ],
                 "items": [],
-                "lasers": []
+                "lasers": [],
+                "guards": [
+                    Guard([(700, 240), (930, 240)])
+                ],
+                "movingLasers": [
+                    BlinkingLaser(336, 100, 5, 50, period=120, on_ticks=60)
+                ]
             },
             {
                 "obstacles": [
@@ -532,18 +342,93 @@ class Game:
                     InvisibleObstacle(110, 440, 70, 70)
                 ],
                 "items": [],
-                "lasers": []
+                "lasers": [],
+                "guards": [
+                    Guard([(460, 130), (460, 600)], speed=1.2)
+                ],
+                "movingLasers": [
+                    SweepingLaser(880, 200, 95, 5, dx=0, dy=400, period=240)
+                ]
             }
         ]
 
+        self.base_level_count = len(self.levels)  # Hand-made levels; endless mode appends more
+
         # Now, generate items for each level, using level data
         for i in range(len(self.levels)):
             self.levels[i]["items"] = self.generate_items(50, 20, self.levels[i])
 
         self.font = pygame.font.SysFont("Arial", 24)
+        self.hud = Hud(self.font)  # Coins, level, deaths and time on screen
+        self.deaths = 0  # Restarts during this run
+        self.run_start_tick = 0  # Tick the current run started at
+        self.level_start = (0, 0)  # (tick, deaths) when the current level started
+        self.splits = []  # (level, time_ms, deaths, coins) per completed level this run
+        self.player_name = player_name
+        self.records = RunStore(records_path) if records_path else None  # Written on a background thread
         self.current_level = 0
         self.run = True
 
+        # Endless mode streams procedurally generated levels on demand
+        self.level_stream = None
+        if endless:
+            seed = seed if seed is not None else random.getrandbits(63)
+            self.level_stream = LevelPrefetcher(stream_levels(seed, width=level_size[0], height=level_size[1]))
+        self.level_seed = seed
+        self.level_size = level_size
+
+        # Levels bigger than the window scroll under a camera and are streamed in chunks
+        self.camera = Camera(self.screen.get_width(), self.screen.get_height())
+        self.chunks = None
+        self.world = None  # Entities of the current level, built from its dict
+        self.level_coins = 0  # Coins the current level started with, for the HUD
+        self.hazards = {}  # Animated hazard fields of the current level, by level key
+        self.darkness = darkness
+        self.flashlight = None  # Built on demand for the current level
+        self.particles = ParticlePool()  # Coin and death bursts
+        self.minimap = Minimap()
+        self.show_minimap = None  # None: only on levels larger than the window (toggle in game with M)
+        self.tick = 0  # Gameplay ticks; timed lasers are evaluated from it
+        self.input = InputBuffer()  # Timestamped, per-tick keyboard input
+        self.keys = None  # Held keys for the current tick
+        self.telemetry = TelemetryLog(telemetry_path) if telemetry_path else None
+        self.ghost_library = GhostLibrary(ghost_dir) if ghost_dir else None
+        self.ghost_recorder = GhostRecorder()  # The live player's track for the current level
+        self.ghost_count = ghost_count
+        self.ghosts = []  # GhostTracks raced on the current level
+        self.session = SessionRecorder(session_path) if session_path else None
+        self.level_watcher = LevelWatcher(level_dir, self.levels) if level_dir else None
+        self.coop = CoopSystem(coop) if coop else None
+
+        # Systems run in this order every tick / frame; new kinds of entity go through them
+        self.update_systems = [
+            MovementSystem(),
+            GhostRecorderSystem(),
+            PickupSystem(),
+            TelemetrySystem(),
+            HazardSystem(),
+            ProgressSystem(),
+            ParticleSystem(),
+        ]
+        if self.level_watcher is not None:
+            self.update_systems.insert(0, HotReloadSystem())
+        self.draw_systems = [
+            BackgroundRenderer(),
+            EntityRenderer(),
+            HazardRenderer(),
+            GhostRenderer(),
+            LightingRenderer(),
+            PlayerRenderer(),
+            ParticleRenderer(),
+            MinimapRenderer(),
+            HudRenderer(),
+        ]
+        if self.coop is not None:
+            # Movement is predicted locally; everything else comes from the server
+            self.update_systems = [MovementSystem(), self.coop]
+            self.draw_systems.insert(len(self.draw_systems) - 4, RobberRenderer())  # Under the player and HUD
+        self.enter_level()
+
         # Load the background images for each level
         self.background_images = [
             pygame.image.load("src/assets/lvl1.png"),
@@ -551,7 +436,8 @@ class Game:
             pygame.image.load("src/assets/lvl3.png") 
         ]
         # Scale the images to match the screen size
-        self.background_images = [pygame.transform.scale(image, (self.screen.get_width(), self.screen.get_height())) for image in self.background_images]
+        self.background_images = [pygame.transform.scale(image, (self.screen.get_width(), self.screen.get_height()))for image in self.background_images]
+        self.background_images = [self.screen.prepare(image) for image in self.background_images]
  #       end_screen_image = pygame.transform.scale(end_screen_image, (self.screen.get_width(), self.screen.get_height()))
         # Load the instruction screen image and end screen
         self.instruction_screen_image = pygame.image.load("src/assets/instruction_screen.png")
@@ -563,10 +449,10 @@ class Game:
         self.end_screen_image = pygame.transform.scale(self.end_screen_image, (self.screen.get_width(), self.screen.get_height()))
         # self.instruction_screen_image2 = pygame.image.load("src/assets/instruction_screen.png")
         # self.instruction_screen_image2 = pygame.transform.scale(self.instruction_screen_image2, (self.screen.get_width(), self.screen.get_height()))
-        # Flag to check if we are showing the instruction screen
-        self.show_instructions = False
-        self.show_first_screen = True
-        self.show_game_screen = False
+
+        # Title -> instructions -> play -> game over
+        self.scenes = SceneStack()
+        self.scenes.push(TitleScene(self))
 
          # Play background music on loop
         pygame.mixer.music.load("src/assets/Rev.mp3")  # Replace with your music file path
@@ -575,10 +461,7 @@ class Game:
 
 
     def check_obstacle_collision(self, x, y, width, height, obstacles):
-        for obstacle in obstacles:
-            if obstacle.collides_with(x, y, width, height):
-                return True  # If the item collides with any obstacle
-        return False
+        return collides_any(obstacles, x, y, width, height)  # If the item collides with any obstacle
 
     def generate_items(self, num_items, size, level_data):
         items = []
@@ -606,92 +489,268 @@ class Game:
         return items
 
 
-    def handle_events(self):
-        for event in pygame.event.get():
+    def handle_events(self, events=None):
+        """
+        Passes events to the current scene.
+
+        Returns:
+        - True if the scene needs to be redrawn
+        """
+        redraw = False
+        for event in pygame.event.get() if events is None else events:
             if event.type == pygame.QUIT:
                 self.run = False
                 break
-            if event.type == pygame.MOUSEBUTTONDOWN and self.show_first_screen:
-                # When user clicks on instruction screen, start the game.
-                self.show_instructions = True
-                self.show_first_screen = False
-                break
-            if event.type == pygame.MOUSEBUTTONDOWN and self.show_instructions:
-                self.show_instructions = False
-                self.show_game_screen = True
-                break       
+            if event.type in REDRAW_EVENTS:
+                redraw = True
+            redraw = self.scenes.top.handle_event(event) or redraw
+        return redraw
 
     def update(self):
-        if self.show_instructions:
-            return  # Don't update the game if we're showing the instruction screen.
+        if self.session is not None:
+            self.session.before_tick(self)
+        self.tick += 1
+        self.keys = self.input.begin_tick()  # Key events since the last tick, replayed in order
+        if self.session is not None:
+            self.session.record(self)
+        for system in self.update_systems:
+            system.update(self)
+
+    def complete_level(self):
+        """
+        Moves on to the next level, or ends the run after the last one.
+        """
+        print(f"Level {self.current_level + 1} completed!")
+        self.finish_split()
+        if self.ghost_library is not None and self.current_level < self.base_level_count:
+            self.close_ghosts()  # Saving may delete the files they map
+            self.ghost_library.save(self.current_level, self.splits[-1][1], self.ghost_recorder.records())
+        if self.current_level == len(self.levels) - 1 and self.level_stream is not None:
+            self.levels.append(next(self.level_stream))  # Prefetched while this level was played
+        if self.current_level < len(self.levels) - 1:
+            self.current_level += 1
+            self.player.inventory.clear()  # Optionally clear the player's inventory when moving to the next level
+            self.player.x, self.player.y = self.start_position()  # Reset player position
+            self.enter_level()
+        else:
+            self.record_run()
+            self.scenes.replace(GameOverScene(self))  # Every level is done
 
-        if self.show_first_screen:
-            return
-        
-        keys = pygame.key.get_pressed()
-        current_level_data = self.levels[self.current_level]
-
-        # Move the player
-        self.player.move(
-            keys,
-            current_level_data["obstacles"],
-            current_level_data["items"],
-            current_level_data["invisibleObstacle"],
-            self.screen.get_width(),
-            self.screen.get_height(),
-        )
+    def level_ticks(self):
+        return self.tick - self.level_start[0]
 
-        # Check for collisions with lasers
-        for laser in current_level_data.get("lasers", []):
-            if laser.collides_with(self.player.x, self.player.y, self.player.width, self.player.height):
-                print("Player hit a laser! Restarting level.")
-                
-                self.restart_level()
+    def run_seconds(self):
+        return (self.tick - self.run_start_tick) / TICK_RATE
+
+    def ticks_to_ms(self, ticks):
+        return ticks * 1000 // TICK_RATE
 
-        # Check if all items are collected
-        if len(current_level_data["items"]) == 0:
-            print(f"Level {self.current_level + 1} completed!")
-            if self.current_level < len(self.levels) - 1:
-                self.current_level += 1
-                self.player.inventory.clear()  # Optionally clear the player's inventory when moving to the next level
-                self.player.x, self.player.y = 40, 680  # Reset player position
+    def finish_split(self):
+        """
+        Records the time, deaths and coins of the level just completed.
+        """
+        start_tick, start_deaths = self.level_start
+        self.splits.append(
+            (self.current_level + 1, self.ticks_to_ms(self.tick - start_tick), self.deaths - start_deaths, len(self.player.inventory))
+        )
+        self.level_start = (self.tick, self.deaths)
 
-    def restart_level(self):
+    def record_run(self):
+        """
+        Queues the finished run for the leaderboard (written off the game loop).
+        """
+        if self.records is None:
+            return
+        coins = sum(split[3] for split in self.splits)
+        run = Run(self.player_name, self.ticks_to_ms(self.tick - self.run_start_tick), self.deaths, coins, self.splits)
+        self.records.record_run(run)
+
+    def restart_level(self, cause=None):
         """
         Restart the current level by resetting the player's position and clearing the inventory.
+
+        Parameters:
+        - cause: Telemetry death event (DEATH_LASER, DEATH_SWING or DEATH_GUARD), if any
         """
         print("Restarting level...")
-        self.player.x, self.player.y = 40, 680  # Reset player position
+        self.deaths += 1
+        if self.telemetry is not None and cause is not None:
+            self.telemetry.record(self.tick, self.current_level, cause, *self.player_center())
+        self.player.x, self.player.y = self.start_position()  # Reset player position
         self.player.inventory.clear()  # Clear inventory
-        
+
+    def player_center(self):
+        return self.player.x + self.player.width / 2, self.player.y + self.player.height / 2
+
+    def enter_level(self):
+        """
+        Builds the entity world and hazards of the current level and sets up
+        the camera (and chunk streaming for large levels).
+        """
+        level = self.levels[self.current_level]
+        if self.telemetry is not None:
+            self.telemetry.record(self.tick, self.current_level, LEVEL_SIZE, *self.level_dimensions())
+        self.world = World.from_level(level, level_id=self.current_level)
+        self.level_coins = self.world.remaining(self.world.collectible)
+        self.hazards = build_hazards(level)
+        self.particles.clear()
+        self.prepare_view()
+        self.load_ghosts()
+        if self.level_stream is not None and self.current_level == len(self.levels) - 1:
+            self.level_stream.prefetch()  # Build the next level off the frame loop
+
+    def minimap_visible(self):
+        if self.show_minimap is None:
+            return self.chunks is not None  # Scrolling levels
+        return self.show_minimap
+
+    def level_dimensions(self):
+        return self.levels[self.current_level].get("size", (self.screen.get_width(), self.screen.get_height()))
+
+    def prepare_view(self):
+        """
+        Points the camera at the player in the current level; large levels
+        stream their floor, furniture and walls as prerendered chunks.
+        """
+        width, height = self.level_dimensions()
+        self.camera.set_world(width, height)
+        large = width > self.camera.width or height > self.camera.height
+        self.chunks = ChunkedLevel(self.levels[self.current_level]) if large else None
+        self.camera.follow(self.player.x, self.player.y, self.player.width, self.player.height)
+        if self.chunks is not None:
+            self.chunks.stream(self.camera)
+        self.flashlight = None
+
+    # Gameplay state captured by snapshot (everything Game.update reads or changes)
+    SNAPSHOT_FIELDS = (
+        "tick",
+        "current_level",
+        "levels",
+        "world",
+        "level_coins",
+        "hazards",
+        "deaths",
+        "run_start_tick",
+        "level_start",
+        "splits",
+        "darkness",
+        "particles",
+    )
+
+    def snapshot(self):
+        """
+        The gameplay state as bytes, for deterministic replay (see sessions.py).
+        Input, rendering caches and records are not included.
+        """
+        player = self.player
+        state = {name: getattr(self, name) for name in self.SNAPSHOT_FIELDS}
+        state["player"] = (player.x, player.y, list(player.inventory), dict(vars(player.animation)))
+        return pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, snapshot):
+        """
+        Resumes from a snapshot; the following ticks play out exactly as they did after it was taken.
+        """
+        state = pickle.loads(snapshot)
+        player = self.player
+        player.x, player.y, player.inventory, animation = state.pop("player")
+        vars(player.animation).update(animation)
+        for name, value in state.items():
+            setattr(self, name, value)
+        if self.level_stream is not None:
+            # Generated levels after the ones in the snapshot come from the same seed
+            generated = len(self.levels) - self.base_level_count
+            self.level_stream = LevelPrefetcher(
+                itertools.islice(
+                    stream_levels(self.level_seed, width=self.level_size[0], height=self.level_size[1]), generated, None
+                )
+            )
+        self.prepare_view()
+        self.open_ghosts()  # The snapshot may be of another level
+
+    def load_ghosts(self):
+        """
+        Opens the ghosts of the current level and starts recording the live run.
+        """
+        self.open_ghosts()
+        self.ghost_recorder.start()
+
+    def open_ghosts(self):
+        """
+        Opens the ghosts of the current level in place of the open ones.
+
+        Only the hand-made levels have ghosts; generated ones differ every run.
+        """
+        self.close_ghosts()
+        if self.ghost_library is not None and self.current_level < self.base_level_count:
+            self.ghosts = self.ghost_library.open(self.current_level, self.ghost_count)
+
+    def close_ghosts(self):
+        for ghost in self.ghosts:
+            ghost.close()
+        self.ghosts = []
+
+    def new_run(self):
+        """
+        Resets to the first level with fresh coins for a new playthrough.
+        """
+        del self.levels[self.base_level_count:]
+        for level in self.levels:
+            level["items"] = self.generate_items(50, 20, level)
+        self.current_level = 0
+        self.deaths = 0
+        self.run_start_tick = self.tick
+        self.level_start = (self.tick, 0)
+        self.splits = []
+        self.player.inventory.clear()
+        self.player.x, self.player.y = self.start_position()
+        self.enter_level()
+        if self.session is not None:
+            self.session.restart()  # The new coins are not derived from input
+
+    def start_position(self):
+        """
+        Spawn point of the current level (generated levels carry their own).
+        """
+        return self.levels[self.current_level].get("start", (40, 680))
+
     def draw(self):
-        self.screen.fill((255, 255, 255))
+        for system in self.draw_systems:
+            system.draw(self)
+        self.screen.present()
+        self.input.frame_presented()
 
-        if self.show_first_screen:
-            self.screen.blit(self.first_screen_image, (0, 0))
-        elif self.show_instructions:
-            self.screen.blit(self.instruction_screen_image, (0, 0))
-        else:
-            self.screen.blit(self.background_images[self.current_level], (0, 0))
-
-            current_level_data = self.levels[self.current_level]
-            for obstacle in current_level_data["obstacles"]:
-                obstacle.draw(self.screen)
-            for item in current_level_data["items"]:
-                item.draw(self.screen)
-            for laser in current_level_data.get("lasers", []):
-                laser.draw(self.screen)
-            self.player.draw(self.screen)
-
-        pygame.display.update()
-        
     def run_game(self):
+        redraw = True
         while self.run:
-            pygame.time.delay(10)
-            self.handle_events()
-            self.update()
-            self.draw()
+            scene = self.scenes.top
+            if scene.static:
+                # Nothing changes on a static screen: sleep until an event arrives
+                if redraw:
+                    scene.draw()
+                redraw = self.handle_events([pygame.event.wait()] + pygame.event.get())
+                continue
 
+            self.handle_events()
+            frame_rate = IDLE_FRAME_RATE if scene.idle() else FRAME_RATE
+            for _ in range(TICK_RATE // frame_rate):  # Keep gameplay speed when drawing less often
+                scene.update()
+                if self.scenes.top is not scene:
+                    break
+            if self.scenes.top is scene:
+                scene.draw()
+            redraw = True
+            self.clock.tick(frame_rate)
+
+        if self.records is not None:
+            self.records.close()  # Finish writing queued runs
+        if self.telemetry is not None:
+            self.telemetry.close()
+        self.close_ghosts()
+        if self.session is not None:
+            self.session.close()
+        if self.coop is not None:
+            self.coop.close()
         pygame.quit()
 
 
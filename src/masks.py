@@ -0,0 +1,158 @@
+import math
+
+import numpy as np
+import pygame
+
+from ecs import SHAPE_COIN
+from entities import coin_image
+
+_rect_masks = {}  # (width, height) -> filled Mask
+_circle_masks = {}  # Diameter -> Mask of the coin picture
+
+
+def rect_mask(width, height):
+    """
+    A filled mask of a size, made once and shared.
+    """
+    mask = _rect_masks.get((width, height))
+    if mask is None:
+        mask = _rect_masks[(width, height)] = pygame.Mask((width, height), fill=True)
+    return mask
+
+
+def circle_mask(diameter):
+    """
+    The mask of the coin picture of a diameter, made once and shared.
+    """
+    mask = _circle_masks.get(diameter)
+    if mask is None:
+        mask = _circle_masks[diameter] = pygame.mask.from_surface(coin_image(diameter))
+    return mask
+
+
+class SpriteShape:
+    __slots__ = ("mask", "left", "top", "width", "height", "rows")
+
+    def __init__(self, mask):
+        """
+        The opaque pixels of one sprite frame, for exact collision tests.
+
+        Every test first checks the frame's tight bounding box (the opaque
+        pixels' extent, smaller than the player's rectangle), so the mask
+        itself is only consulted for the few entities that box touches.
+        Sprites are drawn at whole pixels, so positions are truncated the
+        same way blit does.
+
+        Parameters:
+        - mask: pygame Mask of the frame
+        """
+        self.mask = mask
+        bounds = mask.get_bounding_rects()
+        box = bounds[0].unionall(bounds[1:]) if bounds else pygame.Rect(0, 0, 0, 0)
+        self.left, self.top, self.width, self.height = box
+        self.rows = self._row_spans()
+
+    def _row_spans(self):
+        """
+        The mask as rectangles (dx, dy, width, height): one per run of opaque
+        pixels in each row, so gaps such as between the legs stay open, merged
+        with the runs below while a run keeps the same columns.
+        """
+        if self.width == 0:
+            return []
+        pixels = pygame.surfarray.array_red(self.mask.to_surface()).T > 0  # [row, column]
+        edges = np.diff(np.pad(pixels, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+        spans = []
+        open_spans = {}  # (start, end) -> top row of the span still growing
+        for y, row in enumerate(edges):
+            runs = set(zip(np.flatnonzero(row == 1).tolist(), np.flatnonzero(row == -1).tolist()))
+            for run in [run for run in open_spans if run not in runs]:
+                spans.append((run, open_spans.pop(run), y))
+            for run in runs:
+                open_spans.setdefault(run, y)
+        spans += [(run, top, len(edges)) for run, top in open_spans.items()]
+        return [(start, top, end - start, bottom - top) for (start, end), top, bottom in sorted(spans, key=lambda s: (s[1], s[0]))]
+
+    def overlaps_rect(self, x, y, rx, ry, rw, rh):
+        """
+        True if an opaque pixel of the sprite drawn at (x, y) lies inside the rectangle.
+        """
+        px, py = int(x), int(y)
+        width, height = self.mask.get_size()
+        # Sprite pixel columns i with px + i < rx + rw and px + i + 1 > rx (likewise rows)
+        x0, x1 = max(0, math.floor(rx - px)), min(width, math.ceil(rx + rw - px))
+        y0, y1 = max(0, math.floor(ry - py)), min(height, math.ceil(ry + rh - py))
+        if x0 >= x1 or y0 >= y1:
+            return False
+        return self.mask.overlap(rect_mask(x1 - x0, y1 - y0), (x0, y0)) is not None
+
+    def overlaps_coin(self, x, y, cx, cy, diameter):
+        """
+        True if the sprite drawn at (x, y) overlaps the coin picture drawn at (cx, cy).
+        """
+        return self.mask.overlap(circle_mask(diameter), (int(cx) - int(x), int(cy) - int(y))) is not None
+
+    def query(self, world, x, y, mask=None):
+        """
+        world.query for the sprite's opaque pixels instead of its rectangle.
+
+        Returns:
+        - Ids of the live entities (with the component set, if mask is given) the sprite overlaps
+        """
+        ids = world.query(int(x) + self.left, int(y) + self.top, self.width, self.height, mask)
+        if len(ids) == 0:
+            return ids
+        hits = [
+            entity
+            for entity, shape, ex, ey, ew, eh in zip(
+                ids.tolist(), world.shape[ids].tolist(), world.x[ids].tolist(), world.y[ids].tolist(),
+                world.w[ids].tolist(), world.h[ids].tolist(),
+            )
+            if (
+                self.overlaps_coin(x, y, ex, ey, int(ew))
+                if shape == SHAPE_COIN
+                else self.overlaps_rect(x, y, ex, ey, ew, eh)
+            )
+        ]
+        return np.array(hits, dtype=ids.dtype)
+
+    def collides(self, world, x, y):
+        """
+        True if the sprite at (x, y) overlaps a solid entity of the world.
+        """
+        return len(self.query(world, x, y, world.solid)) > 0
+
+    def touches(self, field, x, y):
+        """
+        field.touches for the sprite's opaque pixels: the field is asked about
+        the tight bounding box, then about each run of opaque pixels inside it.
+        """
+        px, py = int(x), int(y)
+        if not field.touches(px + self.left, py + self.top, self.width, self.height):
+            return False
+        return any(field.touches(px + dx, py + dy, width, height) for dx, dy, width, height in self.rows)
+
+
+class SpriteMasks:
+    def __init__(self, atlas):
+        """
+        A SpriteShape per frame and facing of a SpriteAtlas, built once.
+
+        collider is the union of every frame and facing: movement tests use
+        it, so walking or turning never pushes the sprite into a wall.
+
+        Parameters:
+        - atlas: The player's SpriteAtlas
+        """
+        self.frames = tuple(
+            tuple(SpriteShape(pygame.mask.from_surface(atlas.surface.subsurface(rect))) for rect in row)
+            for row in atlas.rects
+        )
+        union = pygame.Mask((atlas.frame_width, atlas.frame_height))
+        for row in self.frames:
+            for shape in row:
+                union.draw(shape.mask, (0, 0))
+        self.collider = SpriteShape(union)
+
+    def get(self, facing, frame):
+        return self.frames[facing][frame]
@@ -0,0 +1,98 @@
+import numpy as np
+import pygame
+
+from entities import COIN_COLOR, RectTable
+from world import FLOOR_COLOR, FURNITURE_COLOR
+
+WALL_COLOR = (30, 30, 30)
+PLAYER_COLOR = (255, 40, 40)
+VIEW_COLOR = (255, 255, 255)
+BORDER_COLOR = (0, 0, 0)
+
+
+def rects(entities):
+    """
+    (x, y, width, height) of every rectangle in a list of entities or a RectTable.
+    """
+    if isinstance(entities, RectTable):
+        rows = entities.indices()
+        return zip(*(column[rows].tolist() for column in (entities.x, entities.y, entities.width, entities.height)))
+    return ((e.x, e.y, e.width, e.height) for e in entities)
+
+
+class Minimap:
+    def __init__(self, max_size=(200, 160), margin=10, dot_size=3):
+        """
+        Overview of the level in a screen corner: floor, furniture and walls
+        are drawn once per level into a small surface, and each frame only
+        that surface is blitted and the coins and player are dotted over it.
+
+        The static image is rebuilt when the level or its solid geometry
+        (World.geometry_key, e.g. after a hot reload) changes.
+
+        Parameters:
+        - max_size: Largest size of the map; the level is scaled to fit, keeping its aspect
+        - margin: Distance from the bottom right corner of the screen
+        - dot_size: Side of the coin and player dots in pixels
+        """
+        self.max_size = max_size
+        self.margin = margin
+        self.dot_size = dot_size
+        self.key = None  # (level, geometry key) the image was drawn for
+        self.image = None
+        self.scale = 1.0
+
+    def build(self, game):
+        """
+        Draws the static image of the current level.
+        """
+        level = game.levels[game.current_level]
+        width, height = game.level_dimensions()
+        self.scale = scale = min(self.max_size[0] / width, self.max_size[1] / height)
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+
+        if game.current_level < len(game.background_images):
+            # Hand-made levels: the background art already shows the floor plan
+            image = pygame.transform.smoothscale(game.background_images[game.current_level], size)
+        else:
+            image = pygame.Surface(size)
+            image.fill(FLOOR_COLOR)
+            for x, y, w, h in rects(level.get("invisibleObstacle", [])):
+                image.fill(FURNITURE_COLOR, (x * scale, y * scale, max(1, w * scale), max(1, h * scale)))
+        for x, y, w, h in rects(level.get("obstacles", [])):
+            image.fill(WALL_COLOR, (x * scale, y * scale, max(1, w * scale), max(1, h * scale)))
+        pygame.draw.rect(image, BORDER_COLOR, image.get_rect(), 1)
+        self.image = game.screen.prepare(image)
+
+    def draw(self, game):
+        world = game.world
+        key = (game.current_level, world.geometry_key())
+        if key != self.key:
+            self.build(game)
+            self.key = key
+
+        screen, scale, dot = game.screen, self.scale, self.dot_size
+        left = screen.get_width() - self.image.get_width() - self.margin
+        top = screen.get_height() - self.image.get_height() - self.margin
+        screen.blit(self.image, (left, top))
+
+        # Coins still to collect, as one batch of dots
+        n = world.count
+        ids = np.flatnonzero(world.alive[:n] & (world.collectible[:n] != 0))
+        if len(ids):
+            xs = (left + (world.x[ids] + world.w[ids] / 2) * scale - dot // 2).astype(np.int32)
+            ys = (top + (world.y[ids] + world.h[ids] / 2) * scale - dot // 2).astype(np.int32)
+            screen.dots(xs, ys, np.broadcast_to(np.array(COIN_COLOR, dtype=np.uint8), (len(ids), 3)), dot)
+
+        camera = game.camera
+        if camera.world_width > camera.width or camera.world_height > camera.height:
+            # The part of the level on screen, on scrolling levels
+            ox, oy = camera.offset
+            x0, y0 = left - ox * scale, top - oy * scale
+            x1, y1 = x0 + camera.width * scale, y0 + camera.height * scale
+            corners = ((x0, y0), (x1, y0), (x1, y1), (x0, y1))
+            for start, end in zip(corners, corners[1:] + corners[:1]):
+                screen.line(VIEW_COLOR, start, end)
+
+        px, py = game.player_center()
+        screen.fill(PLAYER_COLOR, (left + px * scale - dot // 2 - 1, top + py * scale - dot // 2 - 1, dot + 2, dot + 2))
@@ -0,0 +1,133 @@
+import numpy as np
+
+from entities import COIN_COLOR
+from telemetry import DEATH_GUARD, DEATH_LASER, DEATH_SWING
+
+# Burst presets: particle count, speed range (px/tick), lifetime range (ticks), colour
+COIN_BURST = (24, (1.0, 3.0), (20, 40), COIN_COLOR)
+DEATH_BURSTS = {
+    DEATH_LASER: (80, (1.5, 4.5), (25, 50), (255, 40, 20)),
+    DEATH_SWING: (60, (1.0, 3.5), (25, 45), (120, 120, 120)),
+    DEATH_GUARD: (60, (1.0, 3.5), (25, 45), (255, 230, 120)),
+}
+
+
+class ParticlePool:
+    def __init__(self, capacity=8192, gravity=0.06, drag=0.96, size=2, seed=0):
+        """
+        Fixed-capacity pool of short-lived particles for visual effects.
+
+        Every particle lives in preallocated NumPy columns (position,
+        velocity, lifetime, colour); the live ones are kept packed at the
+        front, so one vectorized step moves and expires all of them and
+        bursts only write into the free tail. When the pool is full, the
+        rest of a burst is dropped.
+
+        The random generator is part of the pool, so a restored snapshot
+        (Game.snapshot) emits the same particles again.
+
+        Parameters:
+        - capacity: Particles alive at most
+        - gravity: Added to the vertical velocity every tick
+        - drag: Velocity kept per tick
+        - size: Side of a particle on screen in pixels
+        - seed: Seed of the burst directions and speeds
+        """
+        self.capacity = capacity
+        self.gravity = gravity
+        self.drag = drag
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity, dtype=np.int32)  # Ticks left
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.keep = np.zeros(capacity, dtype=bool)  # Scratch for update
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, x, y, count, speed, life, color):
+        """
+        Bursts particles outward from a point in random directions.
+
+        Parameters:
+        - x, y: World position of the burst
+        - count: Particles to emit (fewer if the pool is nearly full)
+        - speed: (min, max) initial speed in pixels per tick
+        - life: (min, max) lifetime in ticks
+        - color: RGB colour
+        """
+        start = self.count
+        end = min(start + count, self.capacity)
+        if end == start:
+            return
+        rng = self.rng
+        angle = rng.random(end - start) * (2 * np.pi)
+        magnitude = rng.uniform(speed[0], speed[1], end - start)
+        np.multiply(np.cos(angle), magnitude, out=self.vx[start:end])
+        np.multiply(np.sin(angle), magnitude, out=self.vy[start:end])
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.life[start:end] = rng.integers(life[0], life[1], end - start, endpoint=True)
+        self.color[start:end] = color
+        self.count = end
+
+    def burst(self, x, y, preset):
+        self.emit(x, y, *preset)
+
+    def update(self):
+        """
+        Moves every live particle one tick and drops the expired ones.
+        """
+        n = self.count
+        if n == 0:
+            return
+        vx, vy, life = self.vx[:n], self.vy[:n], self.life[:n]
+        self.x[:n] += vx
+        self.y[:n] += vy
+        vy += self.gravity
+        vx *= self.drag
+        vy *= self.drag
+        life -= 1
+
+        keep = np.greater(life, 0, out=self.keep[:n])
+        alive = int(np.count_nonzero(keep))
+        if alive < n:
+            # Pack the survivors to the front (boolean indexing keeps their order)
+            for column in (self.x, self.y, self.vx, self.vy, self.life, self.color):
+                column[:alive] = column[:n][keep]
+            self.count = alive
+
+    def clear(self):
+        self.count = 0
+
+    def draw(self, screen, offset=(0, 0)):
+        """
+        Draws every live particle with one batched screen.dots call.
+        """
+        n = self.count
+        if n == 0:
+            return
+        xs = (self.x[:n] + offset[0]).astype(np.int32)
+        ys = (self.y[:n] + offset[1]).astype(np.int32)
+        screen.dots(xs, ys, self.color[:n], self.size)
+
+    def __getstate__(self):
+        # Only the live particles go into snapshots, not the whole capacity
+        state = self.__dict__.copy()
+        for name in ("x", "y", "vx", "vy", "life", "color", "keep"):
+            state[name] = state[name][: self.count].copy()
+        return state
+
+    def __setstate__(self, state):
+        capacity = state["capacity"]
+        for name in ("x", "y", "vx", "vy", "life", "color", "keep"):
+            column = state[name]
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[: len(column)] = column
+            state[name] = grown
+        self.__dict__.update(state)
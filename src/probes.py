@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+from entities import collides_any
+
+QUANTUM = 0.5  # Probe positions are keyed in half pixels, exact for the 2.5 px movement lattice
+
+
+class ProbeCache:
+    def __init__(self, max_entries=65536, quantum=QUANTUM):
+        """
+        LRU memo of static-collision results for movement probes.
+
+        The player moves on a fixed lattice against geometry that does not
+        change, so the same (x, y) probes come up again and again. Results
+        are keyed by level id and quantized position; each level's entries
+        are tagged with its geometry key and dropped as soon as a probe
+        arrives with a different one (a new run's endless level, a reload).
+
+        Parameters:
+        - max_entries: Results kept before the least recently used is dropped
+        - quantum: Key resolution in pixels; probes off this grid are not cached
+        """
+        self.max_entries = max_entries
+        self.scale = 1 / quantum
+        self.results = OrderedDict()  # (level id, x, y, width, height, shape) -> collides
+        self.geometry = {}  # level id -> geometry key the level's entries were computed for
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncached = 0  # Probes that could not be keyed (off the grid or no level id)
+
+    def collides(self, solids, x, y, width, height, shape=None):
+        """
+        collides_any(solids, ...) through the cache.
+
+        Parameters:
+        - solids: Static geometry with level_id and geometry_key() (an ecs.World);
+          anything else is tested directly
+        - shape: SpriteShape to test instead of the rectangle (precise collision; World only)
+        """
+        level_id = getattr(solids, "level_id", None)
+        qx, qy = x * self.scale, y * self.scale
+        if level_id is None or qx != int(qx) or qy != int(qy):
+            self.uncached += 1
+            return self._test(solids, x, y, width, height, shape)
+
+        geometry = solids.geometry_key()
+        if self.geometry.get(level_id) != geometry:
+            self.invalidate(level_id)
+            self.geometry[level_id] = geometry
+
+        key = (level_id, int(qx), int(qy), width, height, shape)
+        results = self.results
+        result = results.get(key)
+        if result is not None:
+            self.hits += 1
+            results.move_to_end(key)
+            return result
+        self.misses += 1
+        result = results[key] = self._test(solids, x, y, width, height, shape)
+        if len(results) > self.max_entries:
+            results.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    @staticmethod
+    def _test(solids, x, y, width, height, shape):
+        if shape is None:
+            return collides_any(solids, x, y, width, height)
+        return shape.collides(solids, x, y)
+
+    def invalidate(self, level_id=None):
+        """
+        Forgets the results for one level (all levels if None).
+        """
+        if level_id is None:
+            self.results.clear()
+            self.geometry.clear()
+            return
+        self.geometry.pop(level_id, None)
+        for key in [key for key in self.results if key[0] == level_id]:
+            del self.results[key]
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "uncached": self.uncached,
+            "entries": len(self.results),
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,212 @@
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    time_ms INTEGER NOT NULL,
+    deaths INTEGER NOT NULL,
+    coins INTEGER NOT NULL,
+    levels INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS splits (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    level INTEGER NOT NULL,
+    time_ms INTEGER NOT NULL,
+    deaths INTEGER NOT NULL,
+    coins INTEGER NOT NULL,
+    PRIMARY KEY (run_id, level)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_by_time ON runs (time_ms);
+CREATE INDEX IF NOT EXISTS runs_by_player ON runs (player, time_ms);
+CREATE INDEX IF NOT EXISTS splits_by_level ON splits (level, time_ms);
+"""
+
+RUN_COLUMNS = ("player", "finished_at", "time_ms", "deaths", "coins", "levels")
+
+
+class Run:
+    __slots__ = ("player", "finished_at", "time_ms", "deaths", "coins", "levels", "splits")
+
+    def __init__(self, player, time_ms, deaths, coins, splits=(), finished_at=None):
+        """
+        One finished playthrough.
+
+        Parameters:
+        - player: Name the run is recorded under
+        - time_ms: Total run time in milliseconds
+        - deaths: Restarts during the run
+        - coins: Coins collected
+        - splits: List of (level, time_ms, deaths, coins), one per completed level
+        - finished_at: Unix time the run ended (now if None)
+        """
+        self.player = player
+        self.finished_at = time.time() if finished_at is None else finished_at
+        self.time_ms = int(time_ms)
+        self.deaths = deaths
+        self.coins = coins
+        self.splits = list(splits)
+        self.levels = len(self.splits)
+
+    def row(self):
+        return tuple(getattr(self, column) for column in RUN_COLUMNS)
+
+
+class RunStore:
+    def __init__(self, path="heist_runs.db", batch_size=256, flush_interval=1.0):
+        """
+        Run history and leaderboard in an indexed SQLite database.
+
+        record_run only queues the run; a background thread writes queued
+        runs in batches, one transaction per batch, so the game loop never
+        waits on the disk. Runs not yet written are still included in the
+        leaderboard queries.
+
+        Parameters:
+        - path: Database file (":memory:" is not shared between threads; use a file)
+        - batch_size: Most runs written in one transaction
+        - flush_interval: Seconds the writer waits for more runs before committing
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = {}  # id(run) -> queued run not yet committed, for the queries
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+
+        self.reader = self._connect()
+        self.reader.executescript(SCHEMA)
+        self.writer = threading.Thread(target=self._write_loop, name="run-store", daemon=True)
+        self.writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")  # Readers do not wait for the writer
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record_run(self, run):
+        """
+        Queues a finished Run for writing. Returns immediately.
+        """
+        with self.lock:
+            self.pending[id(run)] = run
+        self.queue.put(run)
+
+    def _write_loop(self):
+        connection = self._connect()
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                if None in batch:  # close() was called: write what came before it and stop
+                    closing = True
+                    runs = batch[: batch.index(None)]
+                else:
+                    runs = batch
+                if runs:
+                    self._write(connection, runs)
+            finally:
+                # Even after a failed write, so flush() and close() never wait forever
+                for _ in batch:
+                    self.queue.task_done()
+        connection.close()
+
+    def _write(self, connection, runs):
+        try:
+            self._insert(connection, runs)
+        except sqlite3.Error as error:
+            if len(runs) == 1:
+                print(f"Run of {runs[0].player} not recorded: {error}")
+            else:
+                # The batch was rolled back: retry its runs one by one, so only the bad ones are lost
+                for run in runs:
+                    self._write(connection, [run])
+        finally:
+            with self.lock:
+                for run in runs:
+                    self.pending.pop(id(run), None)
+
+    @staticmethod
+    def _insert(connection, runs):
+        with connection:  # One transaction, rolled back if any insert fails
+            for run in runs:
+                # SQLite assigns the id, so other processes writing the same file cannot clash
+                run_id = connection.execute(
+                    "INSERT INTO runs (player, finished_at, time_ms, deaths, coins, levels) VALUES (?, ?, ?, ?, ?, ?)",
+                    run.row(),
+                ).lastrowid
+                connection.executemany(
+                    "INSERT INTO splits (run_id, level, time_ms, deaths, coins) VALUES (?, ?, ?, ?, ?)",
+                    [(run_id, *split) for split in run.splits],
+                )
+
+    def flush(self):
+        """
+        Blocks until every queued run is in the database.
+        """
+        self.queue.join()
+
+    def close(self):
+        """
+        Writes the remaining runs and stops the writer thread.
+        """
+        self.queue.put(None)
+        self.writer.join()
+        self.reader.close()
+
+    def _query(self, sql, parameters, player=None):
+        # Snapshot the pending runs first: a run committed in between is then
+        # in both lists (kept once) rather than in neither
+        with self.lock:
+            pending = [run.row() for run in self.pending.values() if player is None or run.player == player]
+        rows = self.reader.execute(sql, parameters).fetchall()
+        written = set(rows)
+        return rows + [row for row in pending if row not in written]
+
+    def top_runs(self, n=10):
+        """
+        The n fastest runs.
+
+        Returns:
+        - List of (player, finished_at, time_ms, deaths, coins, levels), fastest first
+        """
+        rows = self._query(
+            "SELECT player, finished_at, time_ms, deaths, coins, levels FROM runs ORDER BY time_ms LIMIT ?", (n,)
+        )
+        return sorted(rows, key=lambda row: row[2])[:n]
+
+    def personal_best(self, player):
+        """
+        The player's fastest run as a (player, finished_at, time_ms, deaths, coins, levels) tuple, or None.
+        """
+        rows = self._query(
+            "SELECT player, finished_at, time_ms, deaths, coins, levels FROM runs WHERE player = ? ORDER BY time_ms LIMIT 1",
+            (player,),
+            player,
+        )
+        return min(rows, key=lambda row: row[2]) if rows else None
+
+    def best_splits(self, level, n=10):
+        """
+        The n fastest written times for one level, as (player, time_ms, deaths, coins) tuples.
+        """
+        return self.reader.execute(
+            "SELECT runs.player, splits.time_ms, splits.deaths, splits.coins FROM splits "
+            "JOIN runs ON runs.id = splits.run_id WHERE splits.level = ? ORDER BY splits.time_ms LIMIT ?",
+            (level, n),
+        ).fetchall()
+
+    def run_count(self):
+        self.flush()
+        return self.reader.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
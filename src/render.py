@@ -0,0 +1,298 @@
+import math
+import weakref
+
+import pygame
+
+try:
+    from pygame._sdl2 import sdl2, video
+
+    RENDER_ERRORS = (pygame.error, sdl2.error)
+except ImportError:  # pygame builds without the SDL2 render API
+    video = None
+    RENDER_ERRORS = (pygame.error,)
+
+# SDL blend modes (SDL_BlendMode values)
+BLENDMODE_NONE = 0
+BLENDMODE_BLEND = 1
+BLENDMODE_ADD = 2
+BLENDMODE_MOD = 4
+
+# Surface.blit special flags the texture backend can reproduce with a blend mode
+SPECIAL_BLEND_MODES = {
+    pygame.BLEND_RGB_MULT: BLENDMODE_MOD,
+    pygame.BLEND_RGB_ADD: BLENDMODE_ADD,
+}
+
+
+class SoftwareBackend:
+    def __init__(self, size, title="HEIST Game", scaled=False):
+        """
+        Draws into the display surface with the CPU (the original render path).
+
+        Both backends share this small Surface-like API, so draw methods can
+        take either: fill, blit, stream, line, dots, get_size and present.
+
+        Parameters:
+        - size: Logical resolution the game draws at
+        - title: Window caption
+        - scaled: Let SDL scale the logical resolution to a resizable window
+        """
+        flags = pygame.SCALED | pygame.RESIZABLE if scaled else 0
+        self.surface = pygame.display.set_mode(size, flags)
+        pygame.display.set_caption(title)
+        self.name = "software"
+
+    def get_size(self):
+        return self.surface.get_size()
+
+    def get_width(self):
+        return self.surface.get_width()
+
+    def get_height(self):
+        return self.surface.get_height()
+
+    def prepare(self, surface):
+        """
+        Converts a loaded image to the display format so blitting it is fast.
+        """
+        if surface.get_flags() & pygame.SRCALPHA:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def fill(self, color, rect=None):
+        return self.surface.fill(color, rect)
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        return self.surface.blit(source, dest, area, special_flags)
+
+    def stream(self, source, dest, area=None, special_flags=0):
+        """
+        Blits a surface that is redrawn every frame (same as blit here).
+        """
+        return self.surface.blit(source, dest, area, special_flags)
+
+    def line(self, color, start, end, width=1):
+        return pygame.draw.line(self.surface, color, start, end, width)
+
+    def dots(self, xs, ys, colors, size=2):
+        """
+        Draws many small squares at once (particles) by writing the pixels
+        through a surfarray view, without a call per dot.
+
+        Parameters:
+        - xs, ys: Integer arrays of top-left corners on screen
+        - colors: (n, 3) uint8 array of RGB colours
+        - size: Side of every square in pixels
+        """
+        xs, ys, colors = visible_dots(xs, ys, colors, size, self.surface.get_size())
+        if len(xs) == 0:
+            return
+        pixels = pygame.surfarray.pixels3d(self.surface)
+        for dx in range(size):
+            for dy in range(size):
+                pixels[xs + dx, ys + dy] = colors
+        del pixels  # Unlocks the surface
+
+    def present(self):
+        pygame.display.update()
+
+
+def visible_dots(xs, ys, colors, size, screen_size):
+    """
+    The dots that lie entirely on a screen of screen_size.
+    """
+    inside = (xs >= 0) & (ys >= 0) & (xs <= screen_size[0] - size) & (ys <= screen_size[1] - size)
+    return xs[inside], ys[inside], colors[inside]
+
+
+class TextureBackend:
+    def __init__(self, size, title="HEIST Game", window_size=None, accelerated=True):
+        """
+        Draws with the SDL renderer: every surface is uploaded once to a GPU
+        texture and drawn as a textured quad.
+
+        Textures are cached per surface and dropped with it, so backgrounds,
+        coins, the robber atlas and chunk images are uploaded only once.
+        Surfaces redrawn every frame (vision cones, darkness) go through
+        stream, which re-uploads their pixels into the same texture.
+
+        The game always draws at the logical resolution; the renderer scales
+        it (letterboxed) to whatever size the window is resized to.
+
+        Parameters:
+        - size: Logical resolution the game draws at
+        - title: Window caption
+        - window_size: Initial window size (defaults to the logical size)
+        - accelerated: Try a GPU renderer first; SDL's software renderer is
+          used if no GPU renderer can be created
+        """
+        self.window = video.Window(title, size=window_size or size, resizable=True)
+        self.renderer = None
+        self.name = "texture"
+        if accelerated:
+            try:
+                self.renderer = video.Renderer(self.window, accelerated=1)
+            except RENDER_ERRORS:
+                pass  # No GPU driver: fall through to the software renderer
+        if self.renderer is None:
+            self.renderer = video.Renderer(self.window, accelerated=0)
+            self.name = "texture-software"
+        self.renderer.logical_size = size
+        self.size = tuple(size)
+        self.textures = weakref.WeakKeyDictionary()  # Surface -> Texture
+        self.dot_layer = None  # Transparent layer the dots are written into
+        self.dot_area = pygame.Rect(0, 0, 0, 0)  # Part of the layer holding the last dots
+
+        white = pygame.Surface((1, 1))
+        white.fill((255, 255, 255))
+        self.white = video.Texture.from_surface(self.renderer, white)  # Tinted for lines
+
+    def get_size(self):
+        return self.size
+
+    def get_width(self):
+        return self.size[0]
+
+    def get_height(self):
+        return self.size[1]
+
+    def prepare(self, surface):
+        return surface  # Uploaded on first use; no display format to match
+
+    def texture(self, surface):
+        """
+        Texture for a surface, uploading it the first time it is drawn.
+        """
+        texture = self.textures.get(surface)
+        if texture is None:
+            texture = video.Texture.from_surface(self.renderer, surface)
+            if surface.get_flags() & pygame.SRCALPHA or surface.get_colorkey() is not None:
+                texture.blend_mode = BLENDMODE_BLEND
+            self.textures[surface] = texture
+        return texture
+
+    def _draw(self, texture, source, dest, area, special_flags):
+        if area is None:
+            width, height = source.get_size()
+        else:
+            area = pygame.Rect(area)
+            width, height = area.size
+        x, y = dest[0], dest[1]
+        if not special_flags:
+            texture.draw(srcrect=area, dstrect=(x, y, width, height))
+            return
+        # The special mode is for this draw only; later plain blits keep the texture's own mode
+        mode = texture.blend_mode
+        texture.blend_mode = SPECIAL_BLEND_MODES.get(special_flags, BLENDMODE_BLEND)
+        texture.draw(srcrect=area, dstrect=(x, y, width, height))
+        texture.blend_mode = mode
+
+    def fill(self, color, rect=None):
+        self.renderer.draw_color = pygame.Color(color)
+        if rect is None:
+            self.renderer.clear()
+        else:
+            self.renderer.fill_rect(rect)
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        self._draw(self.texture(source), source, dest, area, special_flags)
+
+    def stream(self, source, dest, area=None, special_flags=0):
+        """
+        Blits a surface that is redrawn every frame, re-uploading its pixels.
+        """
+        texture = self.textures.get(source)
+        if texture is None or (texture.width, texture.height) != source.get_size():
+            self.textures.pop(source, None)
+            texture = self.texture(source)
+        else:
+            texture.update(source)
+        self._draw(texture, source, dest, area, special_flags)
+
+    def line(self, color, start, end, width=1):
+        # A thick line is the white pixel stretched into a rotated quad
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        length = math.hypot(dx, dy)
+        self.white.color = pygame.Color(color)
+        self.white.draw(
+            dstrect=(start[0], start[1] - width / 2, length, width),
+            angle=math.degrees(math.atan2(dy, dx)),
+            origin=(0, width / 2),
+        )
+
+    def dots(self, xs, ys, colors, size=2):
+        """
+        Draws many small squares at once (particles): they are written into
+        a screen-sized layer through surfarray, and only the rectangle they
+        cover is uploaded and drawn.
+        """
+        xs, ys, colors = visible_dots(xs, ys, colors, size, self.size)
+        if len(xs) == 0:
+            return
+        if self.dot_layer is None:
+            self.dot_layer = pygame.Surface(self.size, pygame.SRCALPHA)
+        layer = self.dot_layer
+        layer.fill((0, 0, 0, 0), self.dot_area)  # Clear the previous dots
+        area = self.dot_area = pygame.Rect(
+            int(xs.min()), int(ys.min()), int(xs.max()) - int(xs.min()) + size, int(ys.max()) - int(ys.min()) + size
+        )
+        pixels, alpha = pygame.surfarray.pixels3d(layer), pygame.surfarray.pixels_alpha(layer)
+        for dx in range(size):
+            for dy in range(size):
+                pixels[xs + dx, ys + dy] = colors
+                alpha[xs + dx, ys + dy] = 255
+        del pixels, alpha
+        texture = self.texture(layer)
+        texture.update(layer.subsurface(area), area)
+        texture.draw(srcrect=area, dstrect=area)
+
+    def present(self):
+        self.renderer.present()
+
+
+class OffscreenBackend(SoftwareBackend):
+    def __init__(self, size):
+        """
+        Draws into a plain Surface instead of a window, for headless
+        rendering (see sessions.py). present() does nothing; read the pixels
+        from surface.
+
+        Parameters:
+        - size: Resolution the game draws at
+        """
+        if pygame.display.get_surface() is None:
+            # A hidden 1x1 mode gives images a display format to convert to
+            # (blits between unconverted surfaces are several times slower);
+            # under SDL's dummy video driver no window exists at all
+            pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        self.surface = pygame.Surface(size).convert()
+        self.name = "offscreen"
+
+    def present(self):
+        pass
+
+
+def create_backend(kind, size, title="HEIST Game", window_size=None):
+    """
+    Picks the render backend at startup.
+
+    Parameters:
+    - kind: "software", "texture", "offscreen" (no window), or "auto" (texture if pygame has the SDL2 render API)
+    - size: Logical resolution the game draws at
+    - title: Window caption
+    - window_size: Initial window size; a different size scales the logical resolution
+
+    Returns:
+    - A SoftwareBackend, TextureBackend or OffscreenBackend
+    """
+    if kind not in ("auto", "software", "texture", "offscreen"):
+        raise ValueError(f"Unknown render backend: {kind}")
+    if kind == "offscreen":
+        return OffscreenBackend(size)
+    if kind != "software" and video is not None:
+        try:
+            return TextureBackend(size, title, window_size)
+        except RENDER_ERRORS:
+            if kind == "texture":
+                raise
+    return SoftwareBackend(size, title, scaled=window_size is not None and tuple(window_size) != tuple(size))
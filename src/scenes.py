@@ -0,0 +1,163 @@
+import pygame
+
+from hud import PANEL_COLOR, format_time
+
+TICK_RATE = 100  # Gameplay updates per second (the old 10 ms loop delay)
+FRAME_RATE = 100  # Frames drawn per second while the player is active
+IDLE_FRAME_RATE = 25  # Frames drawn per second once the player stands still
+IDLE_AFTER = TICK_RATE  # Ticks without movement before gameplay counts as idle
+
+# Events that mean the window contents were lost and must be redrawn
+REDRAW_EVENTS = {pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSHOWN, pygame.WINDOWRESTORED}
+
+
+class Scene:
+    static = False  # Static scenes sleep in pygame.event.wait and redraw only after events
+
+    def __init__(self, game):
+        self.game = game
+
+    def handle_event(self, event):
+        """
+        Handles one event. Returns True if the scene needs to be redrawn.
+        """
+        return False
+
+    def update(self):
+        pass
+
+    def draw(self):
+        pass
+
+    def idle(self):
+        """
+        True if the scene can be drawn at the idle frame rate.
+        """
+        return False
+
+
+class ImageScene(Scene):
+    static = True
+
+    def __init__(self, game, image):
+        """
+        A full-screen picture that waits for a click.
+
+        Parameters:
+        - game: The Game the scene belongs to
+        - image: Surface drawn over the whole window
+        """
+        super().__init__(game)
+        self.image = image
+
+    def draw(self):
+        self.game.screen.blit(self.image, (0, 0))
+        self.game.screen.present()
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.on_click()
+            return True
+        return False
+
+    def on_click(self):
+        pass
+
+
+class TitleScene(ImageScene):
+    def __init__(self, game):
+        super().__init__(game, game.first_screen_image)
+
+    def on_click(self):
+        # When user clicks on the title screen, show the instructions
+        self.game.scenes.replace(InstructionsScene(self.game))
+
+
+class InstructionsScene(ImageScene):
+    def __init__(self, game):
+        super().__init__(game, game.instruction_screen_image)
+
+    def on_click(self):
+        # When user clicks on the instruction screen, start the game
+        self.game.scenes.replace(PlayScene(self.game))
+
+
+class GameOverScene(ImageScene):
+    def __init__(self, game, leaderboard_size=5):
+        super().__init__(game, game.end_screen_image)
+        # Queried once; the run just finished is included even before it is written
+        self.lines = []
+        records = game.records
+        if records is not None:
+            self.lines.append("Fastest runs")
+            for rank, (player, _, time_ms, deaths, coins, _) in enumerate(records.top_runs(leaderboard_size), 1):
+                self.lines.append(f"{rank}. {player}  {format_time(time_ms / 1000)}  deaths {deaths}  coins {coins}")
+            best = records.personal_best(game.player_name)
+            if best is not None:
+                self.lines.append(f"Your best: {format_time(best[2] / 1000)}")
+
+    def draw(self):
+        screen = self.game.screen
+        screen.blit(self.image, (0, 0))
+        if self.lines:
+            text = self.game.hud.text
+            line_height = self.game.font.get_linesize()
+            top = screen.get_height() - line_height * len(self.lines) - 40
+            screen.fill(PANEL_COLOR, (0, top - 20, screen.get_width(), screen.get_height() - top + 20))
+            for i, line in enumerate(self.lines):
+                screen.blit(text.get(line, (255, 255, 255)), (40, top + i * line_height))
+        screen.present()
+
+    def on_click(self):
+        # Start a fresh run from the title screen
+        self.game.new_run()
+        self.game.scenes.replace(TitleScene(self.game))
+
+
+class PlayScene(Scene):
+    def __init__(self, game):
+        super().__init__(game)
+        self.still_ticks = 0
+
+    def handle_event(self, event):
+        self.game.input.handle_event(event)
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_l:
+            self.game.darkness = not self.game.darkness  # Toggle flashlight mode
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_m:
+            self.game.show_minimap = not self.game.minimap_visible()  # Toggle the minimap
+        if event.type == pygame.KEYDOWN:
+            self.still_ticks = 0  # Wake up to the full frame rate on any key
+        return True
+
+    def update(self):
+        self.game.update()
+        self.still_ticks = 0 if self.game.player.animation.moving else self.still_ticks + 1
+
+    def draw(self):
+        self.game.draw()
+
+    def idle(self):
+        return self.still_ticks > IDLE_AFTER
+
+
+class SceneStack:
+    def __init__(self):
+        """
+        Stack of scenes; only the top one receives events, updates and draws.
+        """
+        self.scenes = []
+
+    @property
+    def top(self):
+        return self.scenes[-1]
+
+    def push(self, scene):
+        self.scenes.append(scene)
+
+    def pop(self):
+        return self.scenes.pop()
+
+    def replace(self, scene):
+        if self.scenes:
+            self.scenes.pop()
+        self.scenes.append(scene)
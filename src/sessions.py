@@ -0,0 +1,258 @@
+import os
+import pickle
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+DARKNESS_BIT = 0x10  # Input byte: action bitmask (InputBuffer.mask) in the low bits, flashlight mode here
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class SessionRecorder:
+    def __init__(self, path, flush_every=1000):
+        """
+        Records a play session for offline replay: one input byte per
+        gameplay tick, plus a keyframe (Game.snapshot) wherever the state
+        jumps without input, i.e. at the start and on every new run.
+
+        The file is a stream of pickled chunks, appended as the game runs so
+        a crash loses at most flush_every ticks:
+        - ("keyframe", tick index, snapshot)
+        - ("inputs", tick index of the first byte, bytes)
+
+        Parameters:
+        - path: Session file (overwritten)
+        - flush_every: Ticks buffered before the inputs are written
+        """
+        self.file = open(path, "wb")
+        self.flush_every = flush_every
+        self.inputs = bytearray()
+        self.start = 0  # Tick index of inputs[0]
+        self.needs_keyframe = True
+
+    def restart(self):
+        """
+        Takes a keyframe before the next tick (call when the game state is reset).
+        """
+        self.needs_keyframe = True
+
+    def before_tick(self, game):
+        """
+        Called by Game.update before the tick advances; takes the pending keyframe.
+        """
+        if self.needs_keyframe:
+            self.flush()
+            pickle.dump(("keyframe", self.start, game.snapshot()), self.file)
+            self.needs_keyframe = False
+
+    def record(self, game):
+        """
+        Called by Game.update once the tick's input has been read.
+        """
+        self.inputs.append(game.input.mask | (DARKNESS_BIT if game.darkness else 0))
+        if len(self.inputs) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.inputs:
+            pickle.dump(("inputs", self.start, bytes(self.inputs)), self.file)
+            self.start += len(self.inputs)
+            self.inputs.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_session(path):
+    """
+    Returns:
+    - (keyframes, inputs): dict of tick index -> snapshot, and one input byte per tick
+    """
+    keyframes, inputs = {}, bytearray()
+    with open(path, "rb") as f:
+        while True:
+            try:
+                kind, index, data = pickle.load(f)
+            except EOFError:
+                break
+            if kind == "keyframe":
+                keyframes[index] = data
+            else:
+                inputs[index:] = data
+    return keyframes, bytes(inputs)
+
+
+def apply_input(game, byte):
+    """
+    Sets up a recorded tick's input so the next Game.update replays it.
+    """
+    held = game.input.held
+    for action in range(len(held)):
+        held[action] = byte >> action & 1
+    game.input.queue.clear()
+    game.darkness = bool(byte & DARKNESS_BIT)
+
+
+def replay(game, keyframes, inputs, start, stop, checkpoint=None, on_tick=None):
+    """
+    Runs ticks start..stop-1 of a session through Game.update.
+
+    Parameters:
+    - checkpoint: Snapshot to resume from at start (a keyframe at start takes precedence)
+    - on_tick: Called with the tick index after each tick
+    """
+    if start in keyframes:
+        checkpoint = keyframes[start]
+    if checkpoint is not None:
+        game.restore(checkpoint)
+    for index in range(start, stop):
+        if index != start and index in keyframes:
+            game.restore(keyframes[index])
+        apply_input(game, inputs[index])
+        game.update()
+        if on_tick is not None:
+            on_tick(index)
+
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def write_png(path, surface, compression=1):
+    """
+    Saves a surface as an RGB PNG with fast zlib settings (pygame.image.save
+    compresses harder and takes about three times as long per frame).
+    """
+    import pygame
+
+    width, height = surface.get_size()
+    rows = np.frombuffer(pygame.image.tobytes(surface, "RGB"), dtype=np.uint8).reshape(height, width * 3)
+    scanlines = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # Filter byte 0 (none) per row
+    scanlines[:, 1:] = rows
+    with open(path, "wb") as f:
+        f.write(PNG_SIGNATURE)
+        f.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), compression)))
+        f.write(png_chunk(b"IEND", b""))
+
+
+# Offline rendering: one Game per worker process, created by the pool initializer
+worker_game = None
+
+
+def make_headless_game(ghost_dir=None):
+    """
+    A Game drawing into an offscreen surface, with no records.
+
+    Parameters:
+    - ghost_dir: Ghost directory whose saved runs are drawn (read-only: replayed runs are not added)
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    from ghosts import GhostLibrary
+    from main import Game
+
+    game = Game(renderer="offscreen", records_path=None, ghost_dir=None)
+    if ghost_dir:
+        game.ghost_library = GhostLibrary(ghost_dir, read_only=True)
+        game.open_ghosts()
+    return game
+
+
+def init_worker(ghost_dir):
+    global worker_game
+    worker_game = make_headless_game(ghost_dir)
+
+
+def render_range(task):
+    """
+    Worker task: replays ticks start..stop-1 from a checkpoint and writes
+    the frames drawn in that range as numbered PNGs.
+
+    Returns:
+    - Number of frames written
+    """
+    keyframes, inputs, start, stop, checkpoint, ticks_per_frame, out_dir = task
+    game = worker_game
+    written = 0
+
+    def draw(index):
+        nonlocal written
+        if (index + 1) % ticks_per_frame == 0:
+            game.draw()
+            frame = (index + 1) // ticks_per_frame - 1
+            write_png(os.path.join(out_dir, f"frame_{frame:06d}.png"), game.screen.surface)
+            written += 1
+
+    replay(game, keyframes, inputs, start, stop, checkpoint, draw)
+    return written
+
+
+def render_session(path, out_dir, workers=None, fps=None, frames_per_task=200, ghost_dir="ghosts"):
+    """
+    Re-simulates a recorded session headlessly and writes every frame as a PNG.
+
+    The session is first replayed once without drawing (cheap) to take a
+    snapshot at the start of every frames_per_task block; the blocks are
+    then drawn and encoded in parallel, each worker resuming from its
+    block's snapshot, so every worker produces exactly the frames a
+    single replay would.
+
+    Parameters:
+    - path: Session file from SessionRecorder
+    - out_dir: Directory for frame_NNNNNN.png
+    - workers: Worker processes (CPU count if None)
+    - fps: Frames per second of output (TICK_RATE, one frame per tick, if None)
+    - frames_per_task: Frames rendered per task
+    - ghost_dir: Ghost directory raced in the frames, as in Game (None for no ghosts); the
+      ghosts shown are the ones saved there now, not necessarily those seen while playing
+
+    Returns:
+    - Number of frames written
+    """
+    import multiprocessing
+
+    from scenes import TICK_RATE
+
+    keyframes, inputs = read_session(path)
+    ticks_per_frame = max(1, TICK_RATE // (fps or TICK_RATE))
+    frame_count = len(inputs) // ticks_per_frame
+    stop = frame_count * ticks_per_frame
+    ticks_per_task = frames_per_task * ticks_per_frame
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Deterministic checkpoints at every task boundary (ghosts are only drawn, not needed here)
+    game = make_headless_game()
+    tasks = []
+    for start in range(0, stop, ticks_per_task):
+        end = min(start + ticks_per_task, stop)
+        checkpoint = None if start in keyframes else game.snapshot()
+        needed = {index: data for index, data in keyframes.items() if start <= index < end}
+        tasks.append((needed, inputs, start, end, checkpoint, ticks_per_frame, out_dir))
+        replay(game, keyframes, inputs, start, end)
+
+    # Spawned, not forked: the workers must not inherit this process's SDL state
+    pool = multiprocessing.get_context("spawn").Pool(workers, initializer=init_worker, initargs=(ghost_dir,))
+    try:
+        frames = sum(pool.imap_unordered(render_range, tasks))
+    finally:
+        # Let the workers exit on their own: SDL turns the SIGTERM of Pool.terminate into a quit event
+        pool.close()
+        pool.join()
+    return frames
+
+
+if __name__ == "__main__":
+    # Usage: python src/sessions.py SESSION OUTPUT_DIR [WORKERS] [FPS] [GHOST_DIR]
+    session, out_dir = sys.argv[1], sys.argv[2]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    fps = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    ghost_dir = sys.argv[5] if len(sys.argv) > 5 else "ghosts"
+    began = time.perf_counter()
+    frames = render_session(session, out_dir, workers, fps, ghost_dir=ghost_dir)
+    print(f"{frames} frames in {time.perf_counter() - began:.1f} s")
@@ -0,0 +1,95 @@
+import pygame
+
+ROBBER_STANDING = "src/assets/standing_robber.png"
+ROBBER_WALK_FRAMES = (
+    "src/assets/robber_frame1.png",
+    "src/assets/robber_frame2.png",
+    "src/assets/robber_frame3.png",
+)
+
+# Atlas rows; the source art faces right
+RIGHT = 0
+LEFT = 1
+
+
+class SpriteAtlas:
+    def __init__(self, paths, size):
+        """
+        Loads animation frames once, scales them and packs them into a single
+        texture: one row per facing, with the left-facing row pre-flipped.
+
+        Parameters:
+        - paths: Image paths, one per frame
+        - size: (width, height) every frame is scaled to
+        """
+        self.frame_width, self.frame_height = int(size[0]), int(size[1])
+        frames = [pygame.transform.scale(pygame.image.load(path), (self.frame_width, self.frame_height)) for path in paths]
+
+        self.surface = pygame.Surface((self.frame_width * len(frames), self.frame_height * 2), pygame.SRCALPHA)
+        for i, frame in enumerate(frames):
+            self.surface.blit(frame, (i * self.frame_width, RIGHT * self.frame_height))
+            self.surface.blit(pygame.transform.flip(frame, True, False), (i * self.frame_width, LEFT * self.frame_height))
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()  # Match the display format so blits are fast
+
+        # rects[facing][frame] is the source area of that frame in the atlas
+        self.rects = tuple(
+            tuple(
+                pygame.Rect(i * self.frame_width, row * self.frame_height, self.frame_width, self.frame_height)
+                for i in range(len(frames))
+            )
+            for row in (RIGHT, LEFT)
+        )
+        self.translucent = {}  # alpha -> faded copy of the atlas
+
+    def blit(self, screen, position, facing, frame):
+        screen.blit(self.surface, position, self.rects[facing][frame])
+
+    def faded(self, alpha):
+        """
+        The atlas with its alpha scaled by alpha / 255, made once per alpha.
+        """
+        surface = self.translucent.get(alpha)
+        if surface is None:
+            surface = self.surface.copy()
+            surface.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+            self.translucent[alpha] = surface
+        return surface
+
+    def blit_faded(self, screen, position, facing, frame, alpha):
+        screen.blit(self.faded(alpha), position, self.rects[facing][frame])
+
+
+class Animator:
+    def __init__(self, frame_count, ticks_per_frame=6):
+        """
+        Picks the atlas frame to draw from the movement state and a tick counter.
+
+        Frame 0 is the standing pose; frames 1..frame_count-1 are the walk cycle.
+
+        Parameters:
+        - frame_count: Number of frames in the atlas row
+        - ticks_per_frame: Game ticks each walk frame is held for
+        """
+        self.walk_frames = frame_count - 1
+        self.ticks_per_frame = ticks_per_frame
+        self.facing = RIGHT
+        self.moving = False
+        self.tick = 0
+
+    def update(self, dx, dy):
+        """
+        Advances the animation by one tick given how far the sprite moved.
+        """
+        if dx < 0:
+            self.facing = LEFT
+        elif dx > 0:
+            self.facing = RIGHT  # Vertical movement keeps the last horizontal facing
+        self.moving = dx != 0 or dy != 0
+        self.tick = self.tick + 1 if self.moving else 0
+
+    @property
+    def frame(self):
+        if not self.moving or self.walk_frames <= 0:
+            return 0
+        return 1 + (self.tick // self.ticks_per_frame) % self.walk_frames
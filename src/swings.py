@@ -0,0 +1,111 @@
+import numpy as np
+
+ROPE_COLOR = (0, 255, 0)
+BOB_COLOR = (90, 90, 90)
+
+
+class Swing:
+    __slots__ = ("x", "y", "length", "angle", "damping", "gravity", "bob_size")
+
+    def __init__(self, x, y, length, angle, damping=0.0, gravity=0.1, bob_size=10):
+        """
+        A weight on a rope swinging from a ceiling anchor.
+
+        Parameters:
+        - x, y: Anchor point
+        - length: Length of the rope
+        - angle: Starting angle from straight down, in radians
+        - damping: Fraction of angular velocity lost per tick (0 swings forever)
+        - gravity: Gravitational constant in pixels per tick squared
+        - bob_size: Side of the square hit box at the end of the rope
+        """
+        self.x = x
+        self.y = y
+        self.length = length
+        self.angle = angle
+        self.damping = damping
+        self.gravity = gravity
+        self.bob_size = bob_size
+
+
+class SwingField:
+    def __init__(self, swings, substeps=1):
+        """
+        Every swing of a level stored as NumPy arrays and integrated together
+        with a fixed-step semi-implicit Euler integrator.
+
+        Parameters:
+        - swings: List of Swing objects
+        - substeps: Integration steps per game tick (more for long, fast ropes)
+        """
+        self.anchor_x = np.array([s.x for s in swings], dtype=np.float64)
+        self.anchor_y = np.array([s.y for s in swings], dtype=np.float64)
+        self.length = np.array([s.length for s in swings], dtype=np.float64)
+        self.angle = np.array([s.angle for s in swings], dtype=np.float64)
+        self.velocity = np.zeros(len(swings))
+        self.damping = np.array([s.damping for s in swings], dtype=np.float64)
+        self.gravity = np.array([s.gravity for s in swings], dtype=np.float64)
+        self.half_bob = np.array([s.bob_size / 2 for s in swings], dtype=np.float64)
+        self.substeps = substeps
+
+    def __len__(self):
+        return len(self.angle)
+
+    def step(self):
+        """
+        Advances every swing by one game tick.
+
+        Velocity is updated before position (semi-implicit Euler), which keeps
+        an undamped swing's amplitude steady instead of slowly growing.
+        """
+        dt = 1.0 / self.substeps
+        for _ in range(self.substeps):
+            acceleration = -self.gravity / self.length * np.sin(self.angle)
+            self.velocity += acceleration * dt
+            self.velocity *= (1.0 - self.damping) ** dt
+            self.angle += self.velocity * dt
+
+    def advance(self, tick):
+        """
+        Steps the swings once per game tick.
+        """
+        self.step()
+
+    def touches(self, x, y, width, height):
+        return self.hits(x, y, width, height)
+
+    def ends(self):
+        """
+        Positions of the rope ends, as (x, y) arrays.
+        """
+        return (
+            self.anchor_x + self.length * np.sin(self.angle),
+            self.anchor_y + self.length * np.cos(self.angle),
+        )
+
+    def hits(self, x, y, width, height):
+        """
+        True if the rectangle touches the hit box at the end of any rope.
+        """
+        end_x, end_y = self.ends()
+        half = self.half_bob
+        return bool(
+            (
+                (x < end_x + half) & (x + width > end_x - half) & (y < end_y + half) & (y + height > end_y - half)
+            ).any()
+        )
+
+    def draw(self, screen, offset=(0, 0)):
+        """
+        Draws the ropes and their weights.
+
+        Parameters:
+        - screen: The render backend the swings will be drawn with
+        - offset: Camera offset added to the positions
+        """
+        end_x, end_y = self.ends()
+        anchors = zip((self.anchor_x + offset[0]).tolist(), (self.anchor_y + offset[1]).tolist())
+        ends = zip((end_x + offset[0]).tolist(), (end_y + offset[1]).tolist(), self.half_bob.tolist())
+        for anchor, (ex, ey, half) in zip(anchors, ends):
+            screen.line(ROPE_COLOR, anchor, (ex, ey), 5)
+            screen.fill(BOB_COLOR, (ex - half, ey - half, 2 * half, 2 * half))
@@ -0,0 +1,219 @@
+from ghosts import GHOST_ALPHA
+from guards import GuardSystem
+from lighting import Flashlight
+from particles import COIN_BURST, DEATH_BURSTS
+from swings import SwingField
+from telemetry import DEATH_GUARD, DEATH_LASER, DEATH_SWING, PICKUP
+from tripwires import TripwireField
+from world import FLOOR_COLOR, FURNITURE_COLOR
+
+DEATH_MESSAGES = {
+    DEATH_LASER: "Player hit a laser! Restarting level.",
+    DEATH_SWING: "Player hit a swing! Restarting level.",
+    DEATH_GUARD: "Spotted by a guard! Restarting level.",
+}
+
+
+# Level keys with animated hazards, in the order they are checked: field factory and death cause
+HAZARD_FIELDS = {
+    "movingLasers": (lambda level: TripwireField(level["movingLasers"]), DEATH_LASER),
+    "swings": (lambda level: SwingField(level["swings"]), DEATH_SWING),
+    "guards": (lambda level: GuardSystem(level["guards"], level["obstacles"]), DEATH_GUARD),
+}
+
+
+# Fields whose touches is a shape overlap, refined against the sprite's pixels in precise
+# collision (guards test sight of the robber's centre, not contact)
+SHAPED_FIELDS = ("movingLasers", "swings")
+
+
+def build_hazard(level, key):
+    """
+    The (field, death cause) pair for one HAZARD_FIELDS key, or None if the level has none.
+    """
+    if not level.get(key):
+        return None
+    factory, cause = HAZARD_FIELDS[key]
+    return factory(level), cause
+
+
+def build_hazards(level):
+    """
+    The level's animated hazard fields as a dict of level key -> (field,
+    death cause), in the order they are checked. Each field has
+    advance(tick), touches(x, y, width, height) and draw(screen, offset),
+    so the hazard systems handle any of them the same way.
+    """
+    hazards = {}
+    for key in HAZARD_FIELDS:
+        hazard = build_hazard(level, key)
+        if hazard is not None:
+            hazards[key] = hazard
+    return hazards
+
+
+# Update systems, run in Game.update_systems order once per tick
+
+
+class MovementSystem:
+    def update(self, game):
+        player = game.player
+        player.move(game.keys, game.world, game.camera.world_width, game.camera.world_height)
+        game.camera.follow(player.x, player.y, player.width, player.height)
+        if game.chunks is not None:
+            game.chunks.stream(game.camera)
+
+
+class GhostRecorderSystem:
+    def update(self, game):
+        player, animation = game.player, game.player.animation
+        game.ghost_recorder.record(game.level_ticks(), player.x, player.y, animation.facing, animation.frame)
+
+
+class PickupSystem:
+    def update(self, game):
+        world = game.world
+        picked = game.player.collect_items(world)
+        for entity in picked.tolist():
+            game.particles.burst(world.x[entity] + world.w[entity] / 2, world.y[entity] + world.h[entity] / 2, COIN_BURST)
+        if len(picked) and game.telemetry is not None:
+            x, y = game.player_center()
+            for _ in picked:
+                game.telemetry.record(game.tick, game.current_level, PICKUP, x, y)
+
+
+class TelemetrySystem:
+    def update(self, game):
+        if game.telemetry is not None:
+            game.telemetry.sample(game.tick, game.current_level, *game.player_center())
+
+
+class HazardSystem:
+    def update(self, game):
+        player, world = game.player, game.world
+        shape = player.shape()  # None unless colliding with the sprite's pixels
+        # Static hazards are entities with a Hazard component
+        if shape is None:
+            hit = world.query(player.x, player.y, player.width, player.height, world.hazard)
+        else:
+            hit = shape.query(world, player.x, player.y, world.hazard)
+        if len(hit):
+            cause = int(world.hazard[hit[0]])
+            print(DEATH_MESSAGES.get(cause, "Restarting level."))
+            game.particles.burst(*game.player_center(), DEATH_BURSTS[cause])
+            game.restart_level(cause)
+
+        # Animated hazards advance every tick, even after a restart
+        for key, (field, cause) in game.hazards.items():
+            field.advance(game.tick)
+            if shape is not None and key in SHAPED_FIELDS:
+                touched = shape.touches(field, player.x, player.y)
+            else:
+                touched = field.touches(player.x, player.y, player.width, player.height)
+            if touched:
+                print(DEATH_MESSAGES[cause])
+                game.particles.burst(*game.player_center(), DEATH_BURSTS[cause])
+                game.restart_level(cause)
+
+
+class ProgressSystem:
+    def update(self, game):
+        # Check if all items are collected
+        if game.world.remaining(game.world.collectible) == 0:
+            game.complete_level()
+
+
+class ParticleSystem:
+    def update(self, game):
+        game.particles.update()
+
+
+# Draw systems, run in Game.draw_systems order once per frame
+
+
+class BackgroundRenderer:
+    def draw(self, game):
+        screen = game.screen
+        screen.fill((255, 255, 255))
+        if game.chunks is not None:
+            game.chunks.draw(screen, game.camera)  # Floor, furniture and walls are baked into the chunks
+        elif game.current_level < len(game.background_images):
+            screen.blit(game.background_images[game.current_level], (0, 0))
+        else:
+            # Generated levels have no background art, so draw the floor and furniture
+            screen.fill(FLOOR_COLOR)
+            for furniture in game.levels[game.current_level]["invisibleObstacle"]:
+                screen.fill(FURNITURE_COLOR, (furniture.x, furniture.y, furniture.width, furniture.height))
+
+
+class EntityRenderer:
+    def __init__(self):
+        """
+        Draws the renderable entities inside the viewport. After each draw,
+        drawn and culled hold how many were drawn and skipped in that frame.
+        """
+        self.drawn = 0
+        self.culled = 0
+
+    def draw(self, game):
+        world, camera = game.world, game.camera
+        # Walls are baked into the chunk images on large levels
+        skip = world.solid if game.chunks is not None else None
+        self.drawn = world.draw(game.screen, camera.x, camera.y, camera.width, camera.height, camera.offset, skip)
+        drawable = world.drawable if skip is None else world.drawable - world.drawable_solid
+        self.culled = drawable - self.drawn
+
+
+class HazardRenderer:
+    def draw(self, game):
+        for field, _ in game.hazards.values():
+            field.draw(game.screen, game.camera.offset)
+
+
+class GhostRenderer:
+    def draw(self, game):
+        if not game.ghosts:
+            return
+        tick, (ox, oy) = game.level_ticks(), game.camera.offset
+        atlas = game.player.atlas
+        for ghost in game.ghosts:
+            x, y, facing, frame = ghost.at(tick)
+            atlas.blit_faded(game.screen, (x + ox, y + oy), facing, frame, GHOST_ALPHA)
+
+
+class LightingRenderer:
+    def draw(self, game):
+        if not game.darkness:
+            return
+        if game.flashlight is None:
+            game.flashlight = Flashlight(game.levels[game.current_level]["obstacles"])
+        x, y = game.player_center()
+        game.flashlight.draw(game.screen, x, y, game.camera.offset)
+
+
+class PlayerRenderer:
+    def draw(self, game):
+        game.player.draw(game.screen, game.camera.offset)
+
+
+class ParticleRenderer:
+    def draw(self, game):
+        game.particles.draw(game.screen, game.camera.offset)
+
+
+class MinimapRenderer:
+    def draw(self, game):
+        if game.minimap_visible():
+            game.minimap.draw(game)
+
+
+class HudRenderer:
+    def draw(self, game):
+        game.hud.draw(
+            game.screen,
+            len(game.player.inventory),
+            game.level_coins,
+            game.current_level + 1,
+            game.deaths,
+            game.run_seconds(),
+        )
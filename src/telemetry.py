@@ -0,0 +1,206 @@
+import os
+import struct
+import sys
+
+import numpy as np
+import pygame
+
+from world import FLOOR_COLOR
+
+MAGIC = b"HTL1"
+BLOCK_HEADER = struct.Struct("<4sI")  # Magic, record count
+
+# One column per field; a block stores each column contiguously
+COLUMNS = (("tick", "<u4"), ("level", "<u2"), ("event", "u1"), ("x", "<u2"), ("y", "<u2"))
+
+# Events
+POSITION = 0  # Periodic sample of the player's centre
+PICKUP = 1
+DEATH_LASER = 2
+DEATH_SWING = 3
+DEATH_GUARD = 4
+LEVEL_SIZE = 5  # x, y hold the level's width and height
+
+# Heatmap layers built by the analyzer, and the events that feed them
+LAYERS = {"visits": (POSITION,), "pickups": (PICKUP,), "deaths": (DEATH_LASER, DEATH_SWING, DEATH_GUARD)}
+BACKGROUNDS = ("src/assets/lvl1.png", "src/assets/lvl2.png", "src/assets/lvl3.png")
+
+
+class TelemetryLog:
+    def __init__(self, path, sample_every=10, block_size=4096):
+        """
+        Play events written to a compact columnar binary log.
+
+        Records are buffered in NumPy columns and written a block at a time:
+        a small header, then each column's values back to back (11 bytes per
+        record), so the analyzer can read a whole column with one frombuffer.
+
+        Parameters:
+        - path: Log file (appended to if it exists)
+        - sample_every: Ticks between position samples
+        - block_size: Records buffered before a block is written
+        """
+        self.file = open(path, "ab")
+        self.sample_every = sample_every
+        self.columns = {name: np.zeros(block_size, dtype=dtype) for name, dtype in COLUMNS}
+        self.count = 0
+
+    def record(self, tick, level, event, x, y):
+        i = self.count
+        columns = self.columns
+        columns["tick"][i] = tick
+        columns["level"][i] = level
+        columns["event"][i] = event
+        columns["x"][i] = max(0, x)
+        columns["y"][i] = max(0, y)
+        self.count = i + 1
+        if self.count == len(columns["tick"]):
+            self.flush()
+
+    def sample(self, tick, level, x, y):
+        """
+        Records the player's position every sample_every ticks.
+        """
+        if tick % self.sample_every == 0:
+            self.record(tick, level, POSITION, x, y)
+
+    def flush(self):
+        if self.count == 0:
+            return
+        self.file.write(BLOCK_HEADER.pack(MAGIC, self.count))
+        for name, _ in COLUMNS:
+            self.file.write(self.columns[name][: self.count].tobytes())
+        self.file.flush()
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_blocks(path):
+    """
+    Yields the blocks of a telemetry log one at a time, as dicts of column arrays.
+    """
+    record_size = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            magic, count = BLOCK_HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a telemetry log")
+            body = f.read(count * record_size)
+            if len(body) < count * record_size:
+                return  # Truncated last block (the game was killed mid-write)
+            block, offset = {}, 0
+            for name, dtype in COLUMNS:
+                block[name] = np.frombuffer(body, dtype=dtype, count=count, offset=offset)
+                offset += count * np.dtype(dtype).itemsize
+            yield block
+
+
+class Heatmaps:
+    def __init__(self, cell_size=10):
+        """
+        Per-level 2D histograms of the events in any number of telemetry logs.
+
+        Logs are consumed block by block, so memory stays bounded by the
+        block size and the histogram grids no matter how large the logs are.
+
+        Parameters:
+        - cell_size: Side of a histogram cell in pixels
+        """
+        self.cell_size = cell_size
+        self.grids = {}  # (level, layer) -> 2D int64 array (rows, cols)
+        self.sizes = {}  # level -> (width, height) from LEVEL_SIZE events
+
+    def _grid(self, level, layer, rows, cols):
+        grid = self.grids.get((level, layer))
+        if grid is None:
+            grid = self.grids[(level, layer)] = np.zeros((rows, cols), dtype=np.int64)
+        elif grid.shape[0] < rows or grid.shape[1] < cols:
+            grid = np.pad(grid, ((0, max(0, rows - grid.shape[0])), (0, max(0, cols - grid.shape[1]))))
+            self.grids[(level, layer)] = grid
+        return grid
+
+    def add_block(self, block):
+        sizes = block["event"] == LEVEL_SIZE
+        for level, width, height in zip(*(block[key][sizes].tolist() for key in ("level", "x", "y"))):
+            self.sizes[level] = (width, height)
+
+        col = block["x"] // self.cell_size
+        row = block["y"] // self.cell_size
+        for layer, events in LAYERS.items():
+            chosen = np.isin(block["event"], events)
+            for level in np.unique(block["level"][chosen]).tolist():
+                rows_in = chosen & (block["level"] == level)
+                r, c = row[rows_in].astype(np.int64), col[rows_in].astype(np.int64)
+                width, height = self.sizes.get(level, (0, 0))
+                shape = (
+                    max(int(r.max()) + 1, -(-height // self.cell_size)),
+                    max(int(c.max()) + 1, -(-width // self.cell_size)),
+                )
+                grid = self._grid(level, layer, *shape)
+                grid += np.bincount(r * grid.shape[1] + c, minlength=grid.size).reshape(grid.shape)
+
+    def add_log(self, path):
+        for block in read_blocks(path):
+            self.add_block(block)
+
+    def render(self, level, layer, background=None):
+        """
+        Heatmap of one layer drawn over the level.
+
+        Parameters:
+        - level: Level index (0 for level 1)
+        - layer: "visits", "pickups" or "deaths"
+        - background: Surface to draw over (floor colour if None, as generated levels have no art)
+
+        Returns:
+        - A new Surface the size of the level
+        """
+        grid = self.grids[(level, layer)]
+        rows, cols = grid.shape
+        size = self.sizes.get(level, (cols * self.cell_size, rows * self.cell_size))
+        image = pygame.Surface(size)
+        if background is None:
+            image.fill(FLOOR_COLOR)
+        else:
+            image.fill((255, 255, 255))  # The level art is transparent where the floor is
+            image.blit(pygame.transform.scale(background, size), (0, 0))
+
+        # Log scale so a few busy cells do not wash out the rest
+        heat = np.log1p(grid.astype(np.float64))
+        heat /= max(heat.max(), 1e-9)
+        rgb = np.stack(
+            [np.clip(3 * heat, 0, 1), np.clip(3 * heat - 1, 0, 1), np.clip(3 * heat - 2, 0, 1)], axis=-1
+        )
+        overlay = pygame.Surface((cols, rows), pygame.SRCALPHA)
+        pygame.surfarray.blit_array(overlay, (rgb * 255).astype(np.uint8).transpose(1, 0, 2))
+        alpha = pygame.surfarray.pixels_alpha(overlay)
+        alpha[:] = (np.where(grid > 0, 80 + 160 * heat, 0)).astype(np.uint8).T
+        del alpha  # Unlock the surface
+        image.blit(pygame.transform.smoothscale(overlay, (cols * self.cell_size, rows * self.cell_size)), (0, 0))
+        return image
+
+    def save(self, out_dir, backgrounds=BACKGROUNDS):
+        """
+        Writes level<N>_<layer>.png for every histogram, over the level art where there is some.
+        """
+        images = {}
+        for level, layer in sorted(self.grids):
+            if level < len(backgrounds) and level not in images:
+                images[level] = pygame.image.load(backgrounds[level])
+            image = self.render(level, layer, images.get(level))
+            pygame.image.save(image, os.path.join(out_dir, f"level{level + 1}_{layer}.png"))
+
+
+if __name__ == "__main__":
+    # Usage: python src/telemetry.py OUTPUT_DIR LOG [LOG ...]
+    out_dir, paths = sys.argv[1], sys.argv[2:]
+    heatmaps = Heatmaps()
+    for path in paths:
+        heatmaps.add_log(path)
+    heatmaps.save(out_dir)
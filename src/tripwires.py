@@ -0,0 +1,246 @@
+import numpy as np
+
+from entities import Laser
+
+BLINK = 0
+SWEEP = 1
+ROTATE = 2
+
+
+class BlinkingLaser:
+    __slots__ = ("x", "y", "width", "height", "period", "on_ticks", "phase")
+
+    def __init__(self, x, y, width, height, period, on_ticks, phase=0):
+        """
+        A laser that switches on and off on a fixed schedule.
+
+        Parameters:
+        - x, y, width, height: Beam rectangle
+        - period: Length of one on/off cycle in ticks
+        - on_ticks: Ticks per cycle the beam is on
+        - phase: Tick offset into the cycle
+        """
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.period = period
+        self.on_ticks = on_ticks
+        self.phase = phase
+
+
+class SweepingLaser:
+    __slots__ = ("x", "y", "width", "height", "dx", "dy", "period", "phase")
+
+    def __init__(self, x, y, width, height, dx, dy, period, phase=0):
+        """
+        A laser that slides back and forth along a straight track.
+
+        Parameters:
+        - x, y, width, height: Beam rectangle at the start of the track
+        - dx, dy: Offset of the far end of the track
+        - period: Ticks for a full there-and-back sweep
+        - phase: Tick offset into the sweep
+        """
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.dx = dx
+        self.dy = dy
+        self.period = period
+        self.phase = phase
+
+
+class RotatingLaser:
+    __slots__ = ("x", "y", "length", "period", "phase", "thickness")
+
+    def __init__(self, x, y, length, period, phase=0, thickness=5):
+        """
+        A beam that spins around a pivot like a lighthouse.
+
+        Parameters:
+        - x, y: Pivot point
+        - length: Length of the beam
+        - period: Ticks per full turn
+        - phase: Tick offset into the turn
+        - thickness: Width of the beam
+        """
+        self.x = x
+        self.y = y
+        self.length = length
+        self.period = period
+        self.phase = phase
+        self.thickness = thickness
+
+
+class TripwireField:
+    def __init__(self, lasers):
+        """
+        Every animated laser of a level in one table, evaluated in closed form
+        from the tick counter instead of being stepped object by object.
+
+        Parameters:
+        - lasers: List of BlinkingLaser, SweepingLaser and RotatingLaser objects
+        """
+        count = len(lasers)
+        self.kind = np.zeros(count, dtype=np.int8)
+        self.x = np.zeros(count)
+        self.y = np.zeros(count)
+        self.width = np.zeros(count)
+        self.height = np.zeros(count)
+        self.dx = np.zeros(count)
+        self.dy = np.zeros(count)
+        self.period = np.ones(count)
+        self.on_ticks = np.zeros(count)
+        self.phase = np.zeros(count)
+        for i, laser in enumerate(lasers):
+            self.x[i], self.y[i], self.period[i], self.phase[i] = laser.x, laser.y, laser.period, laser.phase
+            if isinstance(laser, RotatingLaser):
+                self.kind[i] = ROTATE
+                self.width[i] = laser.length
+                self.height[i] = laser.thickness
+                self.on_ticks[i] = laser.period  # Always on
+            else:
+                self.width[i], self.height[i] = laser.width, laser.height
+                if isinstance(laser, SweepingLaser):
+                    self.kind[i] = SWEEP
+                    self.dx[i], self.dy[i] = laser.dx, laser.dy
+                    self.on_ticks[i] = laser.period
+                else:
+                    self.kind[i] = BLINK
+                    self.on_ticks[i] = laser.on_ticks
+
+        # Cached swept bounds: the box each laser can occupy over its whole cycle
+        rotate = self.kind == ROTATE
+        reach = np.where(rotate, self.width + self.height, 0)
+        self.swept_x = np.where(rotate, self.x - reach, np.minimum(self.x, self.x + self.dx))
+        self.swept_y = np.where(rotate, self.y - reach, np.minimum(self.y, self.y + self.dy))
+        self.swept_r = np.where(rotate, self.x + reach, np.maximum(self.x, self.x + self.dx) + self.width)
+        self.swept_b = np.where(rotate, self.y + reach, np.maximum(self.y, self.y + self.dy) + self.height)
+        self.tick = 0  # Tick the field was last advanced to
+
+    def __len__(self):
+        return len(self.kind)
+
+    def advance(self, tick):
+        """
+        Moves the lasers to a tick (closed form, so ticks may be skipped).
+        """
+        self.tick = tick
+
+    def touches(self, x, y, width, height):
+        """
+        True if the rectangle touches a laser that is on at the current tick.
+        """
+        return self.hits(self.tick, x, y, width, height)
+
+    def state(self, tick, rows=slice(None)):
+        """
+        Active flags and positions at a tick, for all lasers or the given rows.
+
+        Returns:
+        - active: Boolean array
+        - x, y: Rectangle position (blink/sweep) or pivot (rotate)
+        - angle: Beam angle in radians (rotate only; 0 elsewhere)
+        """
+        t = (tick + self.phase[rows]) % self.period[rows]
+        fraction = t / self.period[rows]
+        active = t < self.on_ticks[rows]
+        kind = self.kind[rows]
+        sweep = np.where(kind == SWEEP, 1 - np.abs(2 * fraction - 1), 0)  # Triangle wave 0 -> 1 -> 0
+        x = self.x[rows] + self.dx[rows] * sweep
+        y = self.y[rows] + self.dy[rows] * sweep
+        angle = np.where(kind == ROTATE, 2 * np.pi * fraction, 0)
+        return active, x, y, angle
+
+    def hits(self, tick, x, y, width, height):
+        """
+        True if the rectangle touches any laser that is on at this tick.
+
+        The cached swept bounds reject most lasers before their position is
+        evaluated.
+        """
+        near = (
+            (x < self.swept_r) & (x + width > self.swept_x) & (y < self.swept_b) & (y + height > self.swept_y)
+        )
+        rows = np.flatnonzero(near)
+        if len(rows) == 0:
+            return False
+        return bool(self._touching(tick, rows, x, y, width, height).any())
+
+    def hits_many(self, ticks, x, y, width, height):
+        """
+        hits for many rectangles at once, each at its own tick.
+
+        Parameters:
+        - ticks, x, y: (N,) arrays
+        - width, height: Scalars or (N,) arrays
+
+        Returns:
+        - (N,) boolean array
+        """
+        # As (N, 1) columns (scalars become (1, 1)) to broadcast against every laser
+        ticks, x, y, width, height = (np.reshape(value, (-1, 1)) for value in (ticks, x, y, width, height))
+        return self._touching(ticks, slice(None), x, y, width, height).any(axis=1)
+
+    def _touching(self, tick, rows, x, y, width, height):
+        # Which of the given lasers touch the rectangle and are on; broadcasts
+        # over (N, 1) rectangles and ticks against the laser rows
+        active, lx, ly, angle = self.state(tick, rows)
+        kind = self.kind[rows]
+
+        boxes = (
+            (kind != ROTATE)
+            & (x < lx + self.width[rows])
+            & (x + width > lx)
+            & (y < ly + self.height[rows])
+            & (y + height > ly)
+        )
+
+        # Rotating beams: clip the pivot -> tip segment against the rectangle
+        # grown by half the beam thickness (slab test)
+        pad = self.height[rows] / 2
+        dx = np.cos(angle) * self.width[rows]
+        dy = np.sin(angle) * self.width[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tx1 = (x - pad - lx) / dx
+            tx2 = (x + width + pad - lx) / dx
+            ty1 = (y - pad - ly) / dy
+            ty2 = (y + height + pad - ly) / dy
+        inside_x = (lx > x - pad) & (lx < x + width + pad)
+        inside_y = (ly > y - pad) & (ly < y + height + pad)
+        enter_x = np.where(dx == 0, np.where(inside_x, -np.inf, np.inf), np.minimum(tx1, tx2))
+        leave_x = np.where(dx == 0, np.where(inside_x, np.inf, -np.inf), np.maximum(tx1, tx2))
+        enter_y = np.where(dy == 0, np.where(inside_y, -np.inf, np.inf), np.minimum(ty1, ty2))
+        leave_y = np.where(dy == 0, np.where(inside_y, np.inf, -np.inf), np.maximum(ty1, ty2))
+        enter = np.maximum(np.maximum(enter_x, enter_y), 0)
+        leave = np.minimum(np.minimum(leave_x, leave_y), 1)
+        beams = (kind == ROTATE) & (enter <= leave)
+
+        return active & (boxes | beams)
+
+    def draw(self, screen, offset=(0, 0)):
+        """
+        Draws the lasers that are on at the current tick and whose swept bounds are on screen.
+        """
+        tick = self.tick
+        view_x, view_y = -offset[0], -offset[1]
+        view_w, view_h = screen.get_size()
+        on_screen = (
+            (self.swept_x < view_x + view_w)
+            & (self.swept_r > view_x)
+            & (self.swept_y < view_y + view_h)
+            & (self.swept_b > view_y)
+        )
+        rows = np.flatnonzero(on_screen)
+        active, x, y, angle = self.state(tick, rows)
+        rows, x, y, angle = rows[active], x[active] + offset[0], y[active] + offset[1], angle[active]
+        color = Laser.default_color
+        for i, lx, ly, a in zip(rows.tolist(), x.tolist(), y.tolist(), angle.tolist()):
+            if self.kind[i] == ROTATE:
+                length = self.width[i]
+                tip = (lx + np.cos(a) * length, ly + np.sin(a) * length)
+                screen.line(color, (lx, ly), tip, int(self.height[i]))
+            else:
+                screen.fill(color, (lx, ly, float(self.width[i]), float(self.height[i])))
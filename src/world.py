@@ -0,0 +1,203 @@
+import numpy as np
+import pygame
+
+from entities import RectTable, bucket_rects, merge_buckets
+
+# Level keys whose geometry never moves and can be baked into chunk surfaces
+STATIC_KEYS = ("obstacles", "invisibleObstacle")
+FLOOR_COLOR = (200, 200, 200)
+FURNITURE_COLOR = (120, 90, 60)
+
+
+class Camera:
+    def __init__(self, width, height):
+        """
+        Viewport onto a level that can be larger than the window.
+
+        Parameters:
+        - width, height: Size of the viewport (the window)
+        """
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+        self.world_width = width
+        self.world_height = height
+
+    def set_world(self, world_width, world_height):
+        """
+        Sets the size of the level the camera moves over and resets it to the origin.
+        """
+        self.world_width = max(world_width, self.width)
+        self.world_height = max(world_height, self.height)
+        self.x = self.y = 0
+
+    def follow(self, x, y, width=0, height=0):
+        """
+        Centers the camera on a rectangle, clamped to the level edges.
+        """
+        self.x = int(min(max(x + width / 2 - self.width / 2, 0), self.world_width - self.width))
+        self.y = int(min(max(y + height / 2 - self.height / 2, 0), self.world_height - self.height))
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+    @property
+    def offset(self):
+        """
+        Offset to add to world coordinates to get screen coordinates.
+        """
+        return (-self.x, -self.y)
+
+
+class Chunk:
+    __slots__ = ("col", "row", "surface")
+
+    def __init__(self, col, row, surface):
+        self.col = col
+        self.row = row
+        self.surface = surface  # Floor, furniture and walls pre-rendered
+
+
+class ChunkedLevel:
+    def __init__(self, level, chunk_size=512, margin=1, tile=None):
+        """
+        Splits a large level's static geometry into square chunks whose
+        surfaces are rendered when the camera gets near them and dropped
+        again when it moves away. Collision does not go through the chunks:
+        it queries the whole level's World grid.
+
+        Parameters:
+        - level: Level dict with a "size" entry and RectTable or list geometry
+        - chunk_size: Side of each chunk in pixels
+        - margin: Chunks kept loaded around the visible ones
+        - tile: Optional floor tile surface, repeated across the level
+        """
+        self.level = level
+        self.chunk_size = chunk_size
+        self.margin = margin
+        self.tile = tile
+        width, height = level["size"]
+        self.cols = int(np.ceil(width / chunk_size))
+        self.rows = int(np.ceil(height / chunk_size))
+
+        self.sources = {}
+        self.index = {}
+        for key in STATIC_KEYS:
+            table = level.get(key, [])
+            if not isinstance(table, RectTable):
+                table = RectTable.from_entities(type(table[0]) if table else object, table)
+            self.sources[key] = table
+            self.index[key] = self._bin(table)
+
+        self.loaded = {}  # (col, row) -> Chunk
+
+    def _bin(self, table):
+        """
+        Maps every chunk to the row indices of the rectangles overlapping it.
+        """
+        rows = table.indices()
+        return bucket_rects(
+            rows, table.x[rows], table.y[rows], table.width[rows], table.height[rows], self.chunk_size, self.cols, self.rows
+        )
+
+    def _load(self, col, row):
+        size = self.chunk_size
+        origin_x, origin_y = col * size, row * size
+        cell = row * self.cols + col
+        tables = {}  # Level key -> RectTable of the geometry touching this chunk, to draw it
+        for key, source in self.sources.items():
+            rows = self.index[key].get(cell, np.empty(0, dtype=np.int64))
+            rows = rows[source.alive[rows]]  # Rows removed by replace_rects stay binned
+            tables[key] = RectTable.from_arrays(
+                source.kind, source.x[rows], source.y[rows], source.width[rows], source.height[rows], source.color
+            )
+
+        surface = pygame.Surface((size, size))
+        if self.tile is not None:
+            tw, th = self.tile.get_size()
+            for ty in range(-(origin_y % th), size, th):
+                for tx in range(-(origin_x % tw), size, tw):
+                    surface.blit(self.tile, (tx, ty))
+        else:
+            surface.fill(FLOOR_COLOR)
+        furniture = tables["invisibleObstacle"]
+        rows = furniture.indices()
+        for x, y, w, h in zip(*(column[rows].tolist() for column in (furniture.x, furniture.y, furniture.width, furniture.height))):
+            pygame.draw.rect(surface, FURNITURE_COLOR, (x - origin_x, y - origin_y, w, h))
+        tables["obstacles"].draw(surface, offset=(-origin_x, -origin_y))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+
+        chunk = Chunk(col, row, surface)
+        self.loaded[(col, row)] = chunk
+        return chunk
+
+    def replace_rects(self, key, removed, added):
+        """
+        Applies an edit to one static key's geometry. Only the new rectangles
+        are binned, and only the loaded chunks the edit touches are dropped
+        (to be rebuilt by the next stream).
+
+        Parameters:
+        - key: "obstacles" or "invisibleObstacle"
+        - removed, added: Lists of (x, y, width, height)
+        """
+        source = self.sources[key]
+        for x, y, width, height in removed:
+            rows = source.indices()
+            match = rows[
+                (source.x[rows] == x) & (source.y[rows] == y) & (source.width[rows] == width) & (source.height[rows] == height)
+            ]
+            if len(match):
+                source.remove(int(match[0]))
+        rows = np.array([source.append(*rect) for rect in added], dtype=np.int64)
+        if len(rows):
+            binned = bucket_rects(
+                rows, source.x[rows], source.y[rows], source.width[rows], source.height[rows], self.chunk_size, self.cols, self.rows
+            )
+            merge_buckets(self.index[key], binned)
+        for x, y, width, height in removed + added:
+            c0, r0, c1, r1 = self._range(x, y, width, height)
+            for row in range(r0, r1 + 1):
+                for col in range(c0, c1 + 1):
+                    self.loaded.pop((col, row), None)
+
+    def _range(self, x, y, width, height, margin=0):
+        size = self.chunk_size
+        c0 = max(0, int(x // size) - margin)
+        r0 = max(0, int(y // size) - margin)
+        c1 = min(self.cols - 1, int((x + width) // size) + margin)
+        r1 = min(self.rows - 1, int((y + height) // size) + margin)
+        return c0, r0, c1, r1
+
+    def chunks_in(self, x, y, width, height):
+        """
+        Chunks overlapping a rectangle, loading any that are not yet resident.
+        """
+        c0, r0, c1, r1 = self._range(x, y, width, height)
+        for row in range(r0, r1 + 1):
+            for col in range(c0, c1 + 1):
+                chunk = self.loaded.get((col, row))
+                yield chunk if chunk is not None else self._load(col, row)
+
+    def stream(self, camera):
+        """
+        Loads the chunks around the camera and unloads those that left the margin.
+        """
+        c0, r0, c1, r1 = self._range(camera.x, camera.y, camera.width, camera.height, self.margin)
+        for key in [key for key in self.loaded if not (c0 <= key[0] <= c1 and r0 <= key[1] <= r1)]:
+            del self.loaded[key]
+        for row in range(r0, r1 + 1):
+            for col in range(c0, c1 + 1):
+                if (col, row) not in self.loaded:
+                    self._load(col, row)
+
+    def draw(self, screen, camera):
+        """
+        Blits the pre-rendered chunks that overlap the camera.
+        """
+        size = self.chunk_size
+        for chunk in self.chunks_in(camera.x, camera.y, camera.width, camera.height):
+            screen.blit(chunk.surface, (chunk.col * size - camera.x, chunk.row * size - camera.y))